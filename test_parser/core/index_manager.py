@@ -1,16 +1,32 @@
 import os
 import shutil
 import time
+from collections import OrderedDict
+from contextlib import nullcontext
 from pathlib import Path
 import pandas as pd
-from test_parser.indexes.isam_s.isam import ISAM, Record, _read_restaurants_csv, normalize_text
+from itertools import islice
+from test_parser.indexes.isam_s.isam import ISAM, Record, _iter_restaurants_csv, normalize_text
 from test_parser.indexes.hashing.extendible_hashing import ExtendibleHashing
 from test_parser.indexes.rtree_point.rtree_points import RTreePoints
 from test_parser.indexes.avl.avl_file import AVLFile
-from test_parser.indexes.bmas.bplustree import BPlusTreeIndex as BPTree, Record as BPRecord
+from test_parser.indexes.bmas.bplustree import BPlusTreeIndex as BPTree
 from test_parser.indexes.isam_s.isam import normalize_text as _norm
 from test_parser.indexes.bmas.bplustree import BPlusTreeIndex
 
+# ======================================================
+# Posición de cada columna del CSV base (orden de IndexManager.all_columns)
+# ======================================================
+ID_IDX, NAME_IDX, COUNTRY_IDX, CITY_IDX, ADDRESS_IDX = 0, 1, 2, 3, 4
+LOCALITY_IDX, LOCALITY_VERBOSE_IDX, LON_IDX, LAT_IDX, CUISINES_IDX = 5, 6, 7, 8, 9
+AVG_COST_IDX, CURRENCY_IDX, TABLE_BOOKING_IDX, ONLINE_DELIVERY_IDX = 10, 11, 12, 13
+DELIVERING_NOW_IDX, SWITCH_MENU_IDX, PRICE_RANGE_IDX, RATING_IDX = 14, 15, 16, 17
+RATING_COLOR_IDX, RATING_TEXT_IDX, VOTES_IDX = 18, 19, 20
+N_COLUMNS = 21
+
+# Máximo de IDs inexistentes recordados por search_by_id (LRU)
+_ID_NEG_CACHE_SIZE = 4096
+
 class IndexManager:
     """
     Gestor unificado: construye, consulta, inserta y elimina en:
@@ -37,6 +53,9 @@ class IndexManager:
             "Rating text", "Votes"
         ]
 
+        # IDs buscados sin éxito en AVL/B+Tree/Hash (se invalida al insertar o reconstruir)
+        self._id_neg_cache = OrderedDict()
+
         # === Paths individuales de estructuras ===
         self.isam_data_path = self.base_dir / "restaurants.dat"
         self.isam_index_path = self.base_dir / "restaurants.idx"
@@ -203,11 +222,13 @@ class IndexManager:
         # === B+TREE ===
         self.bpt = BPTree()
 
-    def build_from_csv(self, csv_path: str, limit: int | None = 50, using_indexes: list[str] | None = None):
+    def build_from_csv(self, csv_path: str, limit: int | None = 50, using_indexes: list[str] | None = None,
+                       batch_size: int = 4096):
         """
         Construye los índices desde un CSV.
         Si el path es relativo, se asume test_parser/core/Dataset.csv.
         Si using_indexes se especifica, solo se construyen esas estructuras.
+        HASH, AVL y B+Tree se alimentan del CSV en lotes de batch_size filas.
         """
         from pathlib import Path
         import os
@@ -221,12 +242,6 @@ class IndexManager:
         if not csv_path.exists():
             raise FileNotFoundError(f"No existe el archivo CSV en: {csv_path}")
 
-        print(f"[INFO] Cargando dataset de restaurantes desde: {csv_path}")
-        recs = _read_restaurants_csv(str(csv_path))
-        if limit:
-            recs = recs[:limit]
-        print(f"[INFO] {len(recs)} registros cargados.")
-
         # ======================================================
         # Determinar qué índices construir
         # ======================================================
@@ -236,6 +251,21 @@ class IndexManager:
         else:
             using_indexes = ["ISAM", "HASH", "RTREE", "AVL", "BTREE"]
 
+        self._id_neg_cache.clear()
+
+        print(f"[INFO] Cargando dataset de restaurantes desde: {csv_path}")
+        rec_stream = _iter_restaurants_csv(str(csv_path))
+        if limit:
+            rec_stream = islice(rec_stream, limit)
+
+        # ISAM y R-Tree se construyen de forma estática y necesitan todos los registros;
+        # si ninguno se pide, el CSV se recorre una sola vez por lotes
+        recs = []
+        if "ISAM" in using_indexes or "RTREE" in using_indexes:
+            recs = list(rec_stream)
+            rec_stream = iter(recs)
+            print(f"[INFO] {len(recs)} registros cargados.")
+
         # ======================================================
         # ISAM
         # ======================================================
@@ -250,33 +280,6 @@ class IndexManager:
             print("[INFO] Construyendo ISAM...")
             self.isam.build(recs)
 
-        # ======================================================
-        # HASH
-        # ======================================================
-        if "HASH" in using_indexes:
-            print("[INFO] Construyendo índice hash extendible...")
-            if self.hash_path.exists():
-                shutil.rmtree(self.hash_path, ignore_errors=True)
-            self.hash_path.mkdir(parents=True, exist_ok=True)
-            self.hash = ExtendibleHashing(
-                base_path=str(self.hash_path),
-                bucket_capacity=4,
-                key_selector=lambda r: r["Restaurant ID"],
-                name="restaurants_hash"
-            )
-            for r in recs:
-                try:
-                    self.hash.add({
-                        "Restaurant ID": r.restaurant_id,
-                        "Name": r.name,
-                        "City": r.city,
-                        "Rating": r.aggregate_rating,
-                        "Longitude": r.longitude,
-                        "Latitude": r.latitude
-                    })
-                except Exception as e:
-                    print(f"[WARN] HASH insert: {e}")
-
         # ======================================================
         # RTREE
         # ======================================================
@@ -317,30 +320,32 @@ class IndexManager:
                 index_name=str(self.rtree_path)
             )
 
+        # ======================================================
+        # HASH
+        # ======================================================
+        if "HASH" in using_indexes:
+            print("[INFO] Construyendo índice hash extendible...")
+            if self.hash_path.exists():
+                shutil.rmtree(self.hash_path, ignore_errors=True)
+            self.hash_path.mkdir(parents=True, exist_ok=True)
+            self.hash = ExtendibleHashing(
+                base_path=str(self.hash_path),
+                bucket_capacity=4,
+                key_selector=lambda r: r["Restaurant ID"],
+                name="restaurants_hash"
+            )
+
         # ======================================================
         # AVL
         # ======================================================
         if "AVL" in using_indexes:
             print("[INFO] Construyendo índice AVL...")
-            for ext in (".avl", ".dat"):
-                f = Path(str(self.avl_path) + ext)
-                if f.exists():
-                    f.unlink(missing_ok=True)
+            if self.avl is not None:
+                self.avl.close()  # liberar el mmap de nodos antes de borrar
+            # .avl, .dat (y .col que hayan dejado versiones anteriores)
+            for f in self.avl_path.parent.glob(self.avl_path.name + ".*"):
+                f.unlink(missing_ok=True)
             self.avl = AVLFile(str(self.avl_path))
-            for r in recs:
-                try:
-                    self.avl.insert({
-                        "restaurant_id": r.restaurant_id,
-                        "restaurant_name": r.name,
-                        "city": r.city,
-                        "longitude": r.longitude,
-                        "latitude": r.latitude,
-                        "average_cost_for_two": getattr(r, "avg_cost_for_two", 0),
-                        "aggregate_rating": r.aggregate_rating,
-                        "votes": getattr(r, "votes", 0)
-                    })
-                except Exception as e:
-                    print(f"[WARN] AVL insert: {e}")
 
         # ======================================================
         # BTREE
@@ -363,19 +368,33 @@ class IndexManager:
                 meta_file=str(bpt_meta)
             )
 
-            try:
-                rows = BPRecord.load_from_csv(csv_path)
-            except Exception:
-                rows = None
-
-            it = rows[:limit] if rows and limit else (rows or recs)
-            for rec in it:
+        # ======================================================
+        # Carga por lotes en HASH / AVL / B+Tree
+        # ======================================================
+        targets = set(using_indexes) & {"HASH", "AVL", "BTREE", "B+TREE"}
+        if targets:
+            total = 0
+            buf = []
+            # El B+Tree se carga al final, ordenado, con bulk_load (append a la hoja derecha)
+            bpt_pairs = [] if targets & {"BTREE", "B+TREE"} else None
+            # El árbol AVL se arma en memoria durante toda la carga y se escribe al final
+            with (self.avl.bulk_session() if "AVL" in targets else nullcontext()):
+                for r in rec_stream:
+                    buf.append(r)
+                    if len(buf) >= batch_size:
+                        self._bulk_insert(buf, targets, bpt_pairs)
+                        total += len(buf)
+                        buf.clear()
+                if buf:
+                    self._bulk_insert(buf, targets, bpt_pairs)
+                    total += len(buf)
+            if bpt_pairs:
                 try:
-                    key = int(getattr(rec, "restaurant_id", rec.data.get("restaurant_id")))
-                    val = getattr(rec, "name", None) or rec.data.get("restaurant_name", "")
-                    self.bpt.insert(key, val)
+                    self.bpt.bulk_load(bpt_pairs)
                 except Exception as e:
-                    print(f"[WARN] B+Tree insert: {e}")
+                    print(f"[WARN] B+Tree bulk load: {e}")
+            if not recs:
+                print(f"[INFO] {total} registros cargados.")
 
         # ======================================================
         # FIN
@@ -384,7 +403,62 @@ class IndexManager:
         print(f"[OK] Índices creados: {', '.join(using_indexes)}.")
         return using_indexes  # ← permite al llamador saber qué índices se construyeron
 
-    def rebuild_from_csv(self, csv_path: str, limit: int | None = 50, using_indexes: list[str] | None = None):
+    def _bulk_insert(self, batch, targets, bpt_pairs=None):
+        """
+        Inserta un lote de Records en los índices dinámicos indicados (HASH, AVL, B+Tree).
+        Si se pasa bpt_pairs, los pares del B+Tree se acumulan ahí en vez de insertarse.
+        """
+        if "HASH" in targets:
+            for r in batch:
+                try:
+                    self.hash.add({
+                        "Restaurant ID": r.restaurant_id,
+                        "Name": r.name,
+                        "City": r.city,
+                        "Rating": r.aggregate_rating,
+                        "Longitude": r.longitude,
+                        "Latitude": r.latitude,
+                        "Average Cost for two": getattr(r, "avg_cost_for_two", 0),
+                        "Votes": getattr(r, "votes", 0)
+                    })
+                except Exception as e:
+                    print(f"[WARN] HASH insert: {e}")
+
+        if "AVL" in targets:
+            # Cada fila se valida por separado: una fila inválida no tumba el lote
+            rows = []
+            for r in batch:
+                try:
+                    rows.append(self.avl.normalize_record({
+                        "restaurant_id": r.restaurant_id,
+                        "restaurant_name": r.name,
+                        "city": r.city,
+                        "longitude": r.longitude,
+                        "latitude": r.latitude,
+                        "average_cost_for_two": getattr(r, "avg_cost_for_two", 0),
+                        "aggregate_rating": r.aggregate_rating,
+                        "votes": getattr(r, "votes", 0)
+                    }))
+                except Exception as e:
+                    print(f"[WARN] AVL insert (fila omitida): {e}")
+            try:
+                # Un solo write al .dat y al .avl por lote
+                self.avl.bulk_insert(rows, normalized=True)
+            except Exception as e:
+                print(f"[WARN] AVL bulk insert: {e}")
+
+        if "BTREE" in targets or "B+TREE" in targets:
+            for r in batch:
+                try:
+                    if bpt_pairs is not None:
+                        bpt_pairs.append((int(r.restaurant_id), r.name))
+                    else:
+                        self.bpt.insert(int(r.restaurant_id), r.name)
+                except Exception as e:
+                    print(f"[WARN] B+Tree insert: {e}")
+
+    def rebuild_from_csv(self, csv_path: str, limit: int | None = 50, using_indexes: list[str] | None = None,
+                         batch_size: int = 4096):
         """
         Limpia artefactos locales (excepto /data del B+Tree persistente)
         y reconstruye de forma segura.
@@ -394,12 +468,19 @@ class IndexManager:
 
         # Cierre seguro de RTree para evitar locks (especialmente en Windows)
         try:
-            if self.rtree:
+            if self.rtree is not None:
                 self.rtree.close()
                 self.rtree = None
         except Exception as e:
             print(f"[WARN] No se pudo cerrar RTree previo: {e}")
 
+        # El AVL mantiene un mmap del archivo de nodos
+        try:
+            if self.avl:
+                self.avl.close()
+        except Exception as e:
+            print(f"[WARN] No se pudo cerrar AVL previo: {e}")
+
         # Pequeño retraso para asegurar liberación del handle
         time.sleep(0.5)
 
@@ -415,10 +496,10 @@ class IndexManager:
         self.base_dir.mkdir(parents=True, exist_ok=True)
 
         # Reconstrucción completa (solo índices seleccionados)
-        built_indexes = self.build_from_csv(csv_path, limit, using_indexes)
+        built_indexes = self.build_from_csv(csv_path, limit, using_indexes, batch_size)
 
         # Cerrar nuevamente el RTree después del rebuild (previene locks futuros)
-        if hasattr(self, "rtree") and self.rtree:
+        if getattr(self, "rtree", None) is not None:
             try:
                 self.rtree.close()
             except Exception:
@@ -473,6 +554,19 @@ class IndexManager:
                 return out
             return []
 
+    def search_comparison_pred(self, attr: str, pred, value: float):
+        """
+        Variante de search_comparison con el operador ya compilado
+        (operator.gt, operator.le, ...), evaluado directamente por el AVL.
+        """
+        try:
+            results = self.avl.search_comparison_pred(attr, pred, value)
+            print(f"[DEBUG] IndexManager.search_comparison_pred('{attr}', {pred.__name__}, {value}) → {len(results)} resultado(s)")
+            return results
+        except Exception as e:
+            print(f"[WARN] search_comparison_pred() → {e}")
+            return []
+
     def search_between_general(self, attr: str, low, high):
         """
         BETWEEN genérico:
@@ -498,6 +592,8 @@ class IndexManager:
 
     def search_by_id(self, restaurant_id: int):
         """Búsqueda exacta por ID (AVL → B+Tree → Hash)"""
+        if self.id_known_missing(restaurant_id):
+            return []
         try:
             found = self.avl.search(int(restaurant_id))
             if found:
@@ -516,8 +612,19 @@ class IndexManager:
                 return [h]
         except Exception as e:
             print(f"[HASH-ERROR] search: {e}")
+        self._id_neg_cache[int(restaurant_id)] = None
+        if len(self._id_neg_cache) > _ID_NEG_CACHE_SIZE:
+            self._id_neg_cache.popitem(last=False)
         return []
 
+    def id_known_missing(self, restaurant_id) -> bool:
+        """True si el ID ya falló en las tres estructuras y no se ha insertado desde entonces."""
+        rid = int(restaurant_id)
+        if rid in self._id_neg_cache:
+            self._id_neg_cache.move_to_end(rid)
+            return True
+        return False
+
     def search_range_id(self, begin_id: int, end_id: int):
         """Rango de IDs en B+Tree"""
         try:
@@ -539,14 +646,9 @@ class IndexManager:
     #  INSERCIÓN / ELIMINACIÓN
     # ======================================================
     def insert_full(self, record_dict: dict):
-        import csv, os
-        from test_parser.indexes.isam_s.isam import Record  # usa tu Record actualizado
-
-        # ----------------------------
-        # 1) Normalizar / mapear campos
-        # ----------------------------
-        # mapeo de nombres CSV → atributos del Record
-        mapping = {
+        """Inserta desde un dict con los nombres de columna del CSV (ver all_columns)."""
+        # Alias con las claves normalizadas que aceptaba la versión por dict
+        aliases = {
             "Average Cost for two": "avg_cost_for_two",
             "Has Table booking": "has_table_booking",
             "Has Online delivery": "has_online_delivery",
@@ -557,43 +659,56 @@ class IndexManager:
             "Rating text": "rating_text",
             "Price range": "price_range",
         }
-        normalized = dict(record_dict)  # copia
-        for old, new in mapping.items():
-            if old in normalized:
-                normalized[new] = normalized.pop(old)
+        values = tuple(
+            record_dict.get(k, record_dict.get(aliases.get(k, k)))
+            for k in self.all_columns
+        )
+        return self.insert_positional(values)
+
+    def insert_positional(self, values):
+        """
+        Inserta un registro dado como secuencia de valores en el orden de
+        self.all_columns (como llega de INSERT INTO ... VALUES), sin pasar por dict.
+        """
+        import csv, os
+
+        # Completar / recortar a N_COLUMNS (None = columna ausente)
+        values = tuple(values[:N_COLUMNS]) + (None,) * (N_COLUMNS - len(values))
+
+        def _s(v):
+            return "" if v is None else v
 
         # ----------------------------
-        # 2) Construir el Record
+        # 1) Construir el Record
         # ----------------------------
-        # Nota: Ajusta estos campos a tu dataclass Record actual.
         rec = Record(
-            restaurant_id=self._to_int(normalized.get("Restaurant ID")),
-            name=normalized.get("Restaurant Name", ""),
-            country_code=self._to_int(normalized.get("Country Code")),
-            city=normalized.get("City", ""),
-            address=normalized.get("Address", ""),
-            cuisines=normalized.get("Cuisines", ""),
-            avg_cost_for_two=self._to_int(normalized.get("avg_cost_for_two")),
-            currency=normalized.get("Currency", ""),
-            has_table_booking=self._to_bool_yesno(normalized.get("has_table_booking")),
-            has_online_delivery=self._to_bool_yesno(normalized.get("has_online_delivery")),
-            is_delivering_now=self._to_bool_yesno(normalized.get("is_delivering_now")),
-            price_range=self._to_int(normalized.get("price_range")),
-            aggregate_rating=self._to_float(normalized.get("aggregate_rating")),
-            rating_text=normalized.get("rating_text", ""),
-            votes=self._to_int(normalized.get("Votes")),
-            longitude=self._to_float(normalized.get("Longitude")),
-            latitude=self._to_float(normalized.get("Latitude")),
+            restaurant_id=self._to_int(values[ID_IDX]),
+            name=_s(values[NAME_IDX]),
+            country_code=self._to_int(values[COUNTRY_IDX]),
+            city=_s(values[CITY_IDX]),
+            address=_s(values[ADDRESS_IDX]),
+            cuisines=_s(values[CUISINES_IDX]),
+            avg_cost_for_two=self._to_int(values[AVG_COST_IDX]),
+            currency=_s(values[CURRENCY_IDX]),
+            has_table_booking=self._to_bool_yesno(values[TABLE_BOOKING_IDX]),
+            has_online_delivery=self._to_bool_yesno(values[ONLINE_DELIVERY_IDX]),
+            is_delivering_now=self._to_bool_yesno(values[DELIVERING_NOW_IDX]),
+            price_range=self._to_int(values[PRICE_RANGE_IDX]),
+            aggregate_rating=self._to_float(values[RATING_IDX]),
+            rating_text=_s(values[RATING_TEXT_IDX]),
+            votes=self._to_int(values[VOTES_IDX]),
+            longitude=self._to_float(values[LON_IDX]),
+            latitude=self._to_float(values[LAT_IDX]),
         )
 
-        # 🔒 3) Chequeo de duplicado por ID (global)
+        # 🔒 2) Chequeo de duplicado por ID (global)
         rid = int(rec.restaurant_id)
         if self._id_exists(rid):
             print(f"[DUPLICATE] Restaurant ID={rid} ya existe. No se insertará ni en índices ni en CSV.")
             return
 
         # ----------------------------
-        # 4) Insertar en índices primero
+        # 3) Insertar en índices primero
         # ----------------------------
         ok = self.insert(rec)
         if not ok:
@@ -601,20 +716,16 @@ class IndexManager:
             return
 
         # ----------------------------
-        # 5) Persistir en CSV (si todo OK arriba)
+        # 4) Persistir en CSV (si todo OK arriba), valores originales en orden de columnas
         # ----------------------------
         os.makedirs(self.base_table_path.parent, exist_ok=True)
         is_new = not os.path.exists(self.base_table_path)
 
-        # Reconstruir dict con los nombres EXACTOS del CSV (self.all_columns)
-        # y sus valores originales (no los normalizados internos)
-        row = {k: record_dict.get(k, "") for k in self.all_columns}
-
         with open(self.base_table_path, "a", newline="", encoding="utf-8") as f:
-            writer = csv.DictWriter(f, fieldnames=self.all_columns)
+            writer = csv.writer(f)
             if is_new:
-                writer.writeheader()
-            writer.writerow(row)
+                writer.writerow(self.all_columns)
+            writer.writerow([_s(v) for v in values])
 
         print("[OK] Registro insertado en índices y CSV base.")
 
@@ -626,6 +737,7 @@ class IndexManager:
         import traceback
 
         rid = int(record.restaurant_id)
+        self._id_neg_cache.pop(rid, None)
         print(f"\n[INSERT DEBUG] === Iniciando inserción global para ID={rid} ({record.name}, {record.city}) ===")
 
         # 🔒 Verificar duplicado global por Restaurant ID
@@ -645,7 +757,9 @@ class IndexManager:
                 "City": record.city,
                 "Rating": record.aggregate_rating,
                 "Longitude": record.longitude,
-                "Latitude": record.latitude
+                "Latitude": record.latitude,
+                "Average Cost for two": getattr(record, "avg_cost_for_two", 0),
+                "Votes": getattr(record, "votes", 0)
             })
             print("[OK] HASH completado.")
 
@@ -656,7 +770,7 @@ class IndexManager:
                 "City": record.city,
                 "Aggregate_rating": record.aggregate_rating
             })
-            self.rtree.save()
+            self.rtree.flush()
             print("[OK] RTREE completado.")
 
             print("[4] → Insertando en AVL...")
@@ -670,6 +784,7 @@ class IndexManager:
                 "aggregate_rating": record.aggregate_rating,
                 "votes": getattr(record, "votes", 0)
             })
+            self.avl.flush()
             print("[OK] AVL completado.")
 
             print("[5] → Insertando en B+TREE...")
@@ -719,7 +834,7 @@ class IndexManager:
             # --- RTREE ---
             try:
                 self.rtree.remove_point_by_id(rid)
-                self.rtree.save()
+                self.rtree.flush()
             except Exception as e:
                 print(f"[RTree-ERROR] delete: {e}")
 
@@ -752,7 +867,7 @@ class IndexManager:
         except Exception:
             print(" HASH     : (no disponible)")
         try:
-            print(f" RTree    : {len(self.rtree._rows)} puntos")
+            print(f" RTree    : {len(self.rtree)} puntos")
         except Exception:
             print(" RTree    : (no disponible)")
         try:
@@ -785,7 +900,7 @@ class IndexManager:
     def close(self):
         """Cierra estructuras y guarda metadatos."""
         try:
-            if hasattr(self, "rtree") and self.rtree:
+            if getattr(self, "rtree", None) is not None:
                 self.rtree.close()
         except Exception:
             print("[WARN] Fallo al cerrar RTree.")
@@ -796,6 +911,12 @@ class IndexManager:
         except Exception:
             pass
 
+        try:
+            if getattr(self, "avl", None):
+                self.avl.close()
+        except Exception:
+            print("[WARN] Fallo al cerrar AVL.")
+
         print("[INFO] Índices cerrados correctamente.")
 
     def force_search(self, forced_index, cond):
@@ -1,7 +1,7 @@
 from dataclasses import dataclass
 from typing import List, Optional, Any
 
-@dataclass
+@dataclass(slots=True)
 class CreateTableNode:
     """Nodo que representa una sentencia CREATE TABLE."""
     table_name: str
@@ -12,7 +12,7 @@ class CreateTableNode:
 
 # ----------------------------------------------------------
 
-@dataclass
+@dataclass(slots=True)
 class ColumnDefNode:
     """Definición de una columna dentro de CREATE TABLE."""
     name: str
@@ -27,13 +27,15 @@ class ColumnDefNode:
 
 # ----------------------------------------------------------
 
-@dataclass
+@dataclass(slots=True)
 class CreateFromFileNode:
     """Sentencia CREATE TABLE ... FROM FILE ... [USING ...]"""
-    def __init__(self, table_name, file_path, using_indexes=None):
-        self.table_name = table_name
-        self.file_path = file_path
-        self.using_indexes = using_indexes or []
+    table_name: str
+    file_path: str
+    using_indexes: Optional[List[str]] = None
+
+    def __post_init__(self):
+        self.using_indexes = self.using_indexes or []
 
     def __repr__(self):
         indexes = ", ".join(self.using_indexes) if self.using_indexes else "ALL"
@@ -41,7 +43,7 @@ class CreateFromFileNode:
 
 # ----------------------------------------------------------
 
-@dataclass
+@dataclass(slots=True)
 class InsertNode:
     """Sentencia INSERT INTO ... VALUES (...)"""
     table_name: str
@@ -52,7 +54,7 @@ class InsertNode:
 
 # ----------------------------------------------------------
 
-@dataclass
+@dataclass(slots=True)
 class DeleteNode:
     """Sentencia DELETE FROM ... WHERE ..."""
     table_name: str
@@ -63,12 +65,18 @@ class DeleteNode:
 
 # ----------------------------------------------------------
 
-@dataclass
+@dataclass(slots=True)
 class SelectNode:
     """Sentencia SELECT común."""
     table: str
     columns: List[str]
     condition: Optional[Any] = None
+    using_index: Optional[str] = None
+
+    @property
+    def table_name(self):
+        # Mismo nombre que en SelectWhereNode para que el motor lea ambos nodos igual
+        return self.table
 
     def __repr__(self):
         cond = f" WHERE {self.condition}" if self.condition else ""
@@ -76,7 +84,7 @@ class SelectNode:
 
 # ----------------------------------------------------------
 
-@dataclass
+@dataclass(slots=True)
 class SelectSpatialNode:
     """Sentencia SELECT espacial (R-Tree) o condición espacial."""
     table: Optional[str]      # puede ser None si viene de WHERE ... IN (...)
@@ -90,9 +98,10 @@ class SelectSpatialNode:
 
 # ----------------------------------------------------------
 # ⚙️ 2. Condiciones y expresiones
+# (todos los nodos usan slots=True: el motor lee sus campos directamente)
 # ----------------------------------------------------------
 
-@dataclass
+@dataclass(slots=True)
 class ConditionNode:
     """Condición general de tipo A op B (ej. id = 5, edad > 20)."""
     attribute: str
@@ -104,7 +113,7 @@ class ConditionNode:
 
 # ----------------------------------------------------------
 
-@dataclass
+@dataclass(slots=True)
 class BetweenConditionNode:
     """Condición tipo BETWEEN (ej. nombre BETWEEN 'A' AND 'M')."""
     attribute: str
@@ -118,7 +127,7 @@ class BetweenConditionNode:
 #  3. Utilidades
 # ----------------------------------------------------------
 
-@dataclass
+@dataclass(slots=True)
 class ExplainNode:
     analyze: bool
     select_stmt: Any
@@ -129,7 +138,7 @@ class ExplainNode:
 
 # ----------------------------------------------------------
 
-@dataclass
+@dataclass(slots=True)
 class ValueNode:
     """Nodo genérico para representar valores (números, strings, arrays)."""
     value: Any
@@ -139,7 +148,7 @@ class ValueNode:
 
 # ----------------------------------------------------------
 
-@dataclass
+@dataclass(slots=True)
 class ArrayNode:
     """Nodo que representa listas de valores (ej. coordenadas o arrays)."""
     values: List[Any]
@@ -151,7 +160,7 @@ class ArrayNode:
 # SELECT con condición WHERE
 # ----------------------------------------------------------
 
-@dataclass
+@dataclass(slots=True)
 class SelectWhereNode:
     table_name: str
     columns: Optional[List[str]] = None
@@ -169,7 +178,7 @@ class SelectWhereNode:
 # Condiciones compuestas (AND / OR)
 # ----------------------------------------------------------
 
-@dataclass
+@dataclass(slots=True)
 class ConditionComplexNode:
     """
     Representa una condición compuesta con AND / OR.
@@ -1,3 +1,4 @@
+import functools
 from lark import Lark, Transformer, Token, Tree
 from test_parser.core.parser.ast_nodes import (
     CreateTableNode, ColumnDefNode, CreateFromFileNode,
@@ -6,6 +7,8 @@ from test_parser.core.parser.ast_nodes import (
 )
 from test_parser.core.parser.ast_nodes import ConditionComplexNode
 
+PARSE_CACHE_SIZE = 256
+
 
 class ParserSQL:
     def __init__(self, grammar_path="test_parser/core/parser/grammar_sql.lark"):
@@ -18,6 +21,8 @@ class ParserSQL:
             parser="lalr",
             transformer=SQLTransformer()  # <--- 🔥 Esta línea aplica el transformer
         )
+        # Memo de AST por texto de consulta (los nodos no se modifican al ejecutar)
+        self._parse_memo = functools.lru_cache(maxsize=PARSE_CACHE_SIZE)(self.parse)
 
     def parse(self, query: str):
         """
@@ -27,6 +32,13 @@ class ParserSQL:
         transformer = SQLTransformer()
         return transformer.transform(tree)
 
+    def parse_cached(self, query: str):
+        """
+        Igual que parse(), pero reutiliza el AST si la misma consulta (sin
+        espacios en los extremos) ya se parseó.
+        """
+        return self._parse_memo(query.strip())
+
 
 def _tokval(x):
     if isinstance(x, Token):
@@ -375,4 +387,7 @@ class SQLTransformer(Transformer):
     def COMMENT(self, _):
         return None
 
-
+    # ---------- Script con varias sentencias ----------
+    def start(self, children):
+        # Solo se invoca con 2+ sentencias (?start se inlinea con una sola)
+        return [c for c in children if c is not None]
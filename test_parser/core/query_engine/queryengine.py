@@ -1,10 +1,193 @@
+import functools
+import operator
+import re
+from collections import OrderedDict
+from itertools import islice
+from types import MappingProxyType
+
 from test_parser.core.parser.parser_sql import ParserSQL
 from test_parser.core.parser.ast_nodes import (
     CreateFromFileNode, InsertNode, DeleteNode,
-    SelectNode, SelectWhereNode, ConditionComplexNode, SelectSpatialNode, ExplainNode
+    SelectNode, SelectWhereNode, ConditionComplexNode, SelectSpatialNode, ExplainNode,
+    ConditionNode, BetweenConditionNode
 )
 from test_parser.core.index_manager import IndexManager
-from test_parser.indexes.isam_s.isam import Record
+from test_parser.indexes.isam_s.isam import Record, normalize_text
+from test_parser.indexes.avl.avl_file import as_stored_record
+
+# ======================================================
+# Categorías de atributos (constantes de módulo)
+# ======================================================
+_TEXT_ATTRS = frozenset({"name", "city"})
+_NUMERIC_ATTRS = frozenset({"rating", "votes", "average_cost_for_two"})
+_SCAN_TEXT_ATTRS = frozenset({
+    "rating_text", "cuisines", "currency", "rating_color", "address", "locality", "locality_verbose"
+})
+_AVL_PLAN_ATTRS = _NUMERIC_ATTRS | {"aggregate_rating"}
+_SPATIAL_ATTRS = frozenset({"coords", "longitude", "latitude"})
+
+# Atributo → tipo de acceso al ejecutar (los atributos con "id" usan "ID")
+_ATTR_INDEX = {
+    **dict.fromkeys(_TEXT_ATTRS, "ISAM"),
+    **dict.fromkeys(_SCAN_TEXT_ATTRS, "SCAN"),
+    **dict.fromkeys(_NUMERIC_ATTRS, "AVL"),
+}
+# Atributo → tipo de acceso mostrado por EXPLAIN
+_PLAN_ATTR_INDEX = {
+    **dict.fromkeys(_TEXT_ATTRS, "ISAM"),
+    **dict.fromkeys(_AVL_PLAN_ATTRS, "AVL"),
+    **dict.fromkeys(_SPATIAL_ATTRS, "RTREE"),
+}
+# Tipo de acceso → (índice usado, plan) para EXPLAIN
+_EXPLAIN_PLANS = {
+    "ISAM": ("ISAM", "Index Scan using ISAM on {}"),
+    "AVL": ("AVL", "Index Scan using AVL on {}"),
+    "ID": ("B+Tree", "Index Scan using B+Tree on {}"),
+    "RTREE": ("R-Tree", "Spatial Index Scan using R-Tree on {}"),
+    None: ("Sequential", "Seq Scan on {}"),
+}
+
+
+def _attr_index(attr, table):
+    kind = table.get(attr)
+    if kind is None and "id" in attr:
+        kind = "ID"
+    return kind
+
+
+# Selectividad estimada por atributo (fracción de filas que pasan el filtro)
+_SELECTIVITY = MappingProxyType({
+    "id": 0.01,
+    "restaurant_id": 0.01,
+    "name": 0.05,
+    "city": 0.10,
+    "rating": 0.25,
+    "votes": 0.25,
+    "average_cost_for_two": 0.15,
+})
+_DEFAULT_SELECTIVITY = 0.20
+
+# Modelo de costos (I/O + CPU) para _estimate_cost
+_STARTUP_COSTS = MappingProxyType({
+    "ISAM": 0.10,
+    "AVL": 0.20,
+    "HASH": 0.05,
+    "BTREE": 0.15,
+    "RTREE": 0.25,
+    "AUTO": 0.12,
+})
+_IO_COST_PER_PAGE = 0.002  # ms por página (simulado)
+_CPU_COST_PER_TUPLE = 0.0005  # ms por fila
+
+# Claves con las que cada atributo lógico aparece en los registros (dicts o Record)
+_FIELD_ALIASES = {
+    "id": ("restaurant_id",),
+    "name": ("restaurant_name", "name"),
+    "city": ("city",),
+    "rating": ("aggregate_rating",),
+    "aggregate_rating": ("aggregate_rating",),
+    "votes": ("votes",),
+    "average_cost_for_two": ("average_cost_for_two", "avg_cost_for_two"),
+}
+_COMPARE_OPS = {
+    "=": operator.eq,
+    ">": operator.gt,
+    "<": operator.lt,
+    ">=": operator.ge,
+    "<=": operator.le,
+}
+_MISSING = object()
+
+
+# Costo relativo por tipo de acceso (menor = más barato y selectivo)
+_ACCESS_RANK = {"ID": 0, "ISAM": 1, "RTREE": 1, "AVL": 2, "SCAN": 3}
+
+
+def _access_rank(cond):
+    """Rango de costo de una hoja según su índice; None si no se puede estimar."""
+    if isinstance(cond, SelectSpatialNode):
+        return _ACCESS_RANK["RTREE"]
+    if isinstance(cond, ConditionNode):
+        return _ACCESS_RANK.get(_attr_index(cond.attribute.lower(), _ATTR_INDEX))
+    return None
+
+
+@functools.lru_cache(maxsize=1024)
+def _cost_model(index_type, attr, total_rows, matched_rows):
+    # 1. Selectividad estimada según atributo
+    selectivity = _SELECTIVITY.get(attr, _DEFAULT_SELECTIVITY)
+
+    # 2. Estimar filas esperadas (o usar las reales si ya se conocen, ANALYZE)
+    estimated_rows = matched_rows or int(total_rows * selectivity)
+
+    # 3. Costos proporcionales
+    startup = _STARTUP_COSTS.get(index_type, 0.10)
+    total = startup + (estimated_rows * _CPU_COST_PER_TUPLE) + (estimated_rows * _IO_COST_PER_PAGE)
+
+    return (
+        ("startup_cost", round(startup, 4)),
+        ("total_cost", round(total, 4)),
+        ("selectivity", round(selectivity, 3)),
+        ("estimated_rows", estimated_rows),
+        ("estimated_time", round(total, 4)),
+    )
+
+
+def _id_extractor(sample):
+    """Retorna un extractor de ID especializado según el tipo de `sample`."""
+    if isinstance(sample, dict):
+        if "restaurant_id" in sample:
+            return _RID_ITEMGETTER
+        return lambda r: r.get('restaurant_id')
+    if isinstance(sample, tuple):
+        return _FIRST_ITEMGETTER
+    return lambda r: getattr(r, 'restaurant_id', None)
+
+
+def _cond_key(cond):
+    """
+    Clave canónica (hashable) de un nodo de condición para memoizar subárboles.
+    None si el árbol contiene un tipo de nodo desconocido (no se debe cachear).
+    """
+    if isinstance(cond, ConditionComplexNode):
+        left, right = _cond_key(cond.left), _cond_key(cond.right)
+        if left is None or right is None:
+            return None
+        return (cond.operator, left, right)
+    if isinstance(cond, ConditionNode):
+        return ("ConditionNode", cond.attribute.lower(), cond.operator, repr(cond.value))
+    if isinstance(cond, BetweenConditionNode):
+        return ("BetweenConditionNode", cond.attribute.lower(), repr(cond.value1), repr(cond.value2))
+    if isinstance(cond, SelectSpatialNode):
+        return ("SelectSpatialNode", cond.column, repr(cond.point), repr(cond.radius))
+    return None
+
+
+def _extract_id(record):
+    """Extrae el ID de distintos tipos de registro (dict, tupla o Record)."""
+    if isinstance(record, dict):
+        return record.get('restaurant_id')
+    elif isinstance(record, tuple):
+        # Ejemplo: (6152, #18255654 | Hobing ...)
+        return record[0]
+    elif hasattr(record, 'restaurant_id'):
+        return getattr(record, 'restaurant_id', None)
+    return None
+
+_RID_ITEMGETTER = operator.itemgetter("restaurant_id")
+_FIRST_ITEMGETTER = operator.itemgetter(0)
+
+# Planes AND generados en tiempo de ejecución (solo con varios filtros en línea)
+_CODEGEN_PLANS = True
+_CODEGEN_MIN_FILTERS = 2
+
+# Normalización de SQL para la caché de parseo: respeta literales, quita comentarios
+# y colapsa espacios (las palabras clave de la gramática distinguen mayúsculas)
+_SQL_NORM_RE = re.compile(r'("(?:[^"\\]|\\.)*")|(?:\s|--[^\n]*)+')
+# Separador de sentencias: un ';' solo corta fuera de literales y comentarios '--'
+# (las comillas sueltas se consumen como texto para no perder el resto del script)
+_STMT_RE = re.compile(r'''((?:[^;'"-]|--[^\n]*|-|'[^']*'|"(?:[^"\\]|\\.)*"|['"])+)''')
+_EXPLAIN_CACHE_SIZE = 128
 
 
 class QueryEngine:
@@ -21,6 +204,30 @@ class QueryEngine:
         self.parser = ParserSQL()
         self.index_manager = IndexManager()
 
+        # Tabla de despacho tipo de nodo → manejador (evita la cadena de isinstance)
+        # (ordenada por frecuencia esperada: SELECT, INSERT, DELETE, EXPLAIN, CREATE)
+        self._dispatch = {
+            SelectWhereNode: self._exec_select,
+            SelectNode: self._exec_select,
+            SelectSpatialNode: self._exec_spatial_direct,
+            InsertNode: self._exec_insert,
+            DeleteNode: self._exec_delete,
+            ExplainNode: self._exec_explain,
+            CreateFromFileNode: self._exec_create,
+        }
+
+        # Tipo de acceso (ver _ATTR_INDEX) → búsqueda en IndexManager
+        self._attr_handlers = {
+            "ISAM": self._search_isam,
+            "SCAN": self._search_scan_text,
+            "AVL": self._search_avl,
+            "ID": self._search_id,
+        }
+        # Filtros AND compilados: firma de la consulta → función
+        self._plan_cache = {}
+        # Planes de EXPLAIN por (tabla, índice forzado, condición); LRU
+        self._explain_cache = OrderedDict()
+
     # ------------------------------------------------------
     # para explain
     # ------------------------------------------------------
@@ -30,53 +237,61 @@ class QueryEngine:
         Si analyze=True, ejecuta realmente la consulta y mide el tiempo.
         """
         import time
-        cond = getattr(select_stmt, "condition", None)
-        forced_index = getattr(select_stmt, "using_index", None)
-        table_name = getattr(select_stmt, "table_name", "")
-
-        # --- PLAN lógico: elegir índice apropiado ---
-        plan_info = {
-            "plan": None,
-            "filter": str(cond) if cond else "N/A",
-            "index_used": None,
-            "estimated_cost": 0.0,
-            "rows": 0,
-            "execution_time_ms": 0.0
-        }
-
-        start_time = time.time()
-
-        # --- Determinar índice usado ---
-        if forced_index:
-            plan_info["index_used"] = forced_index
-            plan_info["plan"] = f"Index Scan using {forced_index} on {table_name}"
-        elif cond and hasattr(cond, "attribute"):
-            attr = cond.attribute.lower()
-            if attr in ["city", "name"]:
-                plan_info["index_used"] = "ISAM"
-                plan_info["plan"] = f"Index Scan using ISAM on {table_name}"
-            elif attr in ["rating", "aggregate_rating", "votes", "average_cost_for_two"]:
-                plan_info["index_used"] = "AVL"
-                plan_info["plan"] = f"Index Scan using AVL on {table_name}"
-            elif "id" in attr:
-                plan_info["index_used"] = "B+Tree"
-                plan_info["plan"] = f"Index Scan using B+Tree on {table_name}"
-            elif attr in ["coords", "longitude", "latitude"]:
-                plan_info["index_used"] = "R-Tree"
-                plan_info["plan"] = f"Spatial Index Scan using R-Tree on {table_name}"
+        cond = select_stmt.condition
+        forced_index = select_stmt.using_index
+        table_name = select_stmt.table_name
+
+        plan_start_ns = time.perf_counter_ns()
+
+        # --- PLAN lógico: reutilizar si ya se planificó la misma consulta ---
+        cond_key = _cond_key(cond) if cond else ()
+        key = (table_name, forced_index, cond_key) if cond_key is not None else None
+        cached = self._explain_cache.get(key) if key is not None else None
+        if cached is not None:
+            self._explain_cache.move_to_end(key)
+            plan_info = dict(cached)
+            # El texto del filtro sale de la consulta actual, no de la que llenó la caché
+            plan_info["filter"] = str(cond) if cond else "N/A"
+            print("[DEBUG] Plan reutilizado desde caché de EXPLAIN")
+        else:
+            plan_info = {
+                "plan": None,
+                "filter": str(cond) if cond else "N/A",
+                "index_used": None,
+                "estimated_cost": 0.0,
+                "rows": 0,
+                "planning_time_ms": 0.0,
+                "execution_time_ms": 0.0
+            }
+
+            # --- Determinar índice usado ---
+            if forced_index:
+                plan_info["index_used"] = forced_index
+                plan_info["plan"] = f"Index Scan using {forced_index} on {table_name}"
+            elif cond and hasattr(cond, "attribute"):
+                kind = _attr_index(cond.attribute.lower(), _PLAN_ATTR_INDEX)
+                index_used, plan = _EXPLAIN_PLANS.get(kind, _EXPLAIN_PLANS[None])
+                plan_info["index_used"] = index_used
+                plan_info["plan"] = plan.format(table_name)
             else:
-                plan_info["index_used"] = "Sequential"
                 plan_info["plan"] = f"Seq Scan on {table_name}"
-        else:
-            plan_info["plan"] = f"Seq Scan on {table_name}"
-            plan_info["index_used"] = "Sequential"
+                plan_info["index_used"] = "Sequential"
+
+            if key is not None:
+                self._explain_cache[key] = dict(plan_info)
+                if len(self._explain_cache) > _EXPLAIN_CACHE_SIZE:
+                    self._explain_cache.popitem(last=False)
+
+        # Tiempo por fase (reloj monotónico de alta resolución)
+        plan_info["planning_time_ms"] = (time.perf_counter_ns() - plan_start_ns) / 1_000_000
 
         # --- Si es EXPLAIN ANALYZE, ejecutar realmente ---
         results = []
         if analyze:
+            exec_start_ns = time.perf_counter_ns()
             results = self._evaluate_condition(cond) if cond else []
             plan_info["rows"] = len(results)
-            plan_info["execution_time_ms"] = (time.time() - start_time) * 1000
+            plan_info["execution_time_ms"] = (time.perf_counter_ns() - exec_start_ns) / 1_000_000
             plan_info["estimated_cost"] = round(plan_info["execution_time_ms"] * 0.02, 4)  # ejemplo simple
 
         # --- Salida tipo PostgreSQL ---
@@ -88,7 +303,8 @@ class QueryEngine:
         if analyze:
             print(f"  Estimated Cost: {plan_info['estimated_cost']} ms")
             print(f"  Rows Returned: {plan_info['rows']}")
-            print(f"  Execution Time: {plan_info['execution_time_ms']:.2f} ms")
+            print(f"  Planning Time: {plan_info['planning_time_ms']:.3f} ms")
+            print(f"  Execution Time: {plan_info['execution_time_ms']:.3f} ms")
         else:
             print("  (Analysis not executed)")
         print("-" * 60)
@@ -103,14 +319,27 @@ class QueryEngine:
     def run_script(self, script: str):
         """
         Ejecuta múltiples sentencias SQL en un mismo bloque.
-        Separa por ';' en lugar de por líneas para evitar errores
-        cuando WHERE o AND están en líneas distintas.
+        Primero intenta parsear el script completo en una sola llamada;
+        si el parser lo rechaza, separa por ';' y ejecuta sentencia por sentencia.
         """
-        # Separar sentencias completas por ';'
-        statements = [s.strip() for s in script.strip().split(";") if s.strip()]
+        try:
+            stmts = self._parse_cached(script)
+        except Exception as e:
+            print(f"[DEBUG] Parseo del script completo falló ({e}); separando por ';'")
+            stmts = None
+
+        if stmts is not None:
+            for stmt in stmts:
+                try:
+                    self._execute(stmt)
+                except Exception as e:
+                    print(f"[ERROR] {e}")
+            return
 
-        for stmt in statements:
-            if stmt.startswith("--") or not stmt:
+        # Una sola pasada sobre el script; se descartan fragmentos vacíos o solo comentarios
+        for m in _STMT_RE.finditer(script):
+            stmt = self._normalize_sql(m.group(1))
+            if not stmt:
                 continue
             try:
                 self.run_query(stmt)
@@ -118,198 +347,214 @@ class QueryEngine:
                 print(f"[ERROR] {e}")
 
     def run_query(self, query: str):
-        result = self.parser.parse(query)
-        stmts = result if isinstance(result, (list, tuple)) else [result]
-        for stmt in stmts:
+        for stmt in self._parse_cached(query):
             self._execute(stmt)
 
-    def _execute(self, stmt):
-        # ======================================================
-        # CREATE TABLE ... FROM FILE ...
-        # ======================================================
-        if isinstance(stmt, CreateFromFileNode):
-            print(f"\n[CREATE FROM FILE] {stmt.file_path}")
-            self.index_manager.rebuild_from_csv(
-                stmt.file_path,
-                limit=50,
-                using_indexes=stmt.using_indexes
-            )
-            built = stmt.using_indexes or ["ISAM", "HASH", "AVL", "B+TREE", "RTREE"]
-            print(f"[OK] Índices creados: {', '.join(built)}.")
-            self.index_manager.summary()
-            return
+    # ------------------------------------------------------
+    # Caché de parseo
+    # ------------------------------------------------------
+    @staticmethod
+    def _normalize_sql(sql: str) -> str:
+        return _SQL_NORM_RE.sub(lambda m: m.group(1) or " ", sql).strip()
 
-        # ======================================================
-        # INSERT INTO ...
-        # ======================================================
-        elif isinstance(stmt, InsertNode):
-            print(f"[INSERT] Ejecutando INSERT en tabla {stmt.table_name}...")
-            if hasattr(self.index_manager, "insert_full"):
-                # Los valores vienen ya parseados como lista en stmt.values
-                values = stmt.values
-                if not values or len(values) != len(self.index_manager.all_columns):
-                    print(
-                        f"[WARN] INSERT con {len(values)} valores, se esperaban {len(self.index_manager.all_columns)}")
-                record_dict = dict(zip(self.index_manager.all_columns, values))
-                self.index_manager.insert_full(record_dict)
-                print("[OK] Registro insertado exitosamente en archivo base e índices.")
-            else:
-                print("[ERROR] insert_full() no disponible en IndexManager.")
+    def _parse_cached(self, sql: str):
+        """
+        Retorna la tupla de sentencias AST del SQL normalizado; el memo de AST
+        es el de ParserSQL.parse_cached (una sola caché de parseo).
+        """
+        result = self.parser.parse_cached(self._normalize_sql(sql))
+        return tuple(result) if isinstance(result, (list, tuple)) else (result,)
 
-            return
+    def _execute(self, stmt):
+        # Despacho directo por tipo exacto de nodo (los nodos AST son clases hoja)
+        handler = self._dispatch.get(type(stmt))
+        if handler is not None:
+            return handler(stmt)
+        print(f"[WARN] Nodo no soportado: {stmt}")
 
-        # ======================================================
-        # DELETE FROM ...
-        # ======================================================
-        if isinstance(stmt, DeleteNode):
-            print(f"\n[DELETE FROM {stmt.table_name}]")
-            cond = stmt.condition
-            if cond is None:
-                print("[WARN] DELETE sin condición no permitido.")
-                return
-
-            # Por ID → eliminar en todas las estructuras
-            if hasattr(cond, "attribute") and "id" in cond.attribute.lower():
-                rid = int(cond.value)
-                print(f"[DEBUG] Eliminando registro con ID={rid}...")
-                self.index_manager.delete(restaurant_id=rid)
-                print("[OK] Eliminación completada en ISAM, AVL, HASH, B+Tree y R-Tree.")
-            else:
-                print(f"[WARN] Condición no soportada para DELETE: {cond}")
+    # ======================================================
+    # EXPLAIN [ANALYZE]
+    # ======================================================
+    def _exec_explain(self, stmt):
+        print(f"\n[EXPLAIN MODE ACTIVATED] → ANALYZE={stmt.analyze}")
+        return self._execute_explain(stmt.select_stmt, stmt.analyze)
+
+    # ======================================================
+    # CREATE TABLE ... FROM FILE ...
+    # ======================================================
+    def _exec_create(self, stmt):
+        print(f"\n[CREATE FROM FILE] {stmt.file_path}")
+        self._explain_cache.clear()
+        self.index_manager.rebuild_from_csv(
+            stmt.file_path,
+            limit=50,
+            using_indexes=stmt.using_indexes
+        )
+        built = stmt.using_indexes or ["ISAM", "HASH", "AVL", "B+TREE", "RTREE"]
+        print(f"[OK] Índices creados: {', '.join(built)}.")
+        self.index_manager.summary()
+
+    # ======================================================
+    # INSERT INTO ...
+    # ======================================================
+    def _exec_insert(self, stmt):
+        print(f"[INSERT] Ejecutando INSERT en tabla {stmt.table_name}...")
+        self._explain_cache.clear()
+        if hasattr(self.index_manager, "insert_positional"):
+            # Los valores vienen ya parseados como lista en stmt.values (orden de all_columns)
+            values = stmt.values
+            if not values or len(values) != len(self.index_manager.all_columns):
+                print(
+                    f"[WARN] INSERT con {len(values)} valores, se esperaban {len(self.index_manager.all_columns)}")
+            self.index_manager.insert_positional(tuple(values))
+            print("[OK] Registro insertado exitosamente en archivo base e índices.")
+        else:
+            print("[ERROR] insert_positional() no disponible en IndexManager.")
+
+    # ======================================================
+    # DELETE FROM ...
+    # ======================================================
+    def _exec_delete(self, stmt):
+        print(f"\n[DELETE FROM {stmt.table_name}]")
+        self._explain_cache.clear()
+        cond = stmt.condition
+        if cond is None:
+            print("[WARN] DELETE sin condición no permitido.")
             return
 
-        # ======================================================
-        # EXPLAIN [ANALYZE]
-        # ======================================================
-        if isinstance(stmt, ExplainNode):
-            print(f"\n[EXPLAIN MODE ACTIVATED] → ANALYZE={stmt.analyze}")
-            select_stmt = stmt.select_stmt
-            analyze = stmt.analyze
-            return self._execute_explain(select_stmt, analyze)
-
+        # Por ID → eliminar en todas las estructuras
+        if hasattr(cond, "attribute") and "id" in cond.attribute.lower():
+            rid = int(cond.value)
+            print(f"[DEBUG] Eliminando registro con ID={rid}...")
+            self.index_manager.delete(restaurant_id=rid)
+            print("[OK] Eliminación completada en ISAM, AVL, HASH, B+Tree y R-Tree.")
+        else:
+            print(f"[WARN] Condición no soportada para DELETE: {cond}")
 
-        if isinstance(stmt, ExplainNode):
-            print("\n[EXPLAIN MODE ACTIVATED]")
-            select_stmt = stmt.select_stmt
-            analyze = stmt.analyze
-            return self._execute_explain(select_stmt, analyze)
+    # ======================================================
+    # SELECT ...
+    # ======================================================
+    def _exec_select(self, stmt):
+        self._last_select_stmt = stmt
+        table_name = stmt.table_name
+        print(f"\n[SELECT FROM {table_name}]")
 
-        # ======================================================
-        # SELECT ...
-        # ======================================================
+        cond = stmt.condition
+        # Detectar índice forzado por el usuario
+        forced_index = stmt.using_index
+        print(f"[DEBUG] Nodo SELECT detectado → using_index={forced_index}")
 
-        if isinstance(stmt, (SelectNode, SelectWhereNode)):
-            self._last_select_stmt = stmt
-            table_name = getattr(stmt, "table_name", getattr(stmt, "table", ""))
-            print(f"\n[SELECT FROM {table_name}]")
+        if forced_index:
+            self.index_manager.forced_index = forced_index
+            print(f"[FORCE INDEX] Usuario especificó usar {forced_index}")
+        else:
+            self.index_manager.forced_index = None
 
-            cond = getattr(stmt, "condition", None)
-            # Detectar índice forzado por el usuario
-            forced_index = getattr(stmt, "using_index", None)
-            print(f"[DEBUG] Nodo SELECT detectado → using_index={getattr(stmt, 'using_index', None)}")
+        if cond is None:
+            print("[INFO] SELECT * no implementado. Usa WHERE.")
+            return
 
-            if forced_index:
-                self.index_manager.forced_index = forced_index
-                print(f"[FORCE INDEX] Usuario especificó usar {forced_index}")
-            else:
-                self.index_manager.forced_index = None
+        if isinstance(cond, ConditionComplexNode):
+            print("[DEBUG] Evaluando condición compuesta (AND / OR)...")
+            memo = {}
+            results = self._evaluate_condition_fused(cond, memo)
+            if results is None:
+                results = self._evaluate_condition(cond, memo)
+            return self._print_results(results, "Combinado (AND/OR)")
 
-            if cond is None:
-                print("[INFO] SELECT * no implementado. Usa WHERE.")
-                return
-
-            if isinstance(cond, ConditionComplexNode):
-                print("[DEBUG] Evaluando condición compuesta (AND / OR)...")
-                results = self._evaluate_condition(cond)
-                return self._print_results(results, "Combinado (AND/OR)")
-
-            if isinstance(cond, SelectSpatialNode):
-                x, y = cond.point
-                r = cond.radius
-                print(f"[DEBUG] Búsqueda espacial con R-Tree: ({x}, {y}) ± {r} km")
-                results = self.index_manager.search_near(x, y, r)
-                return self._print_results(results, "R-Tree")
-
-            results = self._evaluate_condition(cond)
-            return self._print_results(results, "Condición simple")
-
-        if isinstance(stmt, SelectSpatialNode):
-            print(f"\n[SELECT SPATIAL WHERE {stmt.column}]")
-            x, y = stmt.point
-            r = stmt.radius
+        if isinstance(cond, SelectSpatialNode):
+            x, y = cond.point
+            r = cond.radius
+            print(f"[DEBUG] Búsqueda espacial con R-Tree: ({x}, {y}) ± {r} km")
             results = self.index_manager.search_near(x, y, r)
-            return self._print_results(results, "R-Tree Direct")
-        print(f"[WARN] Nodo no soportado: {stmt}")
+            return self._print_results(results, "R-Tree")
+
+        results = self._evaluate_condition(cond)
+        return self._print_results(results, "Condición simple")
+
+    def _exec_spatial_direct(self, stmt):
+        print(f"\n[SELECT SPATIAL WHERE {stmt.column}]")
+        x, y = stmt.point
+        r = stmt.radius
+        results = self.index_manager.search_near(x, y, r)
+        return self._print_results(results, "R-Tree Direct")
 
-    def _evaluate_condition(self, cond):
+    def _evaluate_condition(self, cond, _memo=None):
         """
         Evalúa recursivamente condiciones simples y compuestas (AND / OR),
         combinando resultados de distintos índices (ISAM, AVL, B+Tree, R-Tree).
+        Las subcondiciones idénticas se evalúan una sola vez por consulta.
         """
-        from test_parser.core.parser.ast_nodes import (
-            ConditionComplexNode, ConditionNode, BetweenConditionNode, SelectSpatialNode
-        )
-
+        if _memo is None:
+            _memo = {}
+        key = _cond_key(cond)
+        if key is None:  # nodo desconocido: se evalúa sin memoizar
+            return self._evaluate_condition_uncached(cond, _memo)
+        if key in _memo:
+            print(f"[DEBUG] Subcondición reutilizada: {cond}")
+            return _memo[key]
+        result = self._evaluate_condition_uncached(cond, _memo)
+        _memo[key] = result
+        return result
+
+    def _evaluate_condition_uncached(self, cond, memo):
         # ==============================
         # (A AND B), (A OR B), o anidada
         # ==============================
         if isinstance(cond, ConditionComplexNode):
-            left_results = self._evaluate_condition(cond.left)
-            right_results = self._evaluate_condition(cond.right)
-
-            # --- Función auxiliar para extraer el ID de distintos tipos de registro
-            def extract_id(record):
-                if isinstance(record, dict):
-                    return record.get('restaurant_id')
-                elif isinstance(record, tuple):
-                    # Ejemplo: (6152, #18255654 | Hobing ...)
-                    return record[0]
-                elif hasattr(record, 'restaurant_id'):
-                    return getattr(record, 'restaurant_id', None)
-                return None
+            left, right = cond.left, cond.right
+            swapped = False
+            # AND: evaluar primero el lado con acceso más barato/selectivo
+            if cond.operator == "AND":
+                lr, rr = _access_rank(left), _access_rank(right)
+                if lr is not None and rr is not None and rr < lr:
+                    left, right = right, left
+                    swapped = True
+
+            left_results = self._evaluate_condition(left, memo)
+
+            # AND con un lado vacío → el otro lado no aporta nada
+            if cond.operator == "AND" and not left_results:
+                print("[DEBUG] AND: lado izquierdo vacío → se omite el derecho")
+                return []
 
-            # --- Crear conjuntos de IDs
-            left_ids = {extract_id(r) for r in left_results if extract_id(r) is not None}
-            right_ids = {extract_id(r) for r in right_results if extract_id(r) is not None}
+            right_results = self._evaluate_condition(right, memo)
+
+            # Extractor de ID especializado una vez por lista (cada índice devuelve un solo formato)
+            lx = _id_extractor(left_results[0]) if left_results else _extract_id
+            rx = _id_extractor(right_results[0]) if right_results else _extract_id
 
             print("[DEBUG] LEFT sample:", left_results[:3])
             print("[DEBUG] RIGHT sample:", right_results[:3])
 
+            if cond.operator not in ("AND", "OR"):
+                print(f"[WARN] Operador lógico desconocido: {cond.operator}")
+                return []
+
+            # Una pasada por lado: mapas ID → registro, luego álgebra de claves
+            left_map = self._build_id_map(left_results, lx)
+            right_map = self._build_id_map(right_results, rx)
+
             # ==============================
             # AND -> intersección lógica
             # ==============================
             if cond.operator == "AND":
-                combined_ids = left_ids & right_ids
+                # Como en OR, gana el registro del lado derecho de la consulta
+                # (sin importar cuál se evaluó primero): un solo formato de fila
+                winner = left_map if swapped else right_map
+                ids = left_map.keys() & right_map.keys()
+                combined = [winner[rid] for rid in left_map if rid in ids]
                 print(
-                    f"[DEBUG] AND combinó {len(left_results)} ∩ {len(right_results)} → {len(combined_ids)} resultado(s)")
-
-                # Crear mapa para acceder rápido por ID
-                all_results = {}
-                for r in left_results + right_results:
-                    rid = extract_id(r)
-                    if rid is not None:
-                        all_results[rid] = r
-
-                # Filtrar resultados finales por los IDs combinados
-                filtered = [all_results[rid] for rid in combined_ids if rid in all_results]
-                return filtered
+                    f"[DEBUG] AND combinó {len(left_results)} ∩ {len(right_results)} → {len(combined)} resultado(s)")
+                return combined
 
             # ==============================
             # OR -> unión lógica
             # ==============================
-            elif cond.operator == "OR":
-                all_results = {}
-                for r in left_results + right_results:
-                    rid = extract_id(r)
-                    if rid is not None:
-                        all_results[rid] = r
-                print(
-                    f"[DEBUG] OR combinó {len(left_results)} ∪ {len(right_results)} → {len(all_results)} resultado(s)")
-                return list(all_results.values())
-
-            else:
-                print(f"[WARN] Operador lógico desconocido: {cond.operator}")
-                return []
+            merged = {**left_map, **right_map}
+            print(
+                f"[DEBUG] OR combinó {len(left_results)} ∪ {len(right_results)} → {len(merged)} resultado(s)")
+            return list(merged.values())
 
         # Sobrescribir elección si el usuario forzó un índice
         forced = getattr(self.index_manager, "forced_index", None)
@@ -340,53 +585,9 @@ class QueryEngine:
         # ==============================
         if isinstance(cond, ConditionNode):
             attr = cond.attribute.lower()
-            op = cond.operator
-            val = cond.value
-
-            # ISAM -> búsqueda textual
-            if attr in ["name", "city"]:
-                name = val if attr == "name" else ""
-                city = val if attr == "city" else ""
-                print(f"[PLAN] Usando ISAM para búsqueda por texto ({attr} = '{val}')")
-                return self.index_manager.search_by_name(name.strip(), city.strip())
-
-            # 🔹 TEXTO genérico (sin índice) → scan secuencial sobre páginas ISAM
-            elif attr in ["rating_text", "cuisines", "currency", "rating_color", "address", "locality",
-                          "locality_verbose"]:
-                print(f"[PLAN] Búsqueda secuencial (texto) para {attr} {op} '{val}'")
-                try:
-                    return self.index_manager.search_text(attr, str(val), op or "=")
-                except Exception as e:
-                    print(f"[WARN] Error en búsqueda textual genérica: {e}")
-                    return []
-
-            # AVL -> atributos numéricos
-            elif attr in ["rating", "votes", "average_cost_for_two"]:
-                try:
-                    value = float(val)
-                    print(f"[PLAN] Usando AVL.search_comparison() para {attr} {op} {value}")
-                    return self.index_manager.search_comparison(attr, op, value)
-                except Exception as e:
-                    print(f"[WARN] Error en búsqueda numérica ({attr} {op} {val}): {e}")
-                    return []
-
-            # ID -> AVL -> Hash -> B+Tree
-            elif "id" in attr:
-                try:
-                    rid = int(val)
-                    print(f"[PLAN] Búsqueda jerárquica ID={rid} → AVL → Hash → B+Tree")
-                    res = self.index_manager.search_by_id(rid)
-                    if res:
-                        return res
-                    row = self.index_manager.hash.search(rid)
-                    if row:
-                        return [row]
-                    valb = self.index_manager.bpt.search(rid)
-                    if valb:
-                        return [{"restaurant_id": rid, "restaurant_name": valb}]
-                except Exception as e:
-                    print(f"[WARN] Error en búsqueda por ID: {e}")
-                return []
+            handler = self._attr_handlers.get(_attr_index(attr, _ATTR_INDEX))
+            if handler is not None:
+                return handler(attr, cond.operator, cond.value)
 
         if isinstance(cond, BetweenConditionNode):
             attr = cond.attribute.lower()
@@ -401,6 +602,276 @@ class QueryEngine:
         print(f"[WARN] Condición no reconocida: {cond}")
         return []
 
+    # ------------------------------------------------------
+    # Mapas por ID para las combinaciones AND / OR
+    # ------------------------------------------------------
+    @staticmethod
+    def _build_id_map(results, extract_id):
+        """Mapa ID → registro en una sola pasada sobre la lista."""
+        m = {}
+        for r in results:
+            rid = extract_id(r)
+            if rid is not None:
+                m[rid] = r
+        return m
+
+    # ------------------------------------------------------
+    # AND fusionado: un solo índice + filtros en línea
+    # ------------------------------------------------------
+    def _evaluate_condition_fused(self, cond, memo=None):
+        """
+        Evalúa una cadena de AND consultando sólo el índice del predicado más
+        selectivo y aplicando el resto de predicados directamente sobre los
+        campos de cada registro. Retorna None si no aplica (OR, espacial,
+        índice forzado, registros sin el campo o con otro formato que el del
+        AVL) para usar la evaluación clásica; `memo` se comparte con ella.
+        """
+        if getattr(self.index_manager, "forced_index", None):
+            return None
+
+        leaves = []
+        if not self._collect_and_leaves(cond, leaves):
+            return None
+        try:
+            preds = [(leaf, _FIELD_ALIASES[key], self._leaf_predicate(key, leaf)) for key, leaf in leaves]
+        except (KeyError, TypeError, ValueError):
+            return None
+
+        driver = min((p[0] for p in preds), key=self._estimate_selectivity)
+        residual = [(aliases, test) for leaf, aliases, test in preds if leaf is not driver]
+        print(f"[PLAN] AND fusionado: índice para '{driver.attribute}' + {len(residual)} filtro(s) en línea")
+
+        rows = self._evaluate_condition(driver, memo) or []
+        # Solo filas con el formato del AVL (restaurant_*): las de ISAM/B+Tree
+        # perderían columnas en la proyección
+        if rows and not (isinstance(rows[0], dict) and "restaurant_name" in rows[0]):
+            print("[DEBUG] Índice conductor con otro formato de registro → evaluación clásica")
+            return None
+
+        # Plan generado en línea recta para la misma forma de consulta (memoizado por firma)
+        if _CODEGEN_PLANS and rows and len(residual) >= _CODEGEN_MIN_FILTERS:
+            plan = self._compile_residual_plan([(k, l) for k, l in leaves if l is not driver], rows[0])
+            if plan is not None:
+                fn, consts = plan
+                try:
+                    out = fn(rows, *consts)
+                except (KeyError, AttributeError):
+                    print("[DEBUG] Registro sin campo para filtro en línea → evaluación clásica")
+                    return None
+                print(f"[DEBUG] AND fusionado (plan compilado) → {len(out)} resultado(s)")
+                return out
+
+        out = []
+        for rec in rows:
+            for aliases, test in residual:
+                v = self._record_field(rec, aliases)
+                if v is _MISSING:
+                    print("[DEBUG] Registro sin campo para filtro en línea → evaluación clásica")
+                    return None
+                try:
+                    if not test(v):
+                        break
+                except (TypeError, ValueError):
+                    break
+            else:
+                out.append(rec)
+        print(f"[DEBUG] AND fusionado → {len(out)} resultado(s)")
+        return out
+
+    def _compile_residual_plan(self, leaves, sample):
+        """
+        Genera una función sin despacho dinámico que filtra las filas del índice
+        conductor con los predicados restantes. Se memoiza por firma
+        (atributo, operador, campo, formato del registro); los valores literales
+        se pasan como argumentos. Retorna (función, constantes) o None.
+        """
+        is_dict = isinstance(sample, dict)
+        if not is_dict and isinstance(sample, tuple):
+            return None
+
+        sig, tests, consts = [], [], []
+        for key, leaf in leaves:
+            field = next((k for k in _FIELD_ALIASES[key]
+                          if (k in sample if is_dict else hasattr(sample, k))), None)
+            if field is None:
+                return None
+            ref = f"r[{field!r}]" if is_dict else f"r.{field}"
+            i = len(consts)
+            if isinstance(leaf, BetweenConditionNode):
+                cast = int if key == "id" else float
+                consts += [cast(leaf.value1), cast(leaf.value2)]
+                tests.append(f"c{i} <= {cast.__name__}({ref}) <= c{i + 1}")
+                op = "BETWEEN"
+            elif key == "id":
+                consts.append(int(leaf.value))
+                tests.append(f"int({ref}) == c{i}")
+                op = "="
+            elif key == "name":
+                consts.append(normalize_text(str(leaf.value).strip()))
+                tests.append(f"normalize_text(str({ref})) == c{i}")
+                op = "="
+            elif key == "city":
+                consts.append(normalize_text(str(leaf.value).strip()))
+                tests.append(f"normalize_text(str({ref})).startswith(c{i})")
+                op = "PREFIX"
+            else:
+                op = leaf.operator.strip()
+                consts.append(float(leaf.value))
+                tests.append(f"float({ref}) {'==' if op == '=' else op} c{i}")
+            sig.append((key, op, field))
+
+        sig = (is_dict, tuple(sig))
+        fn = self._plan_cache.get(sig)
+        if fn is None:
+            args = "".join(f", c{i}" for i in range(len(consts)))
+            src = (
+                f"def _plan(rows{args}):\n"
+                f"    out = []\n"
+                f"    append = out.append\n"
+                f"    for r in rows:\n"
+                f"        try:\n"
+                f"            if {' and '.join(tests)}:\n"
+                f"                append(r)\n"
+                f"        except (TypeError, ValueError):\n"
+                f"            pass\n"
+                f"    return out\n"
+            )
+            ns = {"normalize_text": normalize_text}
+            exec(compile(src, "<plan AND>", "exec"), ns)
+            fn = self._plan_cache[sig] = ns["_plan"]
+            print(f"[DEBUG] Plan AND compilado para firma {sig}")
+        return fn, consts
+
+    def _collect_and_leaves(self, cond, out):
+        """Aplana una cadena de AND en (atributo lógico, hoja); False si no es fusionable."""
+        if isinstance(cond, ConditionComplexNode):
+            if cond.operator != "AND":
+                return False
+            return self._collect_and_leaves(cond.left, out) and self._collect_and_leaves(cond.right, out)
+        if not isinstance(cond, (ConditionNode, BetweenConditionNode)):
+            return False
+        attr = cond.attribute.lower()
+        if isinstance(cond, ConditionNode) and attr in _TEXT_ATTRS:
+            key = attr
+        elif attr in _NUMERIC_ATTRS:
+            key = attr
+        elif "id" in attr:
+            key = "id"
+        elif isinstance(cond, BetweenConditionNode) and attr in _AVL_PLAN_ATTRS:
+            key = attr
+        else:
+            return False
+        out.append((key, cond))
+        return True
+
+    @staticmethod
+    def _leaf_predicate(key, cond):
+        """Compila una hoja a una función valor → bool con la misma semántica que su índice."""
+        if isinstance(cond, BetweenConditionNode):
+            cast = int if key == "id" else float
+            lo, hi = cast(cond.value1), cast(cond.value2)
+            return lambda v: lo <= cast(v) <= hi
+        if key == "id":
+            rid = int(cond.value)
+            return lambda v: int(v) == rid
+        if key == "name":
+            # ISAM sin ciudad: igualdad exacta normalizada
+            target = normalize_text(str(cond.value).strip())
+            return lambda v: normalize_text(str(v)) == target
+        if key == "city":
+            # ISAM por ciudad: coincidencia por prefijo normalizado
+            prefix = normalize_text(str(cond.value).strip())
+            return lambda v: normalize_text(str(v)).startswith(prefix)
+        cmp = _COMPARE_OPS[cond.operator.strip()]
+        ref = float(cond.value)
+        return lambda v: cmp(float(v), ref)
+
+    @staticmethod
+    def _estimate_selectivity(cond):
+        attr = cond.attribute.lower()
+        if "id" in attr:
+            attr = "id"
+        return _SELECTIVITY.get(attr, _DEFAULT_SELECTIVITY)
+
+    @staticmethod
+    def _record_field(record, aliases):
+        if isinstance(record, dict):
+            for k in aliases:
+                if k in record:
+                    return record[k]
+            return _MISSING
+        if isinstance(record, tuple):
+            return _MISSING
+        for k in aliases:
+            v = getattr(record, k, _MISSING)
+            if v is not _MISSING:
+                return v
+        return _MISSING
+
+    # ------------------------------------------------------
+    # Accesos por tipo de índice (condición simple attr op valor)
+    # ------------------------------------------------------
+    def _search_isam(self, attr, op, val):
+        # ISAM -> búsqueda textual
+        name = val if attr == "name" else ""
+        city = val if attr == "city" else ""
+        print(f"[PLAN] Usando ISAM para búsqueda por texto ({attr} = '{val}')")
+        return self.index_manager.search_by_name(name.strip(), city.strip())
+
+    def _search_scan_text(self, attr, op, val):
+        # 🔹 TEXTO genérico (sin índice) → scan secuencial sobre páginas ISAM
+        print(f"[PLAN] Búsqueda secuencial (texto) para {attr} {op} '{val}'")
+        try:
+            return self.index_manager.search_text(attr, str(val), op or "=")
+        except Exception as e:
+            print(f"[WARN] Error en búsqueda textual genérica: {e}")
+            return []
+
+    def _search_avl(self, attr, op, val):
+        # AVL -> atributos numéricos
+        try:
+            value = float(val)
+            pred = _COMPARE_OPS.get(op.strip())
+            if pred is None:
+                print(f"[WARN] Operador no soportado en búsqueda numérica: {op}")
+                return []
+            print(f"[PLAN] Usando AVL.search_comparison_pred() para {attr} {op} {value}")
+            return self.index_manager.search_comparison_pred(attr, pred, value)
+        except Exception as e:
+            print(f"[WARN] Error en búsqueda numérica ({attr} {op} {val}): {e}")
+            return []
+
+    def _search_id(self, attr, op, val):
+        # ID -> Hash -> AVL -> B+Tree (el acceso O(1) del hash va primero)
+        try:
+            rid = int(val)
+            if self.index_manager.id_known_missing(rid):
+                print(f"[PLAN] ID={rid} ya se buscó sin resultados (caché negativa)")
+                return []
+            print(f"[PLAN] Búsqueda jerárquica ID={rid} → Hash → AVL → B+Tree")
+            row = self.index_manager.hash.search(rid) if self.index_manager.hash else None
+            # Buckets escritos antes de guardar el registro completo no traen Votes:
+            # en ese caso se sigue a search_by_id para no perder columnas
+            if row and "Votes" in row:
+                # Claves y tipos del AVL (float32): el mismo ID responde igual venga de donde venga
+                return [as_stored_record({
+                    "restaurant_id": row.get("Restaurant ID", rid),
+                    "restaurant_name": row.get("Name") or "",
+                    "city": row.get("City") or "",
+                    "longitude": row.get("Longitude") or 0.0,
+                    "latitude": row.get("Latitude") or 0.0,
+                    "average_cost_for_two": row.get("Average Cost for two") or 0,
+                    "aggregate_rating": row.get("Rating") or 0.0,
+                    "votes": row.get("Votes") or 0,
+                })]
+            # search_by_id recorre AVL → B+Tree
+            res = self.index_manager.search_by_id(rid)
+            if res:
+                return res
+        except Exception as e:
+            print(f"[WARN] Error en búsqueda por ID: {e}")
+        return []
+
     def _print_results(self, results, source=""):
         if isinstance(results, dict):
             ...
@@ -411,18 +882,16 @@ class QueryEngine:
         # 🔹 Recuperar columnas seleccionadas (si existen en el último stmt)
         current_stmt = getattr(self, "_last_select_stmt", None)
         selected_cols = getattr(current_stmt, "columns", None)
-        if selected_cols and selected_cols != ["*"]:
-            filtered_results = [
-                {k: v for k, v in r.items() if k in selected_cols} for r in results
-            ]
-        else:
-            filtered_results = results
-
-        print(f"[OK] {len(filtered_results)} resultado(s) encontrados vía {source}:")
-        for r in filtered_results[:8]:
-            print(" ", r)
-        if len(filtered_results) > 8:
-            print(f" ... ({len(filtered_results) - 8} más omitidos)")
+        selected = frozenset(selected_cols) if selected_cols and selected_cols != ["*"] else None
+
+        # Solo se proyectan las filas que se imprimen
+        total = len(results)
+        print(f"[OK] {total} resultado(s) encontrados vía {source}:")
+        for r in islice(results, 8):
+            row = {k: v for k, v in r.items() if k in selected} if selected else r
+            print(" ", row)
+        if total > 8:
+            print(f" ... ({total - 8} más omitidos)")
         print()
 
     def close(self):
@@ -430,58 +899,14 @@ class QueryEngine:
         self.index_manager.close()
         print("[OK] Todas las estructuras cerradas correctamente.")
 
-    def _estimate_cost(self, index_type: str, attr: str, total_rows: int = 10000, matched_rows: int = 0):
+    @staticmethod
+    def _estimate_cost(index_type: str, attr: str, total_rows: int = 10000, matched_rows: int = 0):
         """
         Simula el cálculo de costos como hace PostgreSQL.
         Retorna un diccionario con startup_cost, total_cost, selectivity y estimated_time.
+        Es determinista: mismas entradas → mismo costo (memoizado).
         """
-        import random
-
-        # 1. Costos base (I/O + CPU)
-        startup_costs = {
-            "ISAM": 0.10,
-            "AVL": 0.20,
-            "HASH": 0.05,
-            "BTREE": 0.15,
-            "RTREE": 0.25,
-            "AUTO": 0.12,
-        }
-
-        io_cost_per_page = 0.002  # ms por página (simulado)
-        cpu_cost_per_tuple = 0.0005  # ms por fila
-
-        # 2. Selectividad estimada según atributo
-        selectivity_map = {
-            "id": 0.01,
-            "restaurant_id": 0.01,
-            "name": 0.05,
-            "city": 0.10,
-            "rating": 0.25,
-            "votes": 0.25,
-            "average_cost_for_two": 0.15,
-        }
-
-        selectivity = selectivity_map.get(attr.lower(), 0.20)
-
-        # 3. Estimar filas esperadas
-        estimated_rows = int(total_rows * selectivity)
-
-        # Si ya se conoce el número de filas reales (ANALYZE)
-        if matched_rows:
-            estimated_rows = matched_rows
-
-        # 4. Costos proporcionales
-        startup = startup_costs.get(index_type, 0.10)
-        total = startup + (estimated_rows * cpu_cost_per_tuple) + (estimated_rows * io_cost_per_page)
-        estimated_time = round(random.uniform(total * 0.5, total * 1.5), 4)
-
-        return {
-            "startup_cost": round(startup, 4),
-            "total_cost": round(total, 4),
-            "selectivity": round(selectivity, 3),
-            "estimated_rows": estimated_rows,
-            "estimated_time": estimated_time,
-        }
+        return dict(_cost_model(index_type, attr.lower(), total_rows, matched_rows))
 
     def run_query_with_options(self, sql: str, options: dict):
         """
@@ -495,16 +920,18 @@ class QueryEngine:
         field = options.get("force_field", "").lower()
         mode = options.get("mode", "NORMAL").upper()
 
+        stmts = self._parse_cached(sql)
+
         if mode == "EXPLAIN":
-            result = self.parser.parse(sql)
-            stmt = result[0] if isinstance(result, list) else result
+            stmt = stmts[0]
             if not isinstance(stmt, ExplainNode):
                 stmt = ExplainNode(analyze=False, select_stmt=stmt)
+            if not isinstance(stmt.select_stmt, (SelectWhereNode, SelectNode)):
+                print(f"[WARN] EXPLAIN solo aplica a SELECT: {stmt.select_stmt}")
+                return {"plan": None, "filter": "N/A", "index_used": None}
             return self._execute_explain(stmt.select_stmt, analyze=False)
 
         # En modo normal, ejecuta la query
-        result = self.parser.parse(sql)
-        stmts = result if isinstance(result, (list, tuple)) else [result]
 
         for stmt in stmts:
             # Si hay índice forzado, podemos sobreescribir temporalmente la selección automática
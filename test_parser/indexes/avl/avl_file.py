@@ -1,15 +1,46 @@
 # test_parser/indexes/avl/avl_file.py
+import functools
+import mmap
+from contextlib import contextmanager
+from array import array
+import operator
 import os, struct
+from collections import OrderedDict
 from dataclasses import dataclass
-from typing import Optional, List
+from typing import Iterable, Optional, List
+
+try:
+    import numpy as np
+except ImportError:  # sin NumPy los escaneos recorren registro a registro
+    np = None
 
 # ---------- NODOS (archivo .avl) ----------
-# header: root_pos (int32, -1 si vacío)
+# header: magic (4s), versión (uint32), root_pos (int64, -1 si vacío), node_count (int64)
 # nodo:   id:int32, left:int32, right:int32, height:int32, data_off:int64
 NODE_FMT = struct.Struct("<iiiiq")  # 5 campos
-ROOT_FMT = struct.Struct("<i")
+ROOT_FMT = struct.Struct("<4sIqq")
+AVL_MAGIC = b"AVLN"
+AVL_VERSION = 1
+# Formato anterior (sin magic): solo root_pos (int32); se convierte con migrate_avl_file()
+LEGACY_ROOT_FMT = struct.Struct("<i")
+
+# Métodos y tamaños pre-enlazados (evitan el lookup de atributo en cada lectura)
+NODE_PACK = NODE_FMT.pack
+NODE_PACK_INTO = NODE_FMT.pack_into
+NODE_UNPACK_FROM = NODE_FMT.unpack_from
+NODE_SIZE = NODE_FMT.size
+ROOT_PACK = ROOT_FMT.pack
+ROOT_PACK_INTO = ROOT_FMT.pack_into
+ROOT_UNPACK_FROM = ROOT_FMT.unpack_from
+ROOT_SIZE = ROOT_FMT.size
+
+# Nodos recientes retenidos en memoria por AVLNodesFile (LRU, write-through)
+NODE_CACHE_SIZE = 4096
+
+# El .avl se reserva por bloques; el conteo lógico vive en el header
+NODE_PREALLOC = 4096  # nodos reservados como mínimo en cada crecimiento
 
-@dataclass
+@dataclass(slots=True)
 class AVLNode:
     id: int
     left: int
@@ -21,13 +52,163 @@ class AVLNode:
 # ---------- REGISTROS (archivo .dat) ----------
 # id:int32, name:50s, city:30s, lon:float, lat:float, avg_cost:int32, agg_rating:float, votes:int32
 REC_FMT = struct.Struct("<i50s30sffifi")
+REC_PACK = REC_FMT.pack
+REC_PACK_INTO = REC_FMT.pack_into
+REC_UNPACK_FROM = REC_FMT.unpack_from
+REC_SIZE = REC_FMT.size
+
+# Equivalentes NumPy (mismo layout, sin padding) para lectura/escritura en bloque
+if np is not None:
+    NODE_DTYPE = np.dtype([("id", "<i4"), ("left", "<i4"), ("right", "<i4"),
+                           ("height", "<i4"), ("data_off", "<i8")])
+    REC_DTYPE = np.dtype([("id", "<i4"), ("name", "S50"), ("city", "S30"),
+                          ("lon", "<f4"), ("lat", "<f4"), ("avg_cost", "<i4"),
+                          ("agg_rating", "<f4"), ("votes", "<i4")])
+    assert NODE_DTYPE.itemsize == NODE_FMT.size and REC_DTYPE.itemsize == REC_FMT.size
+
+# Registros que _iter_records decodifica por tramo (ordenados por offset)
+SCAN_CHUNK = 4096
+
+# write_record acumula en memoria hasta este tamaño antes de escribir (write-behind)
+WRITE_BUFFER_SIZE = 1 << 20
 
-def _pad(s: str, n: int) -> bytes:
-    b = s.encode("utf-8", errors="ignore")[:n]
-    return b + b"\x00" * (n - len(b))
+# operador SQL → función (sirve igual para escalares y arreglos NumPy)
+_CMP_OPS = {
+    "=": operator.eq,
+    ">": operator.gt,
+    "<": operator.lt,
+    ">=": operator.ge,
+    "<=": operator.le,
+}
+
+# operador SQL → (cota inferior, cota superior) como lado de np.searchsorted;
+# None = sin cota por ese extremo
+_RANGE_SIDES = {
+    "=": ("left", "right"),
+    ">": ("right", None),
+    ">=": ("left", None),
+    "<": (None, "left"),
+    "<=": (None, "right"),
+}
+_PRED_OPS = {pred: op for op, pred in _CMP_OPS.items()}
+
+# atributo del registro → campo numérico de REC_DTYPE
+_REC_FIELDS = {
+    "restaurant_id": "id",
+    "longitude": "lon",
+    "latitude": "lat",
+    "average_cost_for_two": "avg_cost",
+    "aggregate_rating": "agg_rating",
+    "votes": "votes",
+}
+
+
+def _records_to_dicts(arr) -> List[dict]:
+    """Convierte un arreglo REC_DTYPE al mismo formato de dict que read_record."""
+    return [
+        {
+            "restaurant_id": rid,
+            "restaurant_name": _unpad(name_b),
+            "city": _unpad_city(city_b),
+            "longitude": lon,
+            "latitude": lat,
+            "average_cost_for_two": avg_cost,
+            "aggregate_rating": agg,
+            "votes": votes,
+        }
+        for rid, name_b, city_b, lon, lat, avg_cost, agg, votes in zip(
+            arr["id"].tolist(), arr["name"].tolist(), arr["city"].tolist(),
+            arr["lon"].tolist(), arr["lat"].tolist(), arr["avg_cost"].tolist(),
+            arr["agg_rating"].tolist(), arr["votes"].tolist(),
+        )
+    ]
+
+# Patrón de acceso esperado por cada mapa (madvise/fadvise no existen en Windows)
+# - nodos: saltos padre → hijo dispersos por el archivo
+# - datos: lecturas puntuales (search) salvo durante un escaneo completo
+_MADV_NODES = getattr(mmap, "MADV_RANDOM", None)
+_MADV_DATA = getattr(mmap, "MADV_RANDOM", None)
+_MADV_SCAN = getattr(mmap, "MADV_SEQUENTIAL", None)
+_FADV_RANDOM = getattr(os, "POSIX_FADV_RANDOM", None)
+_FADV_DONTNEED = getattr(os, "POSIX_FADV_DONTNEED", None)
+
+
+def _advise(mm, flag) -> None:
+    if flag is not None and len(mm):
+        try:
+            mm.madvise(flag)
+        except OSError:
+            pass
+
+
+def _fadvise(fh, advice) -> None:
+    if advice is not None:
+        try:
+            os.posix_fadvise(fh.fileno(), 0, 0, advice)
+        except OSError:
+            pass
+
+
+@functools.lru_cache(maxsize=256)
+def _norm_key(k: str) -> str:
+    """Nombre de columna (CSV, parser o frontend) → clave en snake_case."""
+    return k.strip().replace(" ", "_").replace("\ufeff", "").lower()
+
+
+# Ciudades decodificadas (pocas y muy repetidas): bytes del registro → str
+_CITY_CACHE: dict = {}
+_CITY_CACHE_SIZE = 4096
+
+
+def _unpad_city(b: bytes) -> str:
+    city = _CITY_CACHE.get(b)
+    if city is None:
+        if len(_CITY_CACHE) >= _CITY_CACHE_SIZE:
+            _CITY_CACHE.clear()
+        city = _CITY_CACHE[b] = _unpad(b)
+    return city
+
+def _pack_record_into(buf, off: int, rec: dict) -> None:
+    REC_PACK_INTO(
+        buf, off,
+        int(rec["restaurant_id"]),
+        # "50s"/"30s" ya truncan y rellenan con \x00: basta con codificar
+        rec["restaurant_name"].encode("utf-8", errors="ignore"),
+        rec["city"].encode("utf-8", errors="ignore"),
+        float(rec["longitude"]),
+        float(rec["latitude"]),
+        int(rec.get("average_cost_for_two", 0)),
+        float(rec.get("aggregate_rating", 0.0)),
+        int(rec.get("votes", 0)),
+    )
 
 def _unpad(b: bytes) -> str:
-    return b.decode("utf-8", errors="ignore").rstrip("\x00").strip()
+    return b.rstrip(b"\x00").decode("utf-8", errors="ignore").strip()
+
+
+def _row_to_dict(row) -> dict:
+    """Tupla de REC_FMT → registro con las claves del AVL."""
+    (rid, name_b, city_b, lon, lat, avg_cost, agg, votes) = row
+    return {
+        "restaurant_id": rid,
+        "restaurant_name": _unpad(name_b),
+        "city": _unpad_city(city_b),
+        "longitude": lon,
+        "latitude": lat,
+        "average_cost_for_two": avg_cost,
+        "aggregate_rating": agg,
+        "votes": votes,
+    }
+
+
+def as_stored_record(rec: dict) -> dict:
+    """
+    El registro tal como lo devolvería el AVL tras guardarlo en el .dat
+    (float32, textos truncados): así otros índices responden con los mismos valores.
+    """
+    buf = bytearray(REC_SIZE)
+    _pack_record_into(buf, 0, rec)
+    return _row_to_dict(REC_UNPACK_FROM(buf, 0))
 
 
 # ============================================================
@@ -40,80 +221,343 @@ class AVLDataFile:
         if not os.path.exists(self.filename):
             with open(self.filename, "wb"):
                 pass
+        self._fh = None  # handle persistente (sin buffer): appends + base del mmap
+        self._rec_buf = bytearray(REC_SIZE)  # se reempaqueta en cada write_record
+        self._mm = None
+
+        # Write-behind: registros pendientes de bajar a disco
+        self._wbuf = bytearray()
+        self._wbase = os.path.getsize(self.filename)  # offset donde empieza _wbuf
+
+    def _handle(self):
+        fh = self._fh
+        if fh is None:
+            fh = self._fh = open(self.filename, "a+b", buffering=0)
+        return fh
 
     def write_record(self, rec: dict) -> int:
-        packed = REC_FMT.pack(
-            int(rec["restaurant_id"]),
-            _pad(rec["restaurant_name"], 50),
-            _pad(rec["city"], 30),
-            float(rec["longitude"]),
-            float(rec["latitude"]),
-            int(rec.get("average_cost_for_two", 0)),
-            float(rec.get("aggregate_rating", 0.0)),
-            int(rec.get("votes", 0)),
-        )
-        with open(self.filename, "ab") as f:
-            off = f.tell()
-            f.write(packed)
+        buf = self._rec_buf
+        _pack_record_into(buf, 0, rec)
+        off = self._wbase + len(self._wbuf)
+        self._wbuf += buf
+        if len(self._wbuf) >= WRITE_BUFFER_SIZE:
+            self.flush()
         return off
 
+    def flush(self) -> None:
+        """Baja a disco los registros acumulados por write_record."""
+        if not self._wbuf:
+            return
+        f = self._handle()
+        f.seek(0, os.SEEK_END)
+        f.write(self._wbuf)
+        self._wbase += len(self._wbuf)
+        self._wbuf.clear()
+
+    def write_packed(self, buf) -> int:
+        """Agrega varios registros ya empaquetados con un solo write; retorna el offset del primero."""
+        self.flush()
+        f = self._handle()
+        off = f.seek(0, os.SEEK_END)
+        f.write(buf)
+        self._wbase = off + len(buf)
+        return off
+
+    def _view(self, end: int):
+        """mmap de solo lectura del heap (append-only); se vuelve a mapear si creció."""
+        mm = self._mm
+        if mm is None or end > len(mm):
+            if mm is not None:
+                mm.close()
+            mm = self._mm = mmap.mmap(self._handle().fileno(), 0, access=mmap.ACCESS_READ)
+            _advise(mm, _MADV_DATA)
+        return mm
+
+    @contextmanager
+    def scan_hint(self):
+        """
+        Marca el heap como lectura secuencial mientras dura un escaneo completo y,
+        al terminar, devuelve el patrón aleatorio y suelta esas páginas de la caché
+        para que el escaneo no desplace a los nodos calientes de las búsquedas.
+        """
+        mm = self._view(self._wbase) if self._wbase else None
+        if mm is not None:
+            _advise(mm, _MADV_SCAN)
+        try:
+            yield
+        finally:
+            if self._mm is not None:
+                _advise(self._mm, _MADV_DATA)
+            if self._fh is not None:
+                _fadvise(self._fh, _FADV_DONTNEED)
+
     def read_record(self, off: int) -> dict:
-        with open(self.filename, "rb") as f:
-            f.seek(off)
-            raw = f.read(REC_FMT.size)
-        (rid, name_b, city_b, lon, lat, avg_cost, agg, votes) = REC_FMT.unpack(raw)
-        return {
-            "restaurant_id": rid,
-            "restaurant_name": _unpad(name_b),
-            "city": _unpad(city_b),
-            "longitude": lon,
-            "latitude": lat,
-            "average_cost_for_two": avg_cost,
-            "aggregate_rating": agg,
-            "votes": votes,
-        }
+        if off >= self._wbase:
+            # Todavía en el buffer de write-behind
+            row = REC_UNPACK_FROM(self._wbuf, off - self._wbase)
+        else:
+            row = REC_UNPACK_FROM(self._view(off + REC_SIZE), off)
+        return _row_to_dict(row)
+
+    def close(self):
+        self.flush()
+        if self._mm is not None:
+            self._mm.close()
+            self._mm = None
+        if self._fh is not None:
+            self._fh.close()
+            self._fh = None
 
 
 class AVLNodesFile:
     """Archivo de nodos AVL (índice)."""
     def __init__(self, filename_avl: str):
         self.filename = filename_avl
-        if not os.path.exists(self.filename):
+        if not os.path.exists(self.filename) or os.path.getsize(self.filename) == 0:
             with open(self.filename, "wb") as f:
-                f.write(ROOT_FMT.pack(-1))  # raíz vacía
-        with open(self.filename, "rb") as f:
-            self.root_pos = ROOT_FMT.unpack(f.read(ROOT_FMT.size))[0]
+                f.write(ROOT_PACK(AVL_MAGIC, AVL_VERSION, -1, 0))  # raíz vacía, sin nodos
+        # Un solo handle (sin buffer) para toda la vida del índice + vista mmap
+        self._fh = None
+        self._mm = None
+        self._cache = OrderedDict()  # pos -> AVLNode (niveles altos: casi siempre en caché)
+        # Durante un lote (begin_batch/end_batch) los nodos nuevos se quedan en memoria
+        self._pending = None
+        self._pending_base = 0
+        f = self._handle()
+        f.seek(0)
+        data = f.read()
+        try:
+            # Nodos lógicos vs. bytes reservados en disco (el archivo crece por bloques)
+            self.root_pos, self._count = self._read_header(self.filename, data)
+        except ValueError:
+            self.close()
+            raise
+        # Altura de cada nodo (1 byte por nodo) para no leer hijos solo por su altura
+        body = memoryview(data)[ROOT_SIZE:ROOT_SIZE + self._count * NODE_SIZE]
+        self._heights = array("b", self._scan_heights(body))
+        self._allocated = len(data)
+
+    @staticmethod
+    def _read_header(filename: str, data):
+        """(root_pos, node_count) del header; ValueError si el archivo no tiene el formato actual."""
+        if len(data) < ROOT_SIZE or data[:len(AVL_MAGIC)] != AVL_MAGIC:
+            raise ValueError(f"{filename}: .avl sin header {AVL_MAGIC!r} "
+                             f"(formato anterior: convertir con migrate_avl_file())")
+        _, version, root, count = ROOT_UNPACK_FROM(data, 0)
+        if version != AVL_VERSION:
+            raise ValueError(f"{filename}: versión de .avl no soportada ({version})")
+        if not (0 <= count <= (len(data) - ROOT_SIZE) // NODE_SIZE and -1 <= root < count):
+            raise ValueError(f"{filename}: header inconsistente (raíz={root}, nodos={count})")
+        return root, count
+
+    def _write_header(self) -> None:
+        # Raíz y conteo en una sola escritura
+        ROOT_PACK_INTO(self._view(ROOT_SIZE), 0, AVL_MAGIC, AVL_VERSION, self.root_pos, self._count)
+
+    @staticmethod
+    def _scan_heights(body):
+        body = body[:len(body) - len(body) % NODE_SIZE]
+        return [height for _, _, _, height, _ in NODE_FMT.iter_unpack(body)]
+
+    def _handle(self):
+        fh = self._fh
+        if fh is None:
+            fh = self._fh = open(self.filename, "r+b", buffering=0)
+            _fadvise(fh, _FADV_RANDOM)  # descensos raíz → hoja
+        return fh
 
     def _node_offset(self, pos: int) -> int:
-        return ROOT_FMT.size + pos * NODE_FMT.size
+        return ROOT_SIZE + pos * NODE_SIZE
+
+    def _grow(self, end: int) -> None:
+        """Reserva espacio hasta al menos `end` bytes (duplicando, mínimo NODE_PREALLOC nodos)."""
+        new_size = max(end, 2 * self._allocated, ROOT_SIZE + NODE_PREALLOC * NODE_SIZE)
+        if self._mm is not None:  # se vuelve a mapear con el nuevo tamaño
+            self._mm.close()
+            self._mm = None
+        fd = self._handle().fileno()
+        try:
+            os.posix_fallocate(fd, self._allocated, new_size - self._allocated)
+        except (AttributeError, OSError):
+            os.ftruncate(fd, new_size)  # sin fallocate (Windows/macOS) o FS que no lo soporta
+        self._allocated = new_size
+
+    def _view(self, end: int):
+        """mmap lectura/escritura del archivo de nodos; se vuelve a mapear si creció."""
+        mm = self._mm
+        if mm is None or end > len(mm):
+            if mm is not None:
+                mm.close()
+            mm = self._mm = mmap.mmap(self._handle().fileno(), 0, access=mmap.ACCESS_WRITE)
+            _advise(mm, _MADV_NODES)
+        return mm
+
+    def _remember(self, pos: int, node: AVLNode) -> None:
+        cache = self._cache
+        cache[pos] = node
+        cache.move_to_end(pos)
+        if len(cache) > NODE_CACHE_SIZE:
+            cache.popitem(last=False)
 
     def read_node(self, pos: int) -> AVLNode:
-        with open(self.filename, "rb") as f:
-            f.seek(self._node_offset(pos))
-            data = f.read(NODE_FMT.size)
-        rid, left, right, height, data_off = NODE_FMT.unpack(data)
-        return AVLNode(rid, left, right, height, data_off)
+        node = self._cache.get(pos)
+        if node is not None:
+            self._cache.move_to_end(pos)
+            return node
+        if self._pending is not None and pos >= self._pending_base:
+            return self._pending[pos - self._pending_base]
+        off = ROOT_SIZE + pos * NODE_SIZE
+        rid, left, right, height, data_off = NODE_UNPACK_FROM(self._view(off + NODE_SIZE), off)
+        node = AVLNode(rid, left, right, height, data_off)
+        self._remember(pos, node)
+        return node
 
     def write_node(self, pos: int, node: AVLNode):
-        with open(self.filename, "r+b") as f:
-            f.seek(self._node_offset(pos))
-            f.write(NODE_FMT.pack(node.id, node.left, node.right, node.height, node.data_off))
+        if self._pending is not None and pos >= self._pending_base:
+            # Nodo del lote aún no escrito: basta con actualizarlo en memoria
+            self._pending[pos - self._pending_base] = node
+            self._heights[pos] = node.height
+            self._remember(pos, node)
+            return
+        # Nodo existente → se escribe directo en el mapa (sin seek/write) y en la caché
+        off = ROOT_SIZE + pos * NODE_SIZE
+        NODE_PACK_INTO(self._view(off + NODE_SIZE), off,
+                       node.id, node.left, node.right, node.height, node.data_off)
+        self._heights[pos] = node.height
+        self._remember(pos, node)
 
     def append_node(self, node: AVLNode) -> int:
-        with open(self.filename, "ab") as f:
-            pos = (f.tell() - ROOT_FMT.size) // NODE_FMT.size
-            f.write(NODE_FMT.pack(node.id, node.left, node.right, node.height, node.data_off))
+        if self._pending is not None:
+            pos = self._pending_base + len(self._pending)
+            self._pending.append(node)
+            self._heights.append(node.height)
+            self._remember(pos, node)
+            return pos
+        pos = self._count
+        end = ROOT_SIZE + (pos + 1) * NODE_SIZE
+        if end > self._allocated:
+            self._grow(end)
+        NODE_PACK_INTO(self._view(end), end - NODE_SIZE,
+                       node.id, node.left, node.right, node.height, node.data_off)
+        self._count = pos + 1
+        self._write_header()
+        self._heights.append(node.height)
+        self._remember(pos, node)
         return pos
 
+    @property
+    def in_batch(self) -> bool:
+        return self._pending is not None
+
+    def begin_batch(self) -> None:
+        """Desde aquí, append_node acumula en memoria hasta end_batch()."""
+        if self._pending is None:
+            self._pending_base = self.count_nodes()
+            self._pending = []
+
+    def end_batch(self) -> None:
+        """Copia todos los nodos nuevos del lote al final lógico del archivo de una vez."""
+        pending = self._pending
+        if pending is None:
+            return
+        self._pending = None
+        if pending:
+            buf = bytearray(len(pending) * NODE_SIZE)
+            for i, n in enumerate(pending):
+                NODE_PACK_INTO(buf, i * NODE_SIZE, n.id, n.left, n.right, n.height, n.data_off)
+            start = ROOT_SIZE + self._pending_base * NODE_SIZE
+            end = start + len(buf)
+            if end > self._allocated:
+                self._grow(end)
+            self._view(end)[start:end] = buf
+            self._count = self._pending_base + len(pending)
+            self._write_header()
+
+    def compact(self) -> int:
+        """
+        Reescribe el archivo con los nodos vivos en orden por niveles (BFS desde la raíz):
+        la raíz y los niveles altos quedan contiguos al inicio y los nodos huérfanos
+        de eliminaciones se descartan. Retorna cuántos nodos quedaron.
+        """
+        if self._pending is not None:
+            raise RuntimeError("compact() no se puede llamar durante un lote")
+
+        order = []
+        if self.root_pos != -1:
+            order.append(self.root_pos)
+            for pos in order:  # la lista crece mientras se recorre (BFS)
+                n = self.read_node(pos)
+                if n.left != -1:
+                    order.append(n.left)
+                if n.right != -1:
+                    order.append(n.right)
+        new_pos = {old: i for i, old in enumerate(order)}
+
+        buf = bytearray(ROOT_SIZE + len(order) * NODE_SIZE)
+        ROOT_PACK_INTO(buf, 0, AVL_MAGIC, AVL_VERSION, 0 if order else -1, len(order))
+        for i, old in enumerate(order):
+            n = self.read_node(old)
+            NODE_PACK_INTO(buf, ROOT_SIZE + i * NODE_SIZE,
+                           n.id, new_pos.get(n.left, -1), new_pos.get(n.right, -1),
+                           n.height, n.data_off)
+
+        tmp = self.filename + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(buf)
+        self.close()  # soltar mmap/handle antes de reemplazar (Windows)
+        os.replace(tmp, self.filename)
+
+        self.root_pos = 0 if order else -1
+        self._count = len(order)
+        self._allocated = len(buf)
+        self._heights = array("b", self._scan_heights(memoryview(buf)[ROOT_SIZE:]))
+        return len(order)
+
+    def get_height(self, pos: int) -> int:
+        return -1 if pos == -1 else self._heights[pos]
+
     def count_nodes(self) -> int:
-        sz = os.path.getsize(self.filename)
-        return (sz - ROOT_FMT.size) // NODE_FMT.size
+        return self._count
 
     def save_root(self, pos: int):
-        with open(self.filename, "r+b") as f:
-            f.seek(0)
-            f.write(ROOT_FMT.pack(pos))
         self.root_pos = pos
+        self._write_header()
+
+    def close(self):
+        """Baja a disco y libera el mmap (necesario antes de borrar el archivo en Windows)."""
+        self._cache.clear()
+        if self._mm is not None:
+            self._mm.flush()
+            self._mm.close()
+            self._mm = None
+        if self._fh is not None:
+            self._fh.close()
+            self._fh = None
+
+
+def migrate_avl_file(filename: str) -> int:
+    """
+    Convierte un .avl del formato anterior (solo root_pos int32, sin magic)
+    al header actual. El conteo se deduce del tamaño: se descartan los nodos
+    finales en cero (reserva sin usar; un nodo real nunca tiene left == right == 0).
+    Retorna la cantidad de nodos; si el archivo ya tiene el formato actual no lo toca.
+    """
+    with open(filename, "rb") as f:
+        data = f.read()
+    if data[:len(AVL_MAGIC)] == AVL_MAGIC:
+        return ROOT_UNPACK_FROM(data, 0)[3]
+    root = LEGACY_ROOT_FMT.unpack_from(data, 0)[0] if len(data) >= LEGACY_ROOT_FMT.size else -1
+    body = memoryview(data)[LEGACY_ROOT_FMT.size:]
+    count = len(body) // NODE_SIZE
+    while count and not any(body[(count - 1) * NODE_SIZE:count * NODE_SIZE]):
+        count -= 1
+    print(f"[INFO] Migrando {filename} al header {AVL_MAGIC!r} v{AVL_VERSION} ({count} nodos)")
+    tmp = filename + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(ROOT_PACK(AVL_MAGIC, AVL_VERSION, root, count))
+        f.write(body[:count * NODE_SIZE])
+    os.replace(tmp, filename)
+    return count
 
 
 # ============================================================
@@ -124,6 +568,22 @@ class AVLFile:
     def __init__(self, base_path: str):
         self.nodes = AVLNodesFile(base_path + ".avl")
         self.data = AVLDataFile(base_path + ".dat")
+        # campo → (filas vivas en orden de ID, valores ordenados, permutación);
+        # se arma al primer filtro y se descarta en cada escritura
+        self._sorted_cols = {}
+
+    def close(self):
+        self.nodes.close()
+        self.data.close()
+
+    def flush(self) -> None:
+        """Baja a disco los registros que write_record aún tiene en memoria."""
+        self.data.flush()
+
+    def compact(self) -> int:
+        """Reordena el archivo de nodos por niveles (ver AVLNodesFile.compact)."""
+        self._sorted_cols.clear()
+        return self.nodes.compact()
 
     # ============================================================
     # Normalización universal de registros (CSV, parser, frontend)
@@ -132,140 +592,187 @@ class AVLFile:
         if not raw:
             raise ValueError("Registro vacío recibido en normalize_record()")
 
-        clean = {}
-        for k, v in raw.items():
-            key = k.strip().replace(" ", "_").replace("\ufeff", "").lower()
-            clean[key] = v
+        clean = {_norm_key(k): v for k, v in raw.items()}
+        get = clean.get
 
-        mapping = {
-            "restaurantid": "restaurant_id",
-            "restaurant_id": "restaurant_id",
-            "restaurant_name": "restaurant_name",
-            "name": "restaurant_name",
-            "city": "city",
-            "longitude": "longitude",
-            "latitude": "latitude",
-            "average_cost_for_two": "average_cost_for_two",
-            "averagecostfortwo": "average_cost_for_two",
-            "aggregate_rating": "aggregate_rating",
-            "aggregaterating": "aggregate_rating",
-            "votes": "votes",
+        # Cuando hay dos variantes de la misma columna, gana la que la mapeaba al final
+        return {
+            "restaurant_id": int(float(get("restaurant_id", get("restaurantid", 0)))),
+            "restaurant_name": str(get("name", get("restaurant_name", ""))).strip(),
+            "city": str(get("city", "")).strip(),
+            "longitude": float(get("longitude", 0.0)),
+            "latitude": float(get("latitude", 0.0)),
+            "average_cost_for_two": int(float(get("averagecostfortwo", get("average_cost_for_two", 0)))),
+            "aggregate_rating": float(get("aggregaterating", get("aggregate_rating", 0.0))),
+            "votes": int(float(get("votes", 0))),
         }
 
-        record = {}
-        for old, new in mapping.items():
-            if old in clean:
-                record[new] = clean[old]
-
-        # Conversión segura
-        record["restaurant_id"] = int(float(record.get("restaurant_id", 0)))
-        record["restaurant_name"] = str(record.get("restaurant_name", "")).strip()
-        record["city"] = str(record.get("city", "")).strip()
-        record["longitude"] = float(record.get("longitude", 0.0))
-        record["latitude"] = float(record.get("latitude", 0.0))
-        record["average_cost_for_two"] = int(float(record.get("average_cost_for_two", 0)))
-        record["aggregate_rating"] = float(record.get("aggregate_rating", 0.0))
-        record["votes"] = int(float(record.get("votes", 0)))
-        return record
-
     # ---- helpers ----
     def _height(self, pos: int) -> int:
-        if pos == -1:
-            return -1
-        n = self.nodes.read_node(pos)
-        return n.height
-
-    def _update_height(self, pos: int) -> None:
-        n = self.nodes.read_node(pos)
-        hl = self._height(n.left)
-        hr = self._height(n.right)
-        n.height = max(hl, hr) + 1
-        self.nodes.write_node(pos, n)
-
-    def _balance_factor(self, pos: int) -> int:
-        n = self.nodes.read_node(pos)
-        return self._height(n.left) - self._height(n.right)
+        return self.nodes.get_height(pos)
 
-    # ---- rotaciones ----
-    def _rotate_right_at(self, pos: int) -> int:
-        x = self.nodes.read_node(pos)
+    # ---- rotaciones (sobre nodos ya cargados) ----
+    def _rotate_right_at(self, pos: int, x: AVLNode) -> int:
         y_pos = x.left
         y = self.nodes.read_node(y_pos)
 
         x.left = y.right
         y.right = pos
+        x.height = max(self._height(x.left), self._height(x.right)) + 1
+        y.height = max(self._height(y.left), x.height) + 1
         self.nodes.write_node(pos, x)
         self.nodes.write_node(y_pos, y)
-
-        self._update_height(pos)
-        self._update_height(y_pos)
         return y_pos
 
-    def _rotate_left_at(self, pos: int) -> int:
-        x = self.nodes.read_node(pos)
+    def _rotate_left_at(self, pos: int, x: AVLNode) -> int:
         y_pos = x.right
         y = self.nodes.read_node(y_pos)
 
         x.right = y.left
         y.left = pos
+        x.height = max(self._height(x.left), self._height(x.right)) + 1
+        y.height = max(self._height(y.right), x.height) + 1
         self.nodes.write_node(pos, x)
         self.nodes.write_node(y_pos, y)
-
-        self._update_height(pos)
-        self._update_height(y_pos)
         return y_pos
 
-    def _rebalance_at(self, pos: int) -> int:
-        bf = self._balance_factor(pos)
-        n = self.nodes.read_node(pos)
+    def _rebalance_node(self, pos: int, n: AVLNode, dirty: bool):
+        """
+        Actualiza altura y rebalancea el subárbol con raíz en pos (n ya cargado).
+        Retorna (nueva raíz del subárbol, hubo cambios).
+        """
+        hl = self._height(n.left)
+        hr = self._height(n.right)
 
-        if bf > 1:
-            if self._balance_factor(n.left) < 0:
-                new_left = self._rotate_left_at(n.left)
-                n.left = new_left
-                self.nodes.write_node(pos, n)
-            return self._rotate_right_at(pos)
+        if hl - hr > 1:
+            l = self.nodes.read_node(n.left)
+            if self._height(l.left) < self._height(l.right):
+                n.left = self._rotate_left_at(n.left, l)
+            return self._rotate_right_at(pos, n), True
 
-        if bf < -1:
-            if self._balance_factor(n.right) > 0:
-                new_right = self._rotate_right_at(n.right)
-                n.right = new_right
-                self.nodes.write_node(pos, n)
-            return self._rotate_left_at(pos)
+        if hr - hl > 1:
+            r = self.nodes.read_node(n.right)
+            if self._height(r.right) < self._height(r.left):
+                n.right = self._rotate_right_at(n.right, r)
+            return self._rotate_left_at(pos, n), True
 
-        return pos
+        height = max(hl, hr) + 1
+        if dirty or height != n.height:
+            n.height = height
+            self.nodes.write_node(pos, n)
+            return pos, True
+        return pos, False
+
+    def _retrace(self, path, child: int) -> int:
+        """
+        Sube por el camino [(pos, nodo, fue_izq, sucio), ...] colgando `child`
+        donde terminó el descenso; una sola escritura por posición tocada.
+        Se detiene en cuanto un nivel queda intacto. Retorna la nueva raíz.
+        """
+        for i in range(len(path) - 1, -1, -1):
+            pos, n, went_left, dirty = path[i]
+            if went_left:
+                dirty = dirty or n.left != child
+                n.left = child
+            else:
+                dirty = dirty or n.right != child
+                n.right = child
+            child, changed = self._rebalance_node(pos, n, dirty)
+            if not changed:
+                # Ancestros intactos salvo los marcados (p.ej. nodo que tomó el sucesor)
+                for apos, an, _, adirty in path[:i]:
+                    if adirty:
+                        self.nodes.write_node(apos, an)
+                return path[0][0]
+        return child
 
     # ---- insertar ----
     def insert(self, rec: dict) -> None:
         rec = self.normalize_record(rec)
+        self._sorted_cols.clear()
         data_off = self.data.write_record(rec)
-        node = AVLNode(
+        new_root = self._insert_node(AVLNode(
             id=int(rec["restaurant_id"]),
             left=-1,
             right=-1,
             height=0,
             data_off=data_off,
-        )
-        new_root = self._insert_rec(self.nodes.root_pos, node)
+        ))
         if new_root != self.nodes.root_pos:
             self.nodes.save_root(new_root)
 
-    def _insert_rec(self, pos: int, node: AVLNode) -> int:
-        if pos == -1:
-            return self.nodes.append_node(node)
+    def _insert_node(self, node: AVLNode) -> int:
+        """Cuelga `node` en el árbol y retorna la nueva raíz (sin guardarla)."""
+        # Descenso único guardando el camino
+        path = []
+        pos = self.nodes.root_pos
+        while pos != -1:
+            n = self.nodes.read_node(pos)
+            if node.id == n.id:
+                return self.nodes.root_pos  # duplicado
+            went_left = node.id < n.id
+            path.append((pos, n, went_left, False))
+            pos = n.left if went_left else n.right
 
-        n = self.nodes.read_node(pos)
-        if node.id < n.id:
-            n.left = self._insert_rec(n.left, node)
-            self.nodes.write_node(pos, n)
-        elif node.id > n.id:
-            n.right = self._insert_rec(n.right, node)
-            self.nodes.write_node(pos, n)
-        else:
-            return pos  # duplicado
+        return self._retrace(path, self.nodes.append_node(node))
+
+    def bulk_insert(self, records: Iterable[dict], normalized: bool = False) -> int:
+        """
+        Inserta varios registros: un solo write al .dat, nodos nuevos acumulados
+        en memoria y escritos juntos al .avl, y la raíz guardada una vez al final.
+        Con normalized=True los registros ya vienen de normalize_record().
+        Retorna cuántos registros se escribieron.
+        """
+        recs = list(records) if normalized else [self.normalize_record(r) for r in records]
+        if not recs:
+            return 0
+        self._sorted_cols.clear()
+        buf = bytearray(len(recs) * REC_SIZE)
+        for i, r in enumerate(recs):
+            _pack_record_into(buf, i * REC_SIZE, r)
+        base = self.data.write_packed(buf)
+
+        old_root = root = self.nodes.root_pos
+        own_batch = not self.nodes.in_batch  # dentro de bulk_session la cierra la sesión
+        self.nodes.begin_batch()
+        try:
+            for i, rec in enumerate(recs):
+                root = self._insert_node(AVLNode(
+                    id=rec["restaurant_id"],
+                    left=-1,
+                    right=-1,
+                    height=0,
+                    data_off=base + i * REC_SIZE,
+                ))
+                self.nodes.root_pos = root  # el siguiente descenso parte de aquí
+        finally:
+            if own_batch:
+                self.nodes.end_batch()
+                self.nodes.root_pos = old_root
+                if root != old_root:
+                    self.nodes.save_root(root)
+        return len(recs)
 
-        self._update_height(pos)
-        return self._rebalance_at(pos)
+    @contextmanager
+    def bulk_session(self):
+        """
+        Carga masiva: todos los bulk_insert/insert dentro del with arman el árbol
+        en memoria (los registros sí van al .dat en orden, como un log secuencial)
+        y los nodos nuevos + la raíz se escriben una sola vez al salir.
+        """
+        if self.nodes.in_batch:  # sesión anidada: la cierra la externa
+            yield self
+            return
+        old_root = self.nodes.root_pos
+        self.nodes.begin_batch()
+        try:
+            yield self
+        finally:
+            root = self.nodes.root_pos
+            self.nodes.end_batch()
+            self.nodes.root_pos = old_root
+            if root != old_root:
+                self.nodes.save_root(root)
 
     # ---- buscar ----
     def search(self, rid: int) -> Optional[dict]:
@@ -277,45 +784,39 @@ class AVLFile:
             pos = n.left if rid < n.id else n.right
         return None
 
-    # ---- mínimo (pos) ----
-    def _min_pos(self, pos: int) -> int:
-        cur = pos
-        while True:
-            n = self.nodes.read_node(cur)
-            if n.left == -1:
-                return cur
-            cur = n.left
-
     # ---- eliminar ----
     def remove(self, rid: int) -> None:
-        new_root = self._remove_rec(self.nodes.root_pos, rid)
-        if new_root != self.nodes.root_pos:
-            self.nodes.save_root(new_root)
+        path = []
+        pos = self.nodes.root_pos
+        while pos != -1:
+            n = self.nodes.read_node(pos)
+            if rid == n.id:
+                break
+            went_left = rid < n.id
+            path.append((pos, n, went_left, False))
+            pos = n.left if went_left else n.right
+        else:
+            return  # no existe
+        self._sorted_cols.clear()
 
-    def _remove_rec(self, pos: int, rid: int) -> int:
-        if pos == -1:
-            return -1
-        n = self.nodes.read_node(pos)
-        if rid < n.id:
-            n.left = self._remove_rec(n.left, rid)
-            self.nodes.write_node(pos, n)
-        elif rid > n.id:
-            n.right = self._remove_rec(n.right, rid)
-            self.nodes.write_node(pos, n)
+        if n.left == -1 or n.right == -1:
+            child = n.left if n.left != -1 else n.right
         else:
-            if n.left == -1:
-                return n.right
-            if n.right == -1:
-                return n.left
-            succ_pos = self._min_pos(n.right)
+            # Dos hijos: el nodo toma id/payload del sucesor y se quita el sucesor
+            path.append((pos, n, False, True))
+            succ_pos = n.right
             succ = self.nodes.read_node(succ_pos)
+            while succ.left != -1:
+                path.append((succ_pos, succ, True, False))
+                succ_pos = succ.left
+                succ = self.nodes.read_node(succ_pos)
             n.id = succ.id
             n.data_off = succ.data_off
-            n.right = self._remove_rec(n.right, succ.id)
-            self.nodes.write_node(pos, n)
+            child = succ.right
 
-        self._update_height(pos)
-        return self._rebalance_at(pos)
+        new_root = self._retrace(path, child) if path else child
+        if new_root != self.nodes.root_pos:
+            self.nodes.save_root(new_root)
 
     # ---- recorrido / rango ----
     def inorder_ids(self) -> list[int]:
@@ -332,24 +833,57 @@ class AVLFile:
         self._inorder(n.right, out)
 
     def range_search(self, lo: int, hi: int) -> list[dict]:
-        out: List[dict] = []
-        self._range_rec(self.nodes.root_pos, lo, hi, out)
-        return out
+        """
+        Registros con lo <= id <= hi (in-order). Un descenso hasta el primer id >= lo
+        y luego sucesor a sucesor con la pila del camino hasta pasar hi.
+        """
+        read_node = self.nodes.read_node
+        offs: List[int] = []
+        # Pila = ancestros con id >= lo aún no visitados (el tope es el menor)
+        stack = []
+        pos = self.nodes.root_pos
+        while pos != -1:
+            n = read_node(pos)
+            if n.id < lo:
+                pos = n.right
+            else:
+                stack.append(n)
+                pos = n.left
+        while stack:
+            n = stack.pop()
+            if n.id > hi:
+                break
+            offs.append(n.data_off)
+            pos = n.right
+            while pos != -1:
+                child = read_node(pos)
+                stack.append(child)
+                pos = child.left
 
-    def _range_rec(self, pos: int, lo: int, hi: int, out: List[dict]):
-        if pos == -1:
-            return
-        n = self.nodes.read_node(pos)
-        if lo < n.id:
-            self._range_rec(n.left, lo, hi, out)
-        if lo <= n.id <= hi:
-            out.append(self.data.read_record(n.data_off))
-        if n.id < hi:
-            self._range_rec(n.right, lo, hi, out)
+        # .dat leído en orden de offset, resultado en orden de ID
+        read = self.data.read_record
+        recs = {off: read(off) for off in sorted(offs)}
+        return [recs[off] for off in offs]
 
     # ---- recorrido de registros (generador) ----
     def _iter_records(self):
-        """Genera todos los registros activos (in-order por ID)."""
+        """
+        Genera todos los registros activos (in-order por ID).
+        Primero recorre solo los nodos; luego lee el .dat por tramos, cada tramo
+        en orden de offset (acceso casi secuencial) y entregado en orden de ID.
+        """
+        with self.data.scan_hint():
+            offs = self._inorder_offsets()
+            read = self.data.read_record
+            for start in range(0, len(offs), SCAN_CHUNK):
+                chunk = offs[start:start + SCAN_CHUNK]
+                recs = {off: read(off) for off in sorted(chunk)}
+                for off in chunk:
+                    yield recs[off]
+
+    def _inorder_offsets(self) -> List[int]:
+        """Offsets en .dat de los registros activos, in-order por ID (sin tocar el .dat)."""
+        out: List[int] = []
         stack = []
         pos = self.nodes.root_pos
         while stack or pos != -1:
@@ -359,9 +893,120 @@ class AVLFile:
                 pos = self.nodes.read_node(pos).left
             pos = stack.pop()
             n = self.nodes.read_node(pos)
-            yield self.data.read_record(n.data_off)
+            out.append(n.data_off)
             # ir a la derecha
             pos = n.right
+        return out
+
+    # ---- escaneo en bloque (NumPy) ----
+    def _live_order(self) -> List[int]:
+        """
+        Índices en .dat de los registros vivos (alcanzables desde la raíz), en orden de ID.
+        Los punteros se leen de una vez desde el mmap de nodos.
+        """
+        n_nodes = self.nodes.count_nodes()
+        nodes = np.frombuffer(self.nodes._view(ROOT_SIZE + n_nodes * NODE_SIZE),
+                              dtype=NODE_DTYPE, count=n_nodes, offset=ROOT_SIZE)
+        lefts = nodes["left"].tolist()
+        rights = nodes["right"].tolist()
+        offs = nodes["data_off"].tolist()
+        del nodes  # liberar el buffer exportado (el mmap debe poder remapearse)
+
+        order = []
+        stack = []
+        pos = self.nodes.root_pos
+        while stack or pos != -1:
+            while pos != -1:
+                stack.append(pos)
+                pos = lefts[pos]
+            pos = stack.pop()
+            order.append(offs[pos] // REC_SIZE)
+            pos = rights[pos]
+        return order
+
+    def _bulk_filter(self, attr: str, test) -> Optional[List[dict]]:
+        """
+        Aplica test(columna_float64) → máscara sobre los registros vivos.
+        El .dat se ve sin copiar (np.frombuffer sobre el mmap); solo las filas
+        que pasan el filtro se decodifican a dict.
+        Retorna None si no hay NumPy o el atributo no es numérico (usar el recorrido normal).
+        """
+        field = _REC_FIELDS.get(attr)
+        if np is None or field is None or self.nodes.in_batch:
+            return None  # en lote hay nodos que aún no están en el mmap
+        if self.nodes.root_pos == -1:
+            return []
+        self.data.flush()  # el escaneo lee el heap desde disco
+        try:
+            with self.data.scan_hint():
+                return self._bulk_filter_scan(field, test)
+        except (OSError, ValueError, IndexError):
+            return None
+
+    def _bulk_filter_scan(self, field: str, test) -> List[dict]:
+        recs = None
+        try:
+            order = np.asarray(self._live_order(), dtype=np.intp)
+            n_recs = os.fstat(self.data._handle().fileno()).st_size // REC_SIZE
+            recs = np.frombuffer(self.data._view(n_recs * REC_SIZE), dtype=REC_DTYPE, count=n_recs)
+            # Columna leída del heap con stride (sin copia aparte que pueda quedar desfasada)
+            col = recs[field]
+            # float64 para comparar igual que float(struct) en el recorrido normal
+            col = col[order].astype(np.float64)
+            return _records_to_dicts(recs[order[test(col)]])
+        finally:
+            del recs  # liberar el buffer exportado antes de soltar el mmap
+
+    def _sorted_column(self, field: str):
+        """
+        Índice secundario en memoria de un campo numérico: valores de los registros
+        vivos ordenados (float64, sin NaN) y su posición en el orden por ID.
+        """
+        cached = self._sorted_cols.get(field)
+        if cached is not None:
+            return cached
+        recs = None
+        try:
+            order = np.asarray(self._live_order(), dtype=np.intp)
+            n_recs = os.fstat(self.data._handle().fileno()).st_size // REC_SIZE
+            recs = np.frombuffer(self.data._view(n_recs * REC_SIZE), dtype=REC_DTYPE, count=n_recs)
+            vals = recs[field][order].astype(np.float64)
+        finally:
+            del recs
+        perm = np.argsort(vals, kind="stable")
+        vals = vals[perm]
+        n_valid = len(vals) - int(np.count_nonzero(np.isnan(vals)))  # NaN quedan al final
+        cached = self._sorted_cols[field] = (order, vals[:n_valid], perm[:n_valid])
+        return cached
+
+    def _bulk_range(self, attr: str, lo: Optional[float], lo_side: Optional[str],
+                    hi: Optional[float], hi_side: Optional[str]) -> Optional[List[dict]]:
+        """
+        Filtro por rango con búsqueda binaria sobre _sorted_column: O(log N + K)
+        en vez de recorrer la columna entera. Los lados son los de np.searchsorted
+        (None = sin cota). Retorna None si no aplica (usar el recorrido normal).
+        """
+        field = _REC_FIELDS.get(attr)
+        if np is None or field is None or self.nodes.in_batch:
+            return None  # en lote hay nodos que aún no están en el mmap
+        if self.nodes.root_pos == -1:
+            return []
+        self.data.flush()  # el índice se arma desde el heap en disco
+        recs = None
+        try:
+            order, vals, perm = self._sorted_column(field)
+            i = 0 if lo_side is None else int(np.searchsorted(vals, lo, side=lo_side))
+            j = len(vals) if hi_side is None else int(np.searchsorted(vals, hi, side=hi_side))
+            if i >= j:
+                return []
+            rows = order[np.sort(perm[i:j])]  # de vuelta al orden por ID
+            n_recs = os.fstat(self.data._handle().fileno()).st_size // REC_SIZE
+            recs = np.frombuffer(self.data._view(n_recs * REC_SIZE), dtype=REC_DTYPE, count=n_recs)
+            return _records_to_dicts(recs[rows])
+        except (OSError, ValueError, IndexError):
+            return None
+        finally:
+            del recs
 
     # ---- exportar todos los registros ----
     def export_all(self) -> List[dict]:
@@ -390,10 +1035,27 @@ class AVLFile:
     def search_comparison(self, attr: str, op: str, value) -> List[dict]:
         """
         Filtra registros por atributo con operadores: >, <, >=, <=, =.
-        Nota: el árbol indexa por ID; esto hace full-scan in-order del .dat.
+        Nota: el árbol indexa por ID; con NumPy se usa el índice ordenado del
+        atributo (_sorted_column), si no se hace full-scan in-order del .dat.
         """
         attr = self._normalize_attr(attr)
         op = op.strip()
+
+        # Valor numérico y operador conocido → máscara vectorizada sobre el .dat
+        pred = _CMP_OPS.get(op)
+        if pred is not None:
+            try:
+                fvalue = float(value)
+            except (TypeError, ValueError):
+                fvalue = None
+            if fvalue is not None:
+                lo_side, hi_side = _RANGE_SIDES[op]
+                bulk = self._bulk_range(attr, fvalue, lo_side, fvalue, hi_side)
+                if bulk is None:
+                    bulk = self._bulk_filter(attr, lambda col: pred(col, fvalue))
+                if bulk is not None:
+                    return bulk
+
         out: List[dict] = []
 
         def _ok(a, b) -> bool:
@@ -420,6 +1082,35 @@ class AVLFile:
                 out.append(rec)
         return out
 
+    # ---- comparación con predicado ya compilado ----
+    def search_comparison_pred(self, attr: str, pred, value: float) -> List[dict]:
+        """
+        Igual que search_comparison pero recibe el operador ya resuelto
+        (p.ej. operator.gt), evitando despachar el string en cada registro.
+        """
+        attr = self._normalize_attr(attr)
+        bulk = None
+        op = _PRED_OPS.get(pred)
+        if op is not None:
+            lo_side, hi_side = _RANGE_SIDES[op]
+            bulk = self._bulk_range(attr, value, lo_side, value, hi_side)
+        if bulk is None:
+            bulk = self._bulk_filter(attr, lambda col: pred(col, value))
+        if bulk is not None:
+            return bulk
+
+        out: List[dict] = []
+        for rec in self._iter_records():
+            v = rec.get(attr)
+            if v is None:
+                continue
+            try:
+                if pred(float(v), value):
+                    out.append(rec)
+            except (TypeError, ValueError):
+                continue
+        return out
+
     # ---- between genérico por atributo numérico ----
     def search_between(self, attr: str, low, high) -> List[dict]:
         """
@@ -433,6 +1124,12 @@ class AVLFile:
             # si no es numérico, no aplicamos between
             return out
 
+        bulk = self._bulk_range(attr, lowf, "left", highf, "right")
+        if bulk is None:
+            bulk = self._bulk_filter(attr, lambda col: (col >= lowf) & (col <= highf))
+        if bulk is not None:
+            return bulk
+
         for rec in self._iter_records():
             if attr not in rec:
                 continue
@@ -443,3 +1140,11 @@ class AVLFile:
             except Exception:
                 pass
         return out
+
+
+if __name__ == "__main__":
+    # Migración explícita de archivos del formato anterior:
+    #   python -m test_parser.indexes.avl.avl_file ruta/indice.avl [...]
+    import sys
+    for path in sys.argv[1:]:
+        print(f"[OK] {path}: {migrate_avl_file(path)} nodos")
@@ -1,8 +1,13 @@
 import os
+import bisect
 import csv
+import functools
 import json
 import pickle
+import struct
 import time
+from collections import OrderedDict
+from operator import itemgetter
 from math import ceil
 
 # ============================================================
@@ -16,6 +21,20 @@ META_FILE = os.path.join(DATA_DIR, "bplustree_meta.json")
 
 ORDER = 4               # Máximo nº de claves por nodo
 BLOCK_SIZE = 4096       # Tamaño fijo de bloque en disco
+NODE_CACHE_SIZE = 1024  # Nodos retenidos en memoria por BPlusTreeFile (LRU)
+
+# Layout binario del nodo: cabecera (is_leaf, n_keys, n_children, next_leaf),
+# luego n_keys claves int64 y, según el tipo de nodo:
+#   - interno: n_children posiciones int64
+#   - hoja:    n_children valores como (largo int32 + UTF-8); largo -1 = None
+HEADER_FMT = struct.Struct("<?IIq")
+_LEN_FMT = struct.Struct("<i")
+_PICKLE_MAGIC = 0x80  # bloques antiguos (pickle protocolo ≥ 2) empiezan con este byte
+_INT64_MIN, _INT64_MAX = -(1 << 63), (1 << 63) - 1
+
+
+def _fits_int64(values) -> bool:
+    return all(type(v) is int and _INT64_MIN <= v <= _INT64_MAX for v in values)
 
 
 # ============================================================
@@ -35,22 +54,67 @@ class BPlusNode:
         self.next_leaf = next_leaf
 
     def serialize(self) -> bytes:
-        return pickle.dumps({
-            "is_leaf": self.is_leaf,
-            "keys": self.keys,
-            "children": self.children,
-            "next_leaf": self.next_leaf
-        })
+        keys, children = self.keys, self.children
+        packable = _fits_int64(keys) and (
+            all(v is None or isinstance(v, str) for v in children) if self.is_leaf
+            else _fits_int64(children)
+        )
+        if not packable:
+            # Claves/valores que no caben en el layout fijo (p.ej. claves texto)
+            return pickle.dumps({
+                "is_leaf": self.is_leaf,
+                "keys": keys,
+                "children": children,
+                "next_leaf": self.next_leaf
+            })
+
+        parts = [
+            HEADER_FMT.pack(self.is_leaf, len(keys), len(children), self.next_leaf),
+            struct.pack(f"<{len(keys)}q", *keys),
+        ]
+        if self.is_leaf:
+            for v in children:
+                if v is None:
+                    parts.append(_LEN_FMT.pack(-1))
+                else:
+                    b = v.encode("utf-8")
+                    parts.append(_LEN_FMT.pack(len(b)))
+                    parts.append(b)
+        else:
+            parts.append(struct.pack(f"<{len(children)}q", *children))
+        return b"".join(parts)
 
     @staticmethod
     def deserialize(binary_data: bytes) -> "BPlusNode":
-        data = pickle.loads(binary_data)
-        return BPlusNode(
-            is_leaf=data["is_leaf"],
-            keys=data["keys"],
-            children=data["children"],
-            next_leaf=data["next_leaf"]
-        )
+        if binary_data[0] == _PICKLE_MAGIC:
+            data = pickle.loads(binary_data)
+            return BPlusNode(
+                is_leaf=data["is_leaf"],
+                keys=data["keys"],
+                children=data["children"],
+                next_leaf=data["next_leaf"]
+            )
+
+        is_leaf, n_keys, n_children, next_leaf = HEADER_FMT.unpack_from(binary_data, 0)
+        off = HEADER_FMT.size
+        keys = list(struct.unpack_from(f"<{n_keys}q", binary_data, off))
+        off += 8 * n_keys
+        if is_leaf:
+            children = []
+            for _ in range(n_children):
+                (n,) = _LEN_FMT.unpack_from(binary_data, off)
+                off += _LEN_FMT.size
+                if n < 0:
+                    children.append(None)
+                else:
+                    children.append(binary_data[off:off + n].decode("utf-8"))
+                    off += n
+        else:
+            children = list(struct.unpack_from(f"<{n_children}q", binary_data, off))
+        return BPlusNode(is_leaf=is_leaf, keys=keys, children=children, next_leaf=next_leaf)
+
+    def copy(self) -> "BPlusNode":
+        return BPlusNode(self.is_leaf, list(self.keys), list(self.children), self.next_leaf)
 
 
 # ============================================================
@@ -60,13 +124,18 @@ class BPlusNode:
 class BPlusTreeFile:
     """
     Encapsula las operaciones de bajo nivel sobre el archivo binario de nodos.
-    Lleva contadores de lecturas/escrituras.
+    Lleva contadores de lecturas/escrituras (reads = lecturas reales a disco).
+    Los nodos leídos/escritos quedan en una caché LRU (write-through): la raíz y
+    los primeros niveles dejan de tocar disco. Se entregan copias, porque el
+    árbol modifica el nodo leído antes de volver a escribirlo.
     """
     def __init__(self, filename=DATA_FILE):
         os.makedirs(os.path.dirname(filename), exist_ok=True)
         self.filename = filename
         self.reads = 0
         self.writes = 0
+        self.cache_hits = 0
+        self._cache = OrderedDict()  # posición -> BPlusNode
         if not os.path.exists(filename):
             open(filename, "wb").close()
 
@@ -86,15 +155,55 @@ class BPlusTreeFile:
             f.write(data)
 
         self.writes += 1
+        self._remember(position, node.copy())
         return position
 
+    def _remember(self, position: int, node: BPlusNode) -> None:
+        cache = self._cache
+        cache[position] = node
+        cache.move_to_end(position)
+        if len(cache) > NODE_CACHE_SIZE:
+            cache.popitem(last=False)
+
     def read_node(self, position: int) -> BPlusNode:
         """Lee un nodo desde su posición lógica (número de bloque)."""
+        node = self._cache.get(position)
+        if node is not None:
+            self._cache.move_to_end(position)
+            self.cache_hits += 1
+            return node.copy()
         with open(self.filename, "rb") as f:
             f.seek(position * BLOCK_SIZE)
             data = f.read(BLOCK_SIZE)
         self.reads += 1
-        return BPlusNode.deserialize(data)
+        node = BPlusNode.deserialize(data)
+        self._remember(position, node.copy())
+        return node
+
+    def read_nodes_batch(self, positions: list[int]) -> list[BPlusNode]:
+        """
+        Lee varios nodos con un solo open, en orden creciente de bloque (las hojas
+        hermanas suelen estar cerca en el archivo). Respeta la caché.
+        """
+        found = {}
+        missing = []
+        for p in positions:
+            node = self._cache.get(p)
+            if node is not None:
+                self._cache.move_to_end(p)
+                self.cache_hits += 1
+                found[p] = node.copy()
+            else:
+                missing.append(p)
+        if missing:
+            with open(self.filename, "rb") as f:
+                for p in sorted(set(missing)):
+                    f.seek(p * BLOCK_SIZE)
+                    node = BPlusNode.deserialize(f.read(BLOCK_SIZE))
+                    self.reads += 1
+                    self._remember(p, node.copy())
+                    found[p] = node
+        return [found[p] for p in positions]
 
 
 # ============================================================
@@ -113,11 +222,13 @@ class BPlusTreeIndex:
     def __init__(self, data_file: str = DATA_FILE, meta_file: str = META_FILE):
         self.file = BPlusTreeFile(data_file)
         self.meta_file = meta_file
+        os.makedirs(os.path.dirname(self.meta_file), exist_ok=True)  # una vez, no en cada _save_meta
         self.start_time = time.time()
 
         # Intentar cargar metadatos existentes
         if os.path.exists(self.meta_file) and os.path.getsize(data_file) > 0:
             self._load_meta()
+            self.file.read_node(self.root_pos)  # precarga la raíz en la caché
         else:
             # Crear raíz nueva (hoja)
             root = BPlusNode(is_leaf=True)
@@ -134,7 +245,6 @@ class BPlusTreeIndex:
             "block_size": BLOCK_SIZE,
             "data_file": self.file.filename
         }
-        os.makedirs(os.path.dirname(self.meta_file), exist_ok=True)
         with open(self.meta_file, "w", encoding="utf-8") as f:
             json.dump(meta, f, indent=2)
 
@@ -153,50 +263,246 @@ class BPlusTreeIndex:
     def search(self, key):
         node = self.file.read_node(self.root_pos)
         while not node.is_leaf:
-            i = 0
-            while i < len(node.keys) and key >= node.keys[i]:
-                i += 1
-            node = self.file.read_node(node.children[i])
-        # En hoja: búsqueda lineal (puedes optimizar con bisect)
-        for i, k in enumerate(node.keys):
-            if k == key:
-                return node.children[i]
+            node = self.file.read_node(node.children[bisect.bisect_right(node.keys, key)])
+        # En hoja: búsqueda binaria
+        i = bisect.bisect_left(node.keys, key)
+        if i < len(node.keys) and node.keys[i] == key:
+            return node.children[i]
         return None
 
     # ------------------------------
     # Búsqueda por rango
     # ------------------------------
     def range_search(self, start_key, end_key):
-        # Baja hasta la hoja donde podría comenzar start_key
+        """
+        Recorre las hojas por grupos de hermanas: en vez de seguir next_leaf de a
+        una lectura, las hojas restantes de cada padre se leen juntas
+        (read_nodes_batch). Los nodos internos del camino salen de la caché.
+        """
+        # Baja hasta la hoja donde podría comenzar start_key guardando el camino
+        path = []  # [nodo interno, índice del hijo tomado]
+        node = self.file.read_node(self.root_pos)
+        while not node.is_leaf:
+            i = bisect.bisect_right(node.keys, start_key)
+            path.append([node, i])
+            node = self.file.read_node(node.children[i])
+        depth = len(path)
+
+        results = []
+        # Cada hoja se recorta con dos búsquedas binarias (sin comparar clave por clave):
+        # [primera >= start_key, primera > end_key); si el corte cae antes del final, terminó
+        keys = node.keys
+        i = bisect.bisect_left(keys, start_key)
+        j = bisect.bisect_right(keys, end_key, i)
+        results.extend(zip(keys[i:j], node.children[i:j]))
+        if j < len(keys):
+            return results
+
+        while path:
+            # Hermanas a la derecha de la hoja actual bajo el mismo padre
+            parent, i = path[-1]
+            for leaf in self.file.read_nodes_batch(parent.children[i + 1:]):
+                keys = leaf.keys
+                j = bisect.bisect_right(keys, end_key)
+                results.extend(zip(keys[:j], leaf.children[:j]))
+                if j < len(keys):
+                    return results
+
+            # Siguiente padre de hojas: subir hasta un ancestro con hijos pendientes
+            path.pop()
+            while path and path[-1][1] + 1 >= len(path[-1][0].children):
+                path.pop()
+            if not path:
+                break
+            path[-1][1] += 1
+            # ...y bajar por la izquierda hasta el nivel de los padres de hojas
+            node = self.file.read_node(path[-1][0].children[path[-1][1]])
+            while len(path) < depth - 1:
+                path.append([node, 0])
+                node = self.file.read_node(node.children[0])
+            path.append([node, -1])  # -1: se leen todas sus hojas (desde la 0)
+        return results
+
+    # ------------------------------
+    # Búsqueda por rango descendente
+    # ------------------------------
+    def range_search_reverse(self, end_key=None, start_key=None, limit=None):
+        """
+        Pares (k, v) con start_key <= k <= end_key de mayor a menor (ORDER BY key
+        DESC LIMIT n). Baja a la hoja de end_key y retrocede por las hojas hermanas
+        con la pila del camino, igual que range_search hacia adelante; se detiene
+        al juntar `limit` resultados. None en una cota = sin cota por ese lado.
+        """
+        path = []  # [nodo interno, índice del hijo tomado]
         node = self.file.read_node(self.root_pos)
         while not node.is_leaf:
-            i = 0
-            while i < len(node.keys) and start_key >= node.keys[i]:
-                i += 1
+            i = len(node.children) - 1 if end_key is None else bisect.bisect_right(node.keys, end_key)
+            path.append([node, i])
             node = self.file.read_node(node.children[i])
+        depth = len(path)
 
         results = []
-        # Recorre hojas enlazadas hacia la derecha
-        while node:
-            for k, v in zip(node.keys, node.children):
-                if start_key <= k <= end_key:
-                    results.append((k, v))
-                elif k > end_key:
+        j = len(node.keys) if end_key is None else bisect.bisect_right(node.keys, end_key)
+        if self._collect_desc(node, j, start_key, limit, results):
+            return results
+
+        while path:
+            # Hermanas a la izquierda de la hoja actual bajo el mismo padre (de derecha a izquierda)
+            parent, i = path[-1]
+            for leaf in self.file.read_nodes_batch(parent.children[:i][::-1]):
+                if self._collect_desc(leaf, len(leaf.keys), start_key, limit, results):
                     return results
-            node = self.file.read_node(node.next_leaf) if node.next_leaf != -1 else None
+
+            # Padre de hojas anterior: subir hasta un ancestro con hijos a la izquierda
+            path.pop()
+            while path and path[-1][1] == 0:
+                path.pop()
+            if not path:
+                break
+            path[-1][1] -= 1
+            # ...y bajar por la derecha hasta el nivel de los padres de hojas
+            node = self.file.read_node(path[-1][0].children[path[-1][1]])
+            while len(path) < depth - 1:
+                path.append([node, len(node.children) - 1])
+                node = self.file.read_node(node.children[-1])
+            path.append([node, len(node.children)])  # se leen todas sus hojas
         return results
 
+    @staticmethod
+    def _collect_desc(leaf: BPlusNode, j: int, start_key, limit, results) -> bool:
+        """Agrega leaf.keys[:j] en orden inverso hasta start_key/limit; True si terminó el rango."""
+        keys = leaf.keys
+        lo = 0 if start_key is None else bisect.bisect_left(keys, start_key, 0, j)
+        for t in range(j - 1, lo - 1, -1):
+            if limit is not None and len(results) >= limit:
+                return True
+            results.append((keys[t], leaf.children[t]))
+        return lo > 0 or (limit is not None and len(results) >= limit)
+
     # ------------------------------
     # Inserción
     # ------------------------------
     def insert(self, key, value):
-        new_pos, new_child, split_key = self._insert_recursive(self.root_pos, key, value)
-        if new_child is not None:
-            # Crear nueva raíz
-            new_root = BPlusNode(is_leaf=False, keys=[split_key],
-                                 children=[self.root_pos, new_child])
-            self.root_pos = self.file.write_node(new_root)
-            self._save_meta()
+        # Descenso iterativo guardando el camino: (posición, nodo, índice del hijo tomado)
+        stack = []
+        pos = self.root_pos
+        node = self.file.read_node(pos)
+        while not node.is_leaf:
+            i = bisect.bisect_right(node.keys, key)
+            stack.append((pos, node, i))
+            pos = node.children[i]
+            node = self.file.read_node(pos)
+
+        # Caso hoja: evitar duplicados (se actualiza el valor si existe)
+        idx = bisect.bisect_left(node.keys, key)
+        if idx < len(node.keys) and node.keys[idx] == key:
+            node.children[idx] = value
+            self.file.write_node(node, position=pos)
+            return
+
+        # Las claves ya están ordenadas: basta insertar en la posición del bisect
+        node.keys.insert(idx, key)
+        node.children.insert(idx, value)
+        if len(node.keys) <= ORDER:
+            self.file.write_node(node, position=pos)
+            return
+        _, new_child, split_key = self._split_leaf(pos, node)
+
+        # Propagar la división hacia arriba con la pila del camino
+        while stack:
+            pos, node, i = stack.pop()
+            node.keys.insert(i, split_key)
+            node.children.insert(i + 1, new_child)
+            if len(node.keys) <= ORDER:
+                self.file.write_node(node, position=pos)
+                return
+            _, new_child, split_key = self._split_internal(pos, node)
+
+        # La raíz se dividió: crear nueva raíz
+        new_root = BPlusNode(is_leaf=False, keys=[split_key],
+                             children=[self.root_pos, new_child])
+        self.root_pos = self.file.write_node(new_root)
+        self._save_meta()
+
+    # ------------------------------
+    # Carga masiva
+    # ------------------------------
+    def bulk_load(self, items) -> int:
+        """
+        Inserta pares (clave, valor) ordenándolos primero y agregándolos a la hoja
+        más a la derecha: sin descenso por clave ni divisiones a la mitad (las hojas
+        quedan llenas con ORDER claves). Una clave que no va al final del árbol
+        (menor que lo ya cargado) se inserta por el camino normal. Retorna cuántos
+        pares se procesaron.
+        """
+        items = sorted(items, key=itemgetter(0))
+        if not items:
+            return 0
+        stack, leaf_pos, leaf = self._rightmost_path()
+
+        for key, value in items:
+            if leaf.keys:
+                last = leaf.keys[-1]
+                if key == last:
+                    leaf.children[-1] = value  # duplicado: se actualiza el valor
+                    continue
+                appendable = key > last
+            else:
+                # Hoja derecha vacía: vale cualquier clave >= al último separador del camino
+                appendable = not stack or not stack[-1][1].keys or key >= stack[-1][1].keys[-1]
+            if not appendable:
+                self.file.write_node(leaf, position=leaf_pos)
+                self.insert(key, value)
+                stack, leaf_pos, leaf = self._rightmost_path()
+                continue
+
+            if len(leaf.keys) < ORDER:
+                leaf.keys.append(key)
+                leaf.children.append(value)
+                continue
+
+            # Hoja llena: se cierra y la clave abre una hoja nueva a su derecha
+            right = BPlusNode(is_leaf=True, keys=[key], children=[value], next_leaf=leaf.next_leaf)
+            right_pos = self.file.write_node(right)
+            leaf.next_leaf = right_pos
+            self.file.write_node(leaf, position=leaf_pos)
+            self._append_to_parents(stack, key, right_pos)
+            leaf_pos, leaf = right_pos, right
+
+        self.file.write_node(leaf, position=leaf_pos)
+        self._save_meta()
+        return len(items)
+
+    def _rightmost_path(self):
+        """Camino raíz → hoja más a la derecha: ([(pos, nodo interno)], pos_hoja, hoja)."""
+        stack = []
+        pos = self.root_pos
+        node = self.file.read_node(pos)
+        while not node.is_leaf:
+            stack.append((pos, node))
+            pos = node.children[-1]
+            node = self.file.read_node(pos)
+        return stack, pos, node
+
+    def _append_to_parents(self, stack, key, child_pos) -> None:
+        """Cuelga child_pos (separador key) al final del camino derecho, dividiendo hacia arriba."""
+        level = len(stack) - 1
+        while level >= 0:
+            pos, parent = stack[level]
+            parent.keys.append(key)
+            parent.children.append(child_pos)
+            if len(parent.keys) <= ORDER:
+                self.file.write_node(parent, position=pos)
+                return
+            _, right_pos, key = self._split_internal(pos, parent)
+            stack[level] = (right_pos, self.file.read_node(right_pos))
+            child_pos = right_pos
+            level -= 1
+
+        # Se dividió la raíz: nueva raíz sobre el camino
+        new_root = BPlusNode(is_leaf=False, keys=[key], children=[self.root_pos, child_pos])
+        self.root_pos = self.file.write_node(new_root)
+        stack.insert(0, (self.root_pos, new_root))
 
     # Alias para parser
     def add(self, record):
@@ -213,47 +519,6 @@ class BPlusTreeIndex:
         else:
             raise TypeError("add(record) espera un dict con restaurant_id / restaurant_name.")
 
-    def _insert_recursive(self, pos, key, value):
-        node = self.file.read_node(pos)
-
-        # Caso hoja
-        if node.is_leaf:
-            # Evitar duplicados (puedes optar por actualizar el valor si existe)
-            if key in node.keys:
-                idx = node.keys.index(key)
-                node.children[idx] = value
-                self.file.write_node(node, position=pos)
-                return pos, None, None
-
-            node.keys.append(key)
-            node.children.append(value)
-            combined = sorted(zip(node.keys, node.children))
-            node.keys, node.children = map(list, zip(*combined))
-
-            if len(node.keys) > ORDER:
-                return self._split_leaf(pos, node)
-
-            self.file.write_node(node, position=pos)
-            return pos, None, None
-
-        # Caso nodo interno
-        i = 0
-        while i < len(node.keys) and key >= node.keys[i]:
-            i += 1
-        child_pos = node.children[i]
-        child_pos, new_child, split_key = self._insert_recursive(child_pos, key, value)
-
-        if new_child is not None:
-            node.keys.insert(i, split_key)
-            node.children.insert(i + 1, new_child)
-
-            if len(node.keys) > ORDER:
-                return self._split_internal(pos, node)
-
-            self.file.write_node(node, position=pos)
-
-        return pos, None, None
-
     def _split_leaf(self, pos, node: BPlusNode):
         mid = len(node.keys) // 2
         right = BPlusNode(is_leaf=True,
@@ -295,32 +560,25 @@ class BPlusTreeIndex:
         - No hace redistribución ni merge (los nodos pueden quedar sub-ocupados).
         Retorna True si eliminó, False si no encontró.
         """
-        removed = self._remove_in_leaf(self.root_pos, key)
-        if removed:
-            self._save_meta()
-        return removed
+        # Bajar a la hoja (iterativo)
+        pos = self.root_pos
+        node = self.file.read_node(pos)
+        while not node.is_leaf:
+            pos = node.children[bisect.bisect_right(node.keys, key)]
+            node = self.file.read_node(pos)
+
+        i = bisect.bisect_left(node.keys, key)
+        if i < len(node.keys) and node.keys[i] == key:
+            del node.keys[i]
+            del node.children[i]
+            self.file.write_node(node, position=pos)  # la raíz no cambia: metadatos intactos
+            return True
+        return False
 
     # Alias para parser
     def delete(self, key) -> bool:
         return self.remove(key)
 
-    def _remove_in_leaf(self, pos, key) -> bool:
-        node = self.file.read_node(pos)
-        if node.is_leaf:
-            if key in node.keys:
-                i = node.keys.index(key)
-                del node.keys[i]
-                del node.children[i]
-                self.file.write_node(node, position=pos)
-                return True
-            return False
-
-        # Nodo interno: bajar al hijo adecuado
-        i = 0
-        while i < len(node.keys) and key >= node.keys[i]:
-            i += 1
-        return self._remove_in_leaf(node.children[i], key)
-
     # ------------------------------
     # Utilidades
     # ------------------------------
@@ -338,7 +596,8 @@ class BPlusTreeIndex:
 
     def stats(self):
         elapsed_ms = (time.time() - self.start_time) * 1000.0
-        print(f"[B+Tree] Reads={self.file.reads} | Writes={self.file.writes} | Tiempo={elapsed_ms:.2f} ms")
+        print(f"[B+Tree] Reads={self.file.reads} | CacheHits={self.file.cache_hits} | "
+              f"Writes={self.file.writes} | Tiempo={elapsed_ms:.2f} ms")
 
     # Aliases útiles para el parser / estilo del enunciado
     def rangeSearch(self, begin_key, end_key):
@@ -349,19 +608,18 @@ class BPlusTreeIndex:
 # CLASE RECORD (CSV robusto con normalización)
 # ============================================================
 
+# BOM y comillas se eliminan; espacios → "_" (una sola pasada con str.translate)
+_NORMALIZE_TABLE = str.maketrans({"\ufeff": None, '"': None, "'": None, " ": "_"})
+
 class Record:
     def __init__(self, **kwargs):
         self.data = kwargs
 
     @staticmethod
+    @functools.lru_cache(maxsize=None)
     def normalize(text: str) -> str:
         """Normaliza nombres de columnas: quita BOM, comillas, espacios; minúscula con _."""
-        return (text.strip()
-                .replace("\ufeff", "")
-                .replace('"', "")
-                .replace("'", "")
-                .replace(" ", "_")
-                .lower())
+        return text.strip().translate(_NORMALIZE_TABLE).lower()
 
     @staticmethod
     def load_from_csv(csv_path: str):
@@ -369,12 +627,18 @@ class Record:
             raise FileNotFoundError(f"No se encontró el CSV: {csv_path}")
         records = []
         with open(csv_path, encoding="utf-8-sig", newline="") as f:
-            reader = csv.DictReader(f)
-            reader.fieldnames = [Record.normalize(h) for h in reader.fieldnames]
+            reader = csv.reader(f)
+            header = next(reader, None) or []
+            # Encabezados normalizados una sola vez; cada fila se empareja por posición
+            names = [Record.normalize(h) for h in header]
+            n = len(names)
             for row in reader:
-                normalized = {Record.normalize(k): (v.strip() if isinstance(v, str) else v)
-                              for k, v in row.items()}
-                records.append(Record(**normalized))
+                if not row:
+                    continue  # línea en blanco (DictReader también las salta)
+                values = [v.strip() for v in row[:n]]
+                if len(values) < n:
+                    values += [None] * (n - len(values))
+                records.append(Record(**dict(zip(names, values))))
         if not records:
             raise ValueError("El CSV está vacío o mal formateado.")
         return records
@@ -88,6 +88,18 @@ def run_tests():
     print(f"  Buscar {sample_key} tras reapertura: {reopened.search(sample_key)}")
     reopened.print_tree()
 
+    # --------------------------------------------------------
+    # Carga masiva (todos los registros, ordenados por clave)
+    # --------------------------------------------------------
+    print("\n[BULK LOAD] Índice aparte con todos los registros...")
+    bulk = BPlusTreeIndex(os.path.join(DATA_DIR, "bplustree_bulk.dat"),
+                          os.path.join(DATA_DIR, "bplustree_bulk_meta.json"))
+    t0 = time.time()
+    n = bulk.bulk_load((int(r.data["restaurant_id"]), r.data["restaurant_name"]) for r in records)
+    print(f"  {n} pares cargados en {time.time() - t0:.3f} s")
+    print(f"  Buscar {first_key}: {bulk.search(first_key)}")
+    bulk.stats()
+
     # --------------------------------------------------------
     # Estadísticas
     # --------------------------------------------------------
@@ -1,4 +1,5 @@
 from __future__ import annotations
+from array import array
 from dataclasses import dataclass, field
 from typing import Any, Callable, Dict, List, Optional
 import json
@@ -6,24 +7,131 @@ import os
 import struct
 from pathlib import Path
 
+# ------------------------------
+# Layout binario del payload de un bucket
+# ------------------------------
+# <II (local_depth, n_items) y luego, por ítem, clave y valor codificados como
+# tag (1 byte) + dato: None/bool sin dato, int64, float64, str (largo u32 + UTF-8),
+# dict de escalares con claves str (n u32 + pares) y, para lo demás, JSON (largo u32 + UTF-8).
+# Los payloads antiguos (JSON completo) empiezan con "{" y se siguen leyendo.
+PAYLOAD_FORMAT = "bin1"
+_BUCKET_HDR = struct.Struct("<II")
+_U32 = struct.Struct("<I")
+_I64 = struct.Struct("<q")
+_F64 = struct.Struct("<d")
+_T_NONE, _T_FALSE, _T_TRUE, _T_INT, _T_FLOAT, _T_STR, _T_DICT, _T_JSON = b"nFTifsdj"
+_JSON_MAGIC = ord("{")
+_INT64_MIN, _INT64_MAX = -(1 << 63), (1 << 63) - 1
+
+# Cada bucket ocupa un slot de tamaño múltiplo de SLOT_SIZE: mientras el payload
+# quepa en su slot, las actualizaciones se reescriben en el mismo lugar
+SLOT_SIZE = 1024
+
+
+def _encode_scalar(out: bytearray, v: Any) -> bool:
+    t = type(v)
+    if v is None:
+        out.append(_T_NONE)
+    elif t is bool:
+        out.append(_T_TRUE if v else _T_FALSE)
+    elif t is int and _INT64_MIN <= v <= _INT64_MAX:
+        out.append(_T_INT)
+        out += _I64.pack(v)
+    elif t is float:
+        out.append(_T_FLOAT)
+        out += _F64.pack(v)
+    elif t is str:
+        b = v.encode("utf-8")
+        out.append(_T_STR)
+        out += _U32.pack(len(b))
+        out += b
+    else:
+        return False
+    return True
+
+
+def _encode_value(out: bytearray, v: Any) -> None:
+    if type(v) is dict and all(type(k) is str for k in v):
+        mark = len(out)
+        out.append(_T_DICT)
+        out += _U32.pack(len(v))
+        for k, x in v.items():
+            _encode_scalar(out, k)
+            if not _encode_scalar(out, x):
+                del out[mark:]  # valor anidado: todo el dict va como JSON
+                break
+        else:
+            return
+    elif _encode_scalar(out, v):
+        return
+    b = json.dumps(v).encode("utf-8")
+    out.append(_T_JSON)
+    out += _U32.pack(len(b))
+    out += b
+
+
+def _decode_value(buf: bytes, off: int):
+    """Retorna (valor, nuevo offset)."""
+    tag = buf[off]
+    off += 1
+    if tag == _T_STR:
+        (n,) = _U32.unpack_from(buf, off)
+        off += 4
+        return buf[off:off + n].decode("utf-8"), off + n
+    if tag == _T_INT:
+        return _I64.unpack_from(buf, off)[0], off + 8
+    if tag == _T_FLOAT:
+        return _F64.unpack_from(buf, off)[0], off + 8
+    if tag == _T_DICT:
+        (n,) = _U32.unpack_from(buf, off)
+        off += 4
+        d = {}
+        for _ in range(n):
+            k, off = _decode_value(buf, off)
+            d[k], off = _decode_value(buf, off)
+        return d, off
+    if tag == _T_NONE:
+        return None, off
+    if tag == _T_TRUE or tag == _T_FALSE:
+        return tag == _T_TRUE, off
+    if tag == _T_JSON:
+        (n,) = _U32.unpack_from(buf, off)
+        off += 4
+        return json.loads(buf[off:off + n].decode("utf-8")), off + n
+    raise ValueError(f"Tag de valor desconocido en bucket: {tag!r}")
+
+
+def _identity_hash(k):
+    return k
+
 
 @dataclass
 class Bucket:
     capacity: int
     local_depth: int
-    items: Dict[Any, Any] = field(default_factory=dict)
+    # Claves y registros en listas paralelas: con pocos ítems por bucket una
+    # búsqueda lineal (list.index, en C) le gana al dict y se serializa directo
+    keys: List[Any] = field(default_factory=list)
+    values: List[Any] = field(default_factory=list)
+
+    def find(self, key: Any) -> int:
+        """Posición de key en el bucket, o -1."""
+        try:
+            return self.keys.index(key)
+        except ValueError:
+            return -1
 
     def is_full(self) -> bool:
-        return len(self.items) >= self.capacity
+        return len(self.keys) >= self.capacity
 
     def can_merge_with(self, other: "Bucket") -> bool:
-        return self.local_depth == other.local_depth and len(self.items) == 0 and len(other.items) == 0
+        return self.local_depth == other.local_depth and len(self.keys) == 0 and len(other.keys) == 0
 
 
 class ExtendibleHashing:
     """
     Implementación persistente de Extendible Hashing.
-    Guarda buckets en binario y el directorio en JSON.
+    Guarda buckets en binario (ver PAYLOAD_FORMAT) y el directorio en JSON.
     """
 
     _REC_HEADER_FMT = "<II"
@@ -34,7 +142,7 @@ class ExtendibleHashing:
         base_path: str = "data",
         bucket_capacity: int = 4,
         key_selector=lambda r: r["Restaurant ID"],
-        hash_fn=lambda k: k,
+        hash_fn=_identity_hash,
         name: str = "restaurants_hash"
     ):
         if bucket_capacity <= 0:
@@ -52,9 +160,13 @@ class ExtendibleHashing:
         self.bucket_capacity = bucket_capacity
         self.key_selector = key_selector
         self.hash_fn = hash_fn
+        # Con el hash por defecto el hash de una clave es la clave misma (split sin llamadas)
+        self._identity_hash = hash_fn is _identity_hash
 
         self.reads = 0
         self.writes = 0
+        # El directorio se persiste una vez por operación pública (ver _flush_dir)
+        self._dir_dirty = False
 
         # Cargar si existe o inicializar desde cero
         if os.path.exists(self.dir_path) and os.path.exists(self.data_path):
@@ -66,10 +178,19 @@ class ExtendibleHashing:
             root_bucket = Bucket(self.bucket_capacity, local_depth=1)
             with open(self.data_path, "wb") as _:
                 pass
-            self.directory: List[int] = [root_id, root_id]
-            self.bucket_offsets: Dict[str, int] = {}
+            # Directorio como arreglo compacto de int32 (duplicarlo es un memcpy)
+            self.directory = array("i", [root_id, root_id])
+            self.bucket_offsets: Dict[int, int] = {}
+            self.bucket_sizes: Dict[int, int] = {}
+            self.bucket_slots: Dict[int, int] = {}
             self._write_bucket(root_id, root_bucket)
             self._save_dir()
+        # Máscara de global_depth bits (se actualiza al duplicar el directorio)
+        self._mask = (1 << self.global_depth) - 1
+        # Índice inverso bucket_id -> posiciones del directorio que lo apuntan
+        self._dir_reverse: Dict[int, List[int]] = {}
+        for i, bid in enumerate(self.directory):
+            self._dir_reverse.setdefault(bid, []).append(i)
 
     # ------------------------------
     # Persistencia de directorio
@@ -81,20 +202,33 @@ class ExtendibleHashing:
         self.global_depth = meta["global_depth"]
         self.bucket_capacity = meta["bucket_capacity"]
         self.next_bucket_id = meta["next_bucket_id"]
-        self.directory = meta["directory"]
-        self.bucket_offsets = {str(k): int(v) for k, v in meta["bucket_offsets"].items()}
+        self.directory = array("i", meta["directory"])
+        # JSON guarda las claves como texto; en memoria se usan ids enteros
+        self.bucket_offsets = {int(k): int(v) for k, v in meta["bucket_offsets"].items()}
+        # Directorios antiguos no guardan el tamaño: esos buckets se leen en dos pasos
+        self.bucket_sizes = {int(k): int(v) for k, v in meta.get("bucket_sizes", {}).items()}
+        # Sin slot registrado (directorio antiguo) la primera reescritura va al final
+        self.bucket_slots = {int(k): int(v) for k, v in meta.get("bucket_slots", {}).items()}
 
     def _save_dir(self) -> None:
         meta = {
             "global_depth": self.global_depth,
             "bucket_capacity": self.bucket_capacity,
             "next_bucket_id": self.next_bucket_id,
-            "directory": self.directory,
+            "directory": self.directory.tolist(),
             "bucket_offsets": self.bucket_offsets,
+            "bucket_sizes": self.bucket_sizes,
+            "bucket_slots": self.bucket_slots,
+            "format": PAYLOAD_FORMAT,
         }
         with open(self.dir_path, "w", encoding="utf-8") as f:
-            json.dump(meta, f, indent=2)
+            json.dump(meta, f, separators=(",", ":"))
         self.writes += 1
+        self._dir_dirty = False
+
+    def _flush_dir(self) -> None:
+        if self._dir_dirty:
+            self._save_dir()
 
     # ------------------------------
     # Buckets
@@ -105,37 +239,82 @@ class ExtendibleHashing:
         return bid
 
     def _read_bucket(self, bucket_id: int) -> Bucket:
-        key = str(bucket_id)
-        if key not in self.bucket_offsets:
+        offset = self.bucket_offsets.get(bucket_id)
+        if offset is None:
             raise KeyError(f"Bucket id {bucket_id} no encontrado")
-        offset = self.bucket_offsets[key]
+        size = self.bucket_sizes.get(bucket_id)
 
         with open(self.data_path, "rb") as f:
             f.seek(offset)
-            header = f.read(self._REC_HEADER_SIZE)
-            rec_id, size = struct.unpack(self._REC_HEADER_FMT, header)
-            payload = f.read(size)
+            if size is not None:
+                # Tamaño conocido: header + payload en un solo read
+                payload = f.read(self._REC_HEADER_SIZE + size)[self._REC_HEADER_SIZE:]
+            else:
+                header = f.read(self._REC_HEADER_SIZE)
+                rec_id, size = struct.unpack(self._REC_HEADER_FMT, header)
+                payload = f.read(size)
+                self.bucket_sizes[bucket_id] = size
         self.reads += 1
 
-        data = json.loads(payload.decode("utf-8"))
-        ld = int(data["ld"])
-        items = {k: v for (k, v) in data["items"]}
-        return Bucket(self.bucket_capacity, ld, items)
+        if payload[:1] and payload[0] == _JSON_MAGIC:  # bucket escrito antes de "bin1"
+            data = json.loads(payload.decode("utf-8"))
+            ld = int(data["ld"])
+            items = {k: v for (k, v) in data["items"]}
+            return Bucket(self.bucket_capacity, ld, list(items), list(items.values()))
+
+        ld, n_items = _BUCKET_HDR.unpack_from(payload, 0)
+        off = _BUCKET_HDR.size
+        keys, values = [], []
+        for _ in range(n_items):
+            k, off = _decode_value(payload, off)
+            v, off = _decode_value(payload, off)
+            keys.append(k)
+            values.append(v)
+        return Bucket(self.bucket_capacity, ld, keys, values)
+
+    @staticmethod
+    def _encode_bucket(bucket: Bucket) -> bytes:
+        out = bytearray(_BUCKET_HDR.pack(bucket.local_depth, len(bucket.keys)))
+        for k, v in zip(bucket.keys, bucket.values):
+            _encode_value(out, k)
+            _encode_value(out, v)
+        return bytes(out)
+
+    def _slot_record(self, bucket_id: int, payload: bytes, slot: int) -> bytes:
+        """Header + payload rellenado con ceros hasta ocupar `slot` bytes."""
+        rec = struct.pack(self._REC_HEADER_FMT, int(bucket_id), len(payload)) + payload
+        return rec + b"\x00" * (slot - len(rec))
 
     def _write_bucket(self, bucket_id: int, bucket: Bucket) -> None:
-        payload = json.dumps({
-            "ld": bucket.local_depth,
-            "items": list(bucket.items.items())
-        }).encode("utf-8")
-
-        with open(self.data_path, "ab") as f:
-            offset = f.tell()
-            f.write(struct.pack(self._REC_HEADER_FMT, int(bucket_id), len(payload)))
-            f.write(payload)
+        payload = self._encode_bucket(bucket)
+        need = self._REC_HEADER_SIZE + len(payload)
+        slot = self.bucket_slots.get(bucket_id, 0)
+
+        if need <= slot:
+            # Cabe en su slot: se sobrescribe en el mismo offset
+            offset = self.bucket_offsets[bucket_id]
+            with open(self.data_path, "r+b") as f:
+                f.seek(offset)
+                f.write(struct.pack(self._REC_HEADER_FMT, int(bucket_id), len(payload)) + payload)
+        else:
+            # Bucket nuevo o que creció más allá de su slot: slot nuevo al final
+            slot = -(-need // SLOT_SIZE) * SLOT_SIZE
+            with open(self.data_path, "ab") as f:
+                offset = f.tell()
+                f.write(self._slot_record(bucket_id, payload, slot))
+            self.bucket_offsets[bucket_id] = offset
+            self.bucket_slots[bucket_id] = slot
         self.writes += 1
 
-        self.bucket_offsets[str(bucket_id)] = offset
-        self._save_dir()
+        self.bucket_sizes[bucket_id] = len(payload)
+        self._dir_dirty = True
+
+    def _reuse_slot(self, old_id: int, new_id: int) -> None:
+        """Pasa el slot de un bucket que salió del directorio a un bucket nuevo."""
+        if old_id in self.bucket_slots:
+            self.bucket_offsets[new_id] = self.bucket_offsets.pop(old_id)
+            self.bucket_slots[new_id] = self.bucket_slots.pop(old_id)
+            self.bucket_sizes.pop(old_id, None)
 
     # ------------------------------
     # Helpers de hashing y split
@@ -145,19 +324,29 @@ class ExtendibleHashing:
         return key_hash & ((1 << d) - 1)
 
     def _double_directory(self) -> None:
-        self.directory += self.directory
+        n = len(self.directory)
+        self.directory.extend(self.directory)
+        for idxs in self._dir_reverse.values():
+            idxs += [i + n for i in idxs]
         self.global_depth += 1
-        self._save_dir()
+        self._mask = (1 << self.global_depth) - 1
+        self._dir_dirty = True
 
     def _all_indexes_of_bucket_id(self, bucket_id: int) -> List[int]:
-        return [i for i, b in enumerate(self.directory) if b == bucket_id]
+        return list(self._dir_reverse.get(bucket_id, ()))
 
     def _buddy_index(self, idx: int, ld: int) -> int:
         return idx ^ (1 << (ld - 1))
 
-    def _split_bucket(self, idx: int) -> None:
+    def _split_bucket(self, idx: int, old_bucket: Optional[Bucket] = None, pending=None) -> bool:
+        """
+        Divide el bucket de directory[idx]. old_bucket evita releerlo si el llamador
+        ya lo tiene; pending = (clave, registro, hash) se coloca en el bucket que
+        le toque antes de escribir. Retorna True si pending quedó insertado.
+        """
         old_id = self.directory[idx]
-        old_bucket = self._read_bucket(old_id)
+        if old_bucket is None:
+            old_bucket = self._read_bucket(old_id)
 
         if old_bucket.local_depth == self.global_depth:
             self._double_directory()
@@ -168,40 +357,75 @@ class ExtendibleHashing:
         b0 = Bucket(self.bucket_capacity, new_ld)
         b1 = Bucket(self.bucket_capacity, new_ld)
 
-        # Reasignar punteros del directorio
-        for i in self._all_indexes_of_bucket_id(old_id):
-            bit = (i >> (new_ld - 1)) & 1
-            self.directory[i] = b1_id if bit else b0_id
-
-        # Redistribuir registros
-        for k, reg in old_bucket.items.items():
-            try:
-                h = int(self.hash_fn(int(k)))  # si es string numérico
-            except Exception:
+        # Reasignar punteros del directorio (y el índice inverso); el mismo bit
+        # new_ld-1 decide el lado de cada posición y de cada registro
+        shift = new_ld - 1
+        directory = self.directory
+        idx0, idx1 = [], []
+        for i in self._dir_reverse.pop(old_id, ()):
+            if (i >> shift) & 1:
+                directory[i] = b1_id
+                idx1.append(i)
+            else:
+                directory[i] = b0_id
+                idx0.append(i)
+        self._dir_reverse[b0_id] = idx0
+        self._dir_reverse[b1_id] = idx1
+
+        # Redistribuir registros según el bit new_ld-1 del hash
+        if self._identity_hash:
+            for k, reg in zip(old_bucket.keys, old_bucket.values):
                 try:
-                    h = int(self.hash_fn(k))
-                except Exception:
+                    h = int(k)  # clave guardada como string numérico
+                except (TypeError, ValueError):
                     h = abs(hash(str(k)))
-
-            bit = (self._index(h, new_ld) >> (new_ld - 1)) & 1
-            (b1 if bit else b0).items[k] = reg
-
-        # Guardar nuevos buckets
+                dst = b1 if (h >> shift) & 1 else b0
+                dst.keys.append(k)
+                dst.values.append(reg)
+        else:
+            hash_fn = self.hash_fn
+            for k, reg in zip(old_bucket.keys, old_bucket.values):
+                try:
+                    h = int(hash_fn(int(k)))  # si es string numérico
+                except Exception:
+                    try:
+                        h = int(hash_fn(k))
+                    except Exception:
+                        h = abs(hash(str(k)))
+                dst = b1 if (h >> shift) & 1 else b0
+                dst.keys.append(k)
+                dst.values.append(reg)
+
+        placed = False
+        if pending is not None:
+            k, reg, h = pending
+            target = b1 if (h >> shift) & 1 else b0
+            if not target.is_full():
+                target.keys.append(k)
+                target.values.append(reg)
+                placed = True
+
+        # Guardar nuevos buckets (b0 reutiliza el slot del bucket dividido)
+        self._reuse_slot(old_id, b0_id)
         self._write_bucket(b0_id, b0)
         self._write_bucket(b1_id, b1)
-        self._save_dir()
+        return placed
 
     # ------------------------------
     # Operaciones públicas
     # ------------------------------
     def search(self, key: Any) -> Optional[Any]:
-        h = self.hash_fn(key)
-        idx = self._index(h)
-        bid = self.directory[idx]
-        bucket = self._read_bucket(bid)
-        return bucket.items.get(str(key))
+        bucket = self._read_bucket(self.directory[self.hash_fn(key) & self._mask])
+        i = bucket.find(str(key))
+        return bucket.values[i] if i >= 0 else None
 
     def add(self, registro: Any) -> None:
+        try:
+            self._add(registro)
+        finally:
+            self._flush_dir()
+
+    def _add(self, registro: Any) -> None:
         # Clave real
         key_raw = self.key_selector(registro)
 
@@ -215,39 +439,74 @@ class ExtendibleHashing:
             # Si hash_fn devuelve string o algo raro, forzamos a hash nativo
             h = abs(hash(str(key_raw)))
 
+        directory, mask = self.directory, self._mask
+        read_bucket, write_bucket = self._read_bucket, self._write_bucket
         while True:
-            idx = self._index(h)
-            bid = self.directory[idx]
-            bucket = self._read_bucket(bid)
+            idx = h & mask
+            bid = directory[idx]
+            bucket = read_bucket(bid)
 
             # Actualizar si ya existe
-            if key in bucket.items:
-                bucket.items[key] = registro
-                self._write_bucket(bid, bucket)
+            i = bucket.find(key)
+            if i >= 0:
+                bucket.values[i] = registro
+                write_bucket(bid, bucket)
                 return
 
             # Insertar si hay espacio
             if not bucket.is_full():
-                bucket.items[key] = registro
-                self._write_bucket(bid, bucket)
+                bucket.keys.append(key)
+                bucket.values.append(registro)
+                write_bucket(bid, bucket)
                 return
 
-            # Si el bucket está lleno, dividirlo
-            self._split_bucket(idx)
+            # Si el bucket está lleno, dividirlo (puede duplicar el directorio);
+            # el registro entra en la misma división si su nuevo bucket tiene espacio
+            if self._split_bucket(idx, bucket, (key, registro, h)):
+                return
+            directory, mask = self.directory, self._mask
 
     def remove(self, key: Any) -> bool:
-        h = self.hash_fn(int(key))
-        idx = self._index(h)
-        bid = self.directory[idx]
+        bid = self.directory[self.hash_fn(int(key)) & self._mask]
         bucket = self._read_bucket(bid)
 
-        key = str(key)
-        if key in bucket.items:
-            del bucket.items[key]
+        i = bucket.find(str(key))
+        if i >= 0:
+            del bucket.keys[i]
+            del bucket.values[i]
             self._write_bucket(bid, bucket)
+            self._flush_dir()
             return True
         return False
 
+    def compact(self) -> int:
+        """
+        Reescribe el archivo de datos solo con los buckets vivos (los que apunta el
+        directorio), cada uno en un slot nuevo. Sirve para archivos escritos antes
+        de los slots (solo append). Retorna los bytes liberados.
+        """
+        before = os.path.getsize(self.data_path)
+        live = [(bid, self._read_bucket(bid)) for bid in dict.fromkeys(self.directory)]
+
+        offsets: Dict[int, int] = {}
+        sizes: Dict[int, int] = {}
+        slots: Dict[int, int] = {}
+        tmp = self.data_path + ".tmp"
+        with open(tmp, "wb") as f:
+            for bid, bucket in live:
+                payload = self._encode_bucket(bucket)
+                slot = -(-(self._REC_HEADER_SIZE + len(payload)) // SLOT_SIZE) * SLOT_SIZE
+                offsets[bid] = f.tell()
+                sizes[bid] = len(payload)
+                slots[bid] = slot
+                f.write(self._slot_record(bid, payload, slot))
+        os.replace(tmp, self.data_path)
+        self.writes += 1
+
+        self.bucket_offsets, self.bucket_sizes, self.bucket_slots = offsets, sizes, slots
+        self._save_dir()
+        return before - os.path.getsize(self.data_path)
+
     # ------------------------------
     # Debug e informes
     # ------------------------------
@@ -264,4 +523,4 @@ class ExtendibleHashing:
             groups.setdefault(bid, []).append(i)
         for bid, idxs in groups.items():
             b = self._read_bucket(bid)
-            print(f"Bucket id={bid} ld={b.local_depth} dir-idx={idxs} keys={list(b.items.keys())}")
+            print(f"Bucket id={bid} ld={b.local_depth} dir-idx={idxs} keys={b.keys}")
@@ -1,7 +1,7 @@
 import os
 import struct
 from dataclasses import dataclass
-from typing import List, Tuple, Optional
+from typing import Iterator, List, Tuple, Optional
 from bisect import bisect_right
 from bisect import bisect_left
 import csv
@@ -1022,16 +1022,18 @@ class ISAM:
 # UTILIDADES
 # =========================
 
-def _read_restaurants_csv(csv_path: str) -> List[Record]:
-    recs: List[Record] = []
+def _iter_restaurants_csv(csv_path: str) -> Iterator[Record]:
+    """Genera los Records del CSV fila por fila, sin materializar el archivo completo."""
     with open(csv_path, "r", encoding="utf-8-sig", newline="") as f:
         reader = csv.reader(f)
         headers = next(reader, None)  # descartar encabezado
         for row in reader:
             if not row or not row[0].strip():
                 continue
-            recs.append(Record.from_csv_row(row))
-    return recs
+            yield Record.from_csv_row(row)
+
+def _read_restaurants_csv(csv_path: str) -> List[Record]:
+    return list(_iter_restaurants_csv(csv_path))
 
 def _print_result(tag: str, res):
     if res is None:
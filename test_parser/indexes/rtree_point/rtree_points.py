@@ -1,7 +1,8 @@
 from __future__ import annotations
 from dataclasses import dataclass
 from typing import Iterable, List, Tuple, Optional, Dict
-import math, pandas as pd, time, json
+import functools, math, pandas as pd, time, json
+import numpy as np
 from pathlib import Path
 
 try:
@@ -12,6 +13,24 @@ except ImportError as e:
 
 Coord = Tuple[float, float]
 
+EARTH_RADIUS_KM = 6371.0088
+META_FORMAT = "cols1"  # .meta columnar (ids/x/y + columnas de payload)
+KM_PER_DEG = 111.0
+META_LOG_MAX = 1000  # eliminaciones en el .meta.log antes de compactar al .meta
+HILBERT_ORDER = 16  # bits por eje de la curva de Hilbert (grilla 2^16 x 2^16)
+
+
+@functools.lru_cache(maxsize=1024)
+def _km_to_deg(lat_rounded: float, radio_km: float) -> Tuple[float, float]:
+    """
+    Semiancho (dlat, dlon) en grados de la caja que cubre radio_km alrededor
+    de una latitud. La latitud llega redondeada a 3 decimales para reutilizar
+    el cálculo entre consultas cercanas (la caja es solo un prefiltro).
+    """
+    dlat = radio_km / KM_PER_DEG
+    dlon = radio_km / (KM_PER_DEG * max(math.cos(math.radians(lat_rounded)), 1e-9))
+    return dlat, dlon
+
 
 @dataclass
 class PointRec:
@@ -20,12 +39,52 @@ class PointRec:
     payload: Optional[Dict] = None
 
 
+def _hilbert_keys(xs: np.ndarray, ys: np.ndarray, order: int = HILBERT_ORDER) -> np.ndarray:
+    """
+    Índice en la curva de Hilbert de cada punto (vectorizado, algoritmo xy2d).
+    Las coordenadas se normalizan a la grilla 2^order x 2^order del bounding box.
+    """
+    n = 1 << order
+    def _grid(v):
+        lo, hi = float(v.min()), float(v.max())
+        scale = (n - 1) / (hi - lo) if hi > lo else 0.0
+        return ((v - lo) * scale).astype(np.int64)
+
+    x, y = _grid(xs), _grid(ys)
+    d = np.zeros(len(x), dtype=np.int64)
+    s = n >> 1
+    while s > 0:
+        rx = (x & s) > 0
+        ry = (y & s) > 0
+        d += s * s * ((3 * rx.astype(np.int64)) ^ ry.astype(np.int64))
+        # Rotar el cuadrante para el siguiente nivel
+        flip = ~ry & rx
+        x = np.where(flip, n - 1 - x, x)
+        y = np.where(flip, n - 1 - y, y)
+        x, y = np.where(ry, x, y), np.where(ry, y, x)
+        s >>= 1
+    return d
+
+
 class RTreePoints:
     def __init__(self, index_name: Optional[str] = None, max_children: int = 50):
         self.index_name = index_name
         self.max_children = max_children
         self._rows: Dict[int, PointRec] = {}
+        # Índice secundario Restaurant_ID → pid (evita recorrer _rows en cada insert)
+        self._by_restaurant_id: Dict = {}
         self._next_id = 0
+        # Coordenadas en arreglo (N, 2) indexado por pid (NaN = borrado);
+        # se reconstruye perezosamente tras inserciones/eliminaciones
+        self._coords_np: Optional[np.ndarray] = None
+        # Mismo arreglo en radianes + cos(lat) por punto: (lon_r, lat_r, cos_lat)
+        self._coords_rad_np: Optional[np.ndarray] = None
+        # Metadata pendiente de escribir (add_point/remove no reescriben el .meta)
+        self._dirty = False
+        # Eliminaciones aún no escritas y cuántas hay ya en el .meta.log
+        self._pending_dels: List[int] = []
+        self._log_entries = 0
+        self._log_path: Optional[Path] = None
         self._created_time = time.strftime("%Y-%m-%d %H:%M:%S")
 
         p = rindex.Property()
@@ -45,6 +104,7 @@ class RTreePoints:
             base = Path(index_name).resolve()
             base.parent.mkdir(parents=True, exist_ok=True)
             self._meta_path = base.with_suffix(".meta")
+            self._log_path = base.parent / (base.name + ".meta.log")
 
             data_file = base.with_suffix(".data")
             index_file = base.with_suffix(".index")
@@ -55,20 +115,17 @@ class RTreePoints:
                     self._idx = rindex.Index(str(base), properties=p)
                     with open(self._meta_path, "r", encoding="utf8") as f:
                         raw = json.load(f)
-                    for rid, info in raw.items():
-                        self._rows[int(rid)] = PointRec(
-                            id=int(rid),
-                            coords=tuple(info["coords"]),
-                            payload=info["payload"],
-                        )
+                    self._load_meta(raw)
                     self._next_id = max(self._rows.keys(), default=-1) + 1
+                    self._replay_log()
+                    self._reindex_restaurant_ids()
                     print(f"[INFO] R-Tree reabierto desde {base} con {len(self._rows)} registros.")
                     return
                 except Exception:
                     print(f"[WARN] Falló reapertura, recreando índice desde cero...")
 
             # Si no existe → limpiar archivos corruptos
-            for f in (data_file, index_file, self._meta_path):
+            for f in (data_file, index_file, self._meta_path, self._log_path):
                 if f.exists():
                     f.unlink(missing_ok=True)
 
@@ -82,42 +139,49 @@ class RTreePoints:
     # Inserción y cierre
     # ==============================================================
 
+    def _reindex_restaurant_ids(self):
+        """Reconstruye _by_restaurant_id a partir de _rows."""
+        self._by_restaurant_id = {
+            rec.payload["Restaurant_ID"]: pid
+            for pid, rec in self._rows.items()
+            if rec.payload and rec.payload.get("Restaurant_ID") is not None
+        }
+
     def add_point(self, x: float, y: float, payload: Optional[Dict] = None) -> int:
         """Inserta un punto. Si el Restaurant_ID ya existe, lo reemplaza."""
         payload = {k.strip().replace(" ", "_"): v for k, v in (payload or {}).items()}
         restaurant_id = payload.get("Restaurant_ID")
 
+        pid = self._next_id
+        self._next_id += 1
+
         # Si ya existe ese Restaurant_ID, reemplazar
         if restaurant_id is not None:
-            duplicates = [
-                pid for pid, rec in self._rows.items()
-                if rec.payload and rec.payload.get("Restaurant_ID") == restaurant_id
-            ]
-            for pid in duplicates:
-                rec = self._rows.pop(pid)
+            old = self._by_restaurant_id.pop(restaurant_id, None)
+            rec = self._rows.pop(old, None) if old is not None else None
+            if rec is not None:
                 try:
-                    self._idx.delete(pid, (rec.coords[0], rec.coords[1], rec.coords[0], rec.coords[1]))
+                    self._idx.delete(old, (rec.coords[0], rec.coords[1], rec.coords[0], rec.coords[1]))
                 except Exception:
                     pass
+            self._by_restaurant_id[restaurant_id] = pid
 
         # Insertar nuevo punto
-        pid = self._next_id
-        self._next_id += 1
         rec = PointRec(id=pid, coords=(float(x), float(y)), payload=payload)
         self._rows[pid] = rec
+        self._coords_np = self._coords_rad_np = None
+        self._dirty = True
         self._idx.insert(pid, (x, y, x, y))
-        self.save()
         return pid
 
+    def __len__(self) -> int:
+        """Cantidad de puntos indexados."""
+        return len(self._rows)
+
     def close(self):
-        """Cierra y guarda metadata si es persistente."""
-        if self._meta_path:
-            meta = {
-                rid: {"coords": rec.coords, "payload": rec.payload}
-                for rid, rec in self._rows.items()
-            }
-            with open(self._meta_path, "w", encoding="utf8") as f:
-                json.dump(meta, f, indent=2, ensure_ascii=False)
+        """Cierra y guarda metadata si es persistente (compactando el .meta.log)."""
+        if self._dirty or self._pending_dels or self._log_entries:
+            self.save()
 
         try:
             del self._idx
@@ -130,12 +194,159 @@ class RTreePoints:
     def save(self):
         """Guarda metadata sin cerrar el índice."""
         if self._meta_path:
-            meta = {
-                rid: {"coords": rec.coords, "payload": rec.payload}
-                for rid, rec in self._rows.items()
-            }
             with open(self._meta_path, "w", encoding="utf8") as f:
-                json.dump(meta, f, indent=2, ensure_ascii=False)
+                json.dump(self._dump_meta(), f, separators=(",", ":"), ensure_ascii=False)
+            # El .meta ya incluye las eliminaciones registradas
+            self._log_path.unlink(missing_ok=True)
+        self._dirty = False
+        self._pending_dels = []
+        self._log_entries = 0
+
+    def _append_log(self):
+        """Registra las eliminaciones pendientes como una línea del .meta.log."""
+        with open(self._log_path, "a", encoding="utf8") as f:
+            f.write(json.dumps({"op": "del", "ids": self._pending_dels}) + "\n")
+        self._log_entries += len(self._pending_dels)
+        self._pending_dels = []
+
+    def _replay_log(self):
+        """Aplica sobre _rows las eliminaciones del .meta.log (tras reabrir)."""
+        if not self._log_path or not self._log_path.exists():
+            return
+        with open(self._log_path, "r", encoding="utf8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except ValueError:
+                    print("[WARN] Línea inválida en .meta.log, se omite.")
+                    continue
+                if entry.get("op") == "del":
+                    for pid in entry.get("ids", []):
+                        self._rows.pop(pid, None)
+                    self._log_entries += len(entry.get("ids", []))
+
+    def _dump_meta(self) -> Dict:
+        """
+        Metadata en columnas: un arreglo por campo en vez de un dict por punto.
+        Cada fila apunta a su 'esquema' (tupla de claves del payload), así
+        payloads con claves distintas se reconstruyen exactamente.
+        """
+        recs = list(self._rows.values())
+        schemas: Dict[Tuple, int] = {}
+        cols: Dict[str, List] = {}
+        row_schema = []
+        for i, rec in enumerate(recs):
+            payload = rec.payload or {}
+            keys = tuple(payload)
+            sid = schemas.setdefault(keys, len(schemas))
+            row_schema.append(sid)
+            for k, v in payload.items():
+                col = cols.get(k)
+                if col is None:
+                    col = cols[k] = [None] * len(recs)
+                col[i] = v
+        return {
+            "format": META_FORMAT,
+            "ids": [rec.id for rec in recs],
+            "x": [rec.coords[0] for rec in recs],
+            "y": [rec.coords[1] for rec in recs],
+            "schemas": [list(k) for k in schemas],
+            "schema": row_schema,
+            "cols": cols,
+        }
+
+    def _load_meta(self, raw: Dict):
+        """Carga _rows desde el .meta (columnar o el formato antiguo por punto)."""
+        if raw.get("format") != META_FORMAT:
+            for rid, info in raw.items():
+                self._rows[int(rid)] = PointRec(
+                    id=int(rid),
+                    coords=tuple(info["coords"]),
+                    payload=info["payload"],
+                )
+            return
+
+        schemas = raw["schemas"]
+        cols = raw["cols"]
+        for i, (rid, x, y, sid) in enumerate(zip(raw["ids"], raw["x"], raw["y"], raw["schema"])):
+            payload = {k: cols[k][i] for k in schemas[sid]}
+            self._rows[rid] = PointRec(id=rid, coords=(x, y), payload=payload)
+
+    def flush(self):
+        """
+        Escribe la metadata solo si hubo cambios desde el último guardado.
+        Si solo hubo eliminaciones se agregan al .meta.log; el .meta completo se
+        reescribe cuando el log supera META_LOG_MAX.
+        """
+        if self._dirty:
+            self.save()
+        elif self._pending_dels and self._meta_path:
+            if self._log_entries + len(self._pending_dels) > META_LOG_MAX:
+                self.save()
+            else:
+                self._append_log()
+
+    def _rebuild_from_stream(self, recs: List[PointRec]):
+        """
+        Reconstruye el índice con carga masiva (STR packing de libspatialindex)
+        a partir de recs ya deduplicados. Reemplaza archivos .index/.data previos.
+        """
+        if not recs:
+            return
+        try:
+            self._idx.close()
+        except Exception:
+            pass
+
+        stream = ((r.id, (r.coords[0], r.coords[1], r.coords[0], r.coords[1]), None) for r in recs)
+        if self.index_name:
+            base = Path(self.index_name).resolve()
+            for f in (base.with_suffix(".data"), base.with_suffix(".index")):
+                f.unlink(missing_ok=True)
+            self._idx = rindex.Index(str(base), stream, properties=self._prop)
+        else:
+            self._idx = rindex.Index(stream, properties=self._prop)
+
+    @classmethod
+    def bulk_load(
+        cls,
+        points: Iterable[Tuple[float, float, Optional[Dict]]],
+        index_name: Optional[str] = None,
+        max_children: int = 50,
+    ) -> RTreePoints:
+        """
+        Construye el R-Tree de una sola vez a partir de (x, y, payload).
+        Mantiene la semántica de add_point (un Restaurant_ID repetido reemplaza
+        al anterior) y escribe la metadata una única vez al final.
+        """
+        rt = cls(index_name=index_name, max_children=max_children)
+        by_rid = rt._by_restaurant_id
+        for x, y, payload in points:
+            payload = {k.strip().replace(" ", "_"): v for k, v in (payload or {}).items()}
+            pid = rt._next_id
+            rt._next_id += 1
+            rid = payload.get("Restaurant_ID")
+            if rid is not None:
+                old = by_rid.pop(rid, None)
+                if old is not None:
+                    rt._rows.pop(old, None)
+                by_rid[rid] = pid
+            rt._rows[pid] = PointRec(id=pid, coords=(float(x), float(y)), payload=payload)
+
+        # Renumerar en orden de Hilbert: pids contiguos quedan cerca en el plano
+        recs = list(rt._rows.values())
+        if len(recs) > 1:
+            coords = np.array([r.coords for r in recs], dtype=np.float64)
+            order = np.argsort(_hilbert_keys(coords[:, 0], coords[:, 1]), kind="stable")
+            recs = [recs[i] for i in order.tolist()]
+        rt._rows = {pid: PointRec(id=pid, coords=r.coords, payload=r.payload) for pid, r in enumerate(recs)}
+        rt._next_id = len(recs)
+        rt._reindex_restaurant_ids()
+
+        rt._rebuild_from_stream(list(rt._rows.values()))
+        rt.save()
+        print(f"[INFO] R-Tree cargado en bloque con {len(rt._rows)} puntos.")
+        return rt
 
     # ==============================================================
     # Consultas
@@ -147,38 +358,81 @@ class RTreePoints:
 
     @staticmethod
     def _haversine_km(a: Coord, b: Coord) -> float:
-        R = 6371.0088
+        R = EARTH_RADIUS_KM
         lon1, lat1 = map(math.radians, a)
         lon2, lat2 = map(math.radians, b)
         dlon, dlat = lon2 - lon1, lat2 - lat1
         h = math.sin(dlat / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin(dlon / 2) ** 2
         return 2 * R * math.asin(math.sqrt(h))
 
+    def _coords_array(self) -> np.ndarray:
+        """Arreglo (next_id, 2) float64 con las coordenadas de cada pid vivo."""
+        if self._coords_np is None:
+            arr = np.full((self._next_id, 2), np.nan, dtype=np.float64)
+            if self._rows:
+                pids = np.fromiter(self._rows.keys(), dtype=np.int64, count=len(self._rows))
+                arr[pids] = [rec.coords for rec in self._rows.values()]
+            self._coords_np = arr
+        return self._coords_np
+
+    def _coords_rad_array(self) -> np.ndarray:
+        """(next_id, 3): lon y lat en radianes y cos(lat), precalculados una vez."""
+        if self._coords_rad_np is None:
+            rad = np.radians(self._coords_array())
+            self._coords_rad_np = np.column_stack((rad, np.cos(rad[:, 1])))
+        return self._coords_rad_np
+
     def range_search_km(self, point: Coord, radio_km: float) -> List[Dict]:
         lon, lat = point
-        dlat = radio_km / 111.0
-        dlon = radio_km / (111.0 * max(math.cos(math.radians(lat)), 1e-9))
+        dlat, dlon = _km_to_deg(round(lat, 3), radio_km)
         bbox = (lon - dlon, lat - dlat, lon + dlon, lat + dlat)
+
+        cands = np.fromiter(self._idx.intersection(bbox), dtype=np.int64)
+        if cands.size == 0:
+            return []
+        coords_rad = self._coords_rad_array()
+        cands = cands[cands < len(coords_rad)]
+
+        # Haversine vectorizado sobre todos los candidatos a la vez
+        lon1, lat1 = math.radians(lon), math.radians(lat)
+        rad = coords_rad[cands]
+        dlon_r = rad[:, 0] - lon1
+        dlat_r = rad[:, 1] - lat1
+        h = np.sin(dlat_r / 2) ** 2 + math.cos(lat1) * rad[:, 2] * np.sin(dlon_r / 2) ** 2
+        dkm = 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(h))
+
+        keep = np.flatnonzero(dkm <= radio_km)  # NaN (borrados) nunca pasan
+        keep = keep[np.argsort(dkm[keep], kind="stable")]
+        rows = self._rows
         out = []
-        for pid in self._idx.intersection(bbox):
-            rec = self._rows.get(pid)
-            if not rec:
-                continue
-            dkm = self._haversine_km(point, rec.coords)
-            if dkm <= radio_km:
-                out.append({"id": pid, "dist_km": dkm, **rec.payload})
-        return sorted(out, key=lambda r: r["dist_km"])
+        for pid, d in zip(cands[keep].tolist(), dkm[keep].tolist()):
+            rec = rows.get(pid)
+            if rec:
+                out.append({"id": pid, "dist_km": d, **rec.payload})
+        return out
 
     def knn(self, point: Coord, k: int = 5) -> List[Dict]:
         qx, qy = map(float, point)
+        cands = np.fromiter(self._idx.nearest((qx, qy, qx, qy), k), dtype=np.int64)
+        if cands.size == 0:
+            return []
+        coords = self._coords_array()
+        cands = cands[cands < len(coords)]
+
+        # Ordenar por distancia al cuadrado; la raíz solo para las filas devueltas
+        xy = coords[cands]
+        dx = xy[:, 0] - qx
+        dy = xy[:, 1] - qy
+        d2 = dx * dx + dy * dy
+        order = np.argsort(d2, kind="stable")
+        order = order[~np.isnan(d2[order])]
+        rows = self._rows
         out = []
-        for pid in self._idx.nearest((qx, qy, qx, qy), k):
-            rec = self._rows.get(pid)
-            if not rec:
-                continue
-            d = self._dist(rec.coords, (qx, qy))
-            out.append({"id": pid, "dist": d, **rec.payload})
-        return sorted(out, key=lambda r: r["dist"])
+        for pid, d in zip(cands[order].tolist(), np.sqrt(d2[order]).tolist()):
+            rec = rows.get(pid)
+            if rec:
+                out.append({"id": pid, "dist": d, **rec.payload})
+        return out
 
     # ==============================================================
     # Carga desde CSV / DataFrame
@@ -194,13 +448,16 @@ class RTreePoints:
         index_name: Optional[str] = None,
         max_children: int = 50,
     ) -> RTreePoints:
-        keep_cols = list(keep_cols or [])
-        rt = cls(index_name=index_name, max_children=max_children)
-        for _, row in df.iterrows():
-            payload = {c: row[c] for c in keep_cols if c in row}
-            rt.add_point(row[x_col], row[y_col], payload)
-       # rt.close()  # guardar metadata
-        return rt
+        keep_cols = [c for c in (keep_cols or []) if c in df.columns]
+        # Columnas completas (tolist → tipos nativos) en vez de una Series por fila
+        xs = df[x_col].to_numpy(dtype=np.float64).tolist()
+        ys = df[y_col].to_numpy(dtype=np.float64).tolist()
+        payload_cols = [df[c].tolist() for c in keep_cols]
+        points = (
+            (x, y, dict(zip(keep_cols, vals)))
+            for x, y, *vals in zip(xs, ys, *payload_cols)
+        )
+        return cls.bulk_load(points, index_name=index_name, max_children=max_children)
 
     # ==============================================================
     # Utilidades / Debug
@@ -237,9 +494,9 @@ class RTreePoints:
     def remove_point_by_id(self, restaurant_id: int):
         """Elimina TODOS los puntos cuya payload['Restaurant_ID'] == restaurant_id."""
         matches = []
-        for pid, rec in list(self._rows.items()):
-            if rec.payload and rec.payload.get("Restaurant_ID") == restaurant_id:
-                matches.append((pid, rec.coords))
+        pid = self._by_restaurant_id.pop(restaurant_id, None)
+        if pid is not None and pid in self._rows:
+            matches.append((pid, self._rows[pid].coords))
 
         if not matches:
             print(f"[WARN] R-Tree: Restaurant_ID={restaurant_id} no encontrado.")
@@ -252,9 +509,10 @@ class RTreePoints:
             except Exception as e:
                 print(f"[WARN] Falló eliminación en índice espacial (pid={pid}): {e}")
             self._rows.pop(pid, None)
+        self._coords_np = self._coords_rad_np = None
+        if self._meta_path:
+            self._pending_dels.extend(pid for pid, _ in matches)
 
-        # Persistir sin cerrar (más estable)
-        self.save()
         print(f"[OK] {len(matches)} punto(s) con Restaurant_ID={restaurant_id} eliminado(s) del R-Tree.")
 
 
@@ -1,31 +1,123 @@
 import os
+import functools
 import json
+import mmap
+import operator
+import pickle
 import struct
 import re
-from typing import List, Any, Optional
+from contextlib import contextmanager
+from bisect import bisect_left, bisect_right, insort
+from typing import BinaryIO, Dict, List, Any, Optional
+try:
+    import numpy as np
+except ImportError:  # sin NumPy: select_all decodifica slot por slot
+    np = None
 from test_parser.core.parser.ast_nodes import ConditionNode, BetweenConditionNode
 
-CATALOG_FILE = "data/catalog.json"
+CATALOG_FILE = "data/catalog.pkl"
+LEGACY_CATALOG_FILE = "catalog.json"  # catálogo JSON antiguo (solo lectura / migración)
+CATALOG_PROTOCOL = 5
 HEADER_FMT = "<IqI"
-HEADER_SIZE = struct.calcsize(HEADER_FMT)
+HEADER_STRUCT = struct.Struct(HEADER_FMT)
+HEADER_SIZE = HEADER_STRUCT.size
 FREE_PTR_SIZE = 8
+_VARCHAR_RE = re.compile(r"\[(\d+)\]")  # tamaño de VARCHAR[n]
+
+# Structs precompilados (evitan re-parsear el formato en cada llamada)
+_FLAG = struct.Struct("<B")
+_COUNT = struct.Struct("<i")
+_FREE_PTR = struct.Struct("<q")
+_FREE_SLOT = struct.Struct("<Bq")  # slot borrado: flag=1 + next_free
+
+# Operadores de search_comparison (escalar y vectorizado)
+_PY_COMPARE = {">": operator.gt, "<": operator.lt, ">=": operator.ge, "<=": operator.le}
+_NP_COMPARE = ({">": np.greater, "<": np.less, ">=": np.greater_equal, "<=": np.less_equal}
+               if np is not None else {})
+
+
+@functools.lru_cache(maxsize=None)
+def _compiled(fmt: str) -> struct.Struct:
+    """struct.Struct del cuerpo de una tabla (uno por formato)."""
+    return struct.Struct(fmt)
+
+
+@functools.lru_cache(maxsize=None)
+def _record_struct(fmt: str, rec_size: int) -> struct.Struct:
+    """Slot completo: flag + cuerpo + relleno hasta rec_size (para iter_unpack)."""
+    body = struct.Struct(fmt)
+    return struct.Struct("<B" + fmt[1:] + f"{rec_size - 1 - body.size}x")
+
+
+def _column_kinds(columns: List[dict]) -> str:
+    """Firma del esquema para el decodificador: 's' VARCHAR, 'a' ARRAY, 'v' escalar."""
+    kinds = []
+    for col in columns:
+        t = col["type"].upper()
+        kinds.append("s" if t.startswith("VARCHAR") else "a" if t.startswith("ARRAY") else "v")
+    return "".join(kinds)
+
+
+@functools.lru_cache(maxsize=None)
+def _decoder(kinds: str, start: int):
+    """
+    Genera (una vez por esquema) una función que arma la fila desde los valores
+    crudos de struct empezando en la posición start, sin ramas por columna.
+    """
+    parts = []
+    i = start
+    for k in kinds:
+        if k == "s":
+            parts.append(f"v[{i}].decode('utf-8', errors='ignore').rstrip('\\x00')")
+            i += 1
+        elif k == "a":
+            parts.append(f"[v[{i}], v[{i + 1}]]")
+            i += 2
+        else:
+            parts.append(f"v[{i}]")
+            i += 1
+    src = f"def _decode(v):\n    return [{', '.join(parts)}]\n"
+    ns = {}
+    exec(src, ns)
+    return ns["_decode"]
+
 
 class StorageManager:
     def __init__(self, base_path="data/"):
         self.base_path = base_path
         os.makedirs(base_path, exist_ok=True)
-        self.catalog_path = os.path.join(base_path, "catalog.json")
+        self.catalog_path = os.path.join(base_path, os.path.basename(CATALOG_FILE))
+        legacy_path = os.path.join(base_path, LEGACY_CATALOG_FILE)
 
         if os.path.exists(self.catalog_path):
-            with open(self.catalog_path, "r", encoding="utf-8") as f:
+            with open(self.catalog_path, "rb") as f:
+                self.tables = pickle.load(f)
+        elif os.path.exists(legacy_path):
+            # Migración: leer el JSON antiguo y guardarlo ya en binario
+            with open(legacy_path, "r", encoding="utf-8") as f:
                 self.tables = json.load(f)
+            self._save_catalog()
+            print(f"[INFO] Catálogo migrado de {LEGACY_CATALOG_FILE} a {os.path.basename(self.catalog_path)}")
         else:
             self.tables = {}
             self._save_catalog()
 
+        # dtype estructurado por tabla (solo tablas sin VARCHAR); no va al catálogo
+        self._dtypes = {}
+        # mmap de solo lectura por tabla: nombre → (ruta, mmap)
+        self._mmaps = {}
+        # Índices en memoria por columna, construidos en la primera búsqueda:
+        # tabla → idx columna → {"eq": {str(valor): [offsets]}, "keys": claves ordenadas | None}
+        self._indexes = {}
+        # Handles abiertos durante una carga masiva (begin_bulk / commit_bulk)
+        self._open_files: Dict[str, BinaryIO] = {}
+
     def _save_catalog(self):
-        with open(self.catalog_path, "w", encoding="utf-8") as f:
-            json.dump(self.tables, f, indent=2)
+        # Escritura atómica: archivo temporal + os.replace
+        tmp_path = self.catalog_path + ".tmp"
+        with open(tmp_path, "wb") as f:
+            pickle.dump(self.tables, f, protocol=CATALOG_PROTOCOL)
+        os.replace(tmp_path, self.catalog_path)
 
     def _table_path(self, name):
         return os.path.join(self.base_path, f"{name}.dat")
@@ -38,12 +130,12 @@ class StorageManager:
             raise ValueError(f"La tabla '{table_name}' ya existe.")
 
         path = self._table_path(table_name)
-        fmt = self._build_struct_format(columns)
-        body_size = max(struct.calcsize(fmt), FREE_PTR_SIZE)  # aseguro espacio para next_free
+        fmt = self._build_struct_format(columns)  # deja "_size" en columnas VARCHAR
+        body_size = max(_compiled(fmt).size, FREE_PTR_SIZE)  # aseguro espacio para next_free
         rec_size = 1 + body_size  # 1 byte flag + cuerpo
 
         with open(path, "wb") as f:
-            header = struct.pack(HEADER_FMT, 0, -1, rec_size)
+            header = HEADER_STRUCT.pack(0, -1, rec_size)
             f.write(header)
 
         self.tables[table_name] = {
@@ -55,6 +147,17 @@ class StorageManager:
         self._save_catalog()
         print(f"[Storage] Tabla '{table_name}' creada binaria: fmt={fmt}, rec_size={rec_size}")
 
+    @staticmethod
+    def _varchar_size(col: dict) -> int:
+        """Tamaño de un VARCHAR[n]; se parsea una vez y queda en col["_size"]."""
+        size = col.get("_size")
+        if size is None:
+            m = _VARCHAR_RE.search(col["type"])
+            if m is None:
+                raise ValueError(f"Tipo no soportado: {col['type']}")
+            size = col["_size"] = int(m.group(1))
+        return size
+
     def _build_struct_format(self, columns: List[dict]) -> str:
         fmt = "<"
         for col in columns:
@@ -64,8 +167,7 @@ class StorageManager:
             elif t.startswith("FLOAT"):
                 fmt += "f"
             elif t.startswith("VARCHAR"):
-                size = int(re.findall(r"\[(\d+)\]", t)[0])
-                fmt += f"{size}s"
+                fmt += f"{self._varchar_size(col)}s"
             elif t.startswith("ARRAY"):
                 # Por ahora ARRAY[FLOAT] = 2 floats
                 fmt += "ff"
@@ -73,17 +175,90 @@ class StorageManager:
                 raise ValueError(f"Tipo no soportado: {t}")
         return fmt
 
+    def _table_view(self, table_name: str) -> mmap.mmap:
+        """
+        mmap de solo lectura del archivo de la tabla, reutilizado entre consultas.
+        Las escrituras en sitio (borrados, huecos reutilizados) se ven por el page
+        cache compartido; si el archivo cambió de tamaño se vuelve a mapear.
+        """
+        path = self.tables[table_name]["file"]
+        bulk_f = self._open_files.get(table_name)
+        if bulk_f is not None:
+            bulk_f.flush()  # que el mmap vea lo escrito en la carga en curso
+        size = os.path.getsize(path)
+        cached = self._mmaps.get(table_name)
+        if cached is not None:
+            if cached[0] == path and len(cached[1]) == size:
+                return cached[1]
+            self._close_view(table_name)
+
+        with open(path, "rb") as f:
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._mmaps[table_name] = (path, mm)
+        return mm
+
+    def _close_view(self, table_name: str):
+        cached = self._mmaps.pop(table_name, None)
+        if cached is None:
+            return
+        try:
+            cached[1].close()
+        except BufferError:
+            pass  # aún hay un arreglo NumPy sobre el mmap; el GC lo libera
+
+    def close(self):
+        """Confirma cargas masivas pendientes y libera los mmaps abiertos."""
+        for name in list(self._open_files):
+            self.commit_bulk(name)
+        for name in list(self._mmaps):
+            self._close_view(name)
+
+    # ======================================================
+    # Carga masiva (un solo handle por tabla)
+    # ======================================================
+    def begin_bulk(self, table_name: str):
+        """
+        Mantiene abierto el archivo de la tabla para una serie de inserts/deletes.
+        Hasta commit_bulk nada se sincroniza a disco: un crash a mitad de la
+        carga puede perder los registros no confirmados.
+        """
+        if table_name not in self.tables:
+            raise KeyError(f"La tabla '{table_name}' no existe.")
+        if table_name not in self._open_files:
+            self._open_files[table_name] = open(self.tables[table_name]["file"], "r+b")
+
+    def commit_bulk(self, table_name: str):
+        """Vacía buffers, hace fsync y cierra el handle de la carga masiva."""
+        f = self._open_files.pop(table_name, None)
+        if f is None:
+            return
+        try:
+            f.flush()
+            os.fsync(f.fileno())
+        finally:
+            f.close()
+
+    @contextmanager
+    def _writer(self, table_name: str):
+        """Handle r+b de la tabla: el de la carga masiva si hay una en curso."""
+        f = self._open_files.get(table_name)
+        if f is not None:
+            yield f
+            return
+        with open(self.tables[table_name]["file"], "r+b") as f:
+            yield f
+
     def _read_header(self, f):
         f.seek(0)
         data = f.read(HEADER_SIZE)
         if len(data) != HEADER_SIZE:
             raise IOError("Header corrupto o incompleto")
-        count, free_head, rec_size = struct.unpack(HEADER_FMT, data)
+        count, free_head, rec_size = HEADER_STRUCT.unpack(data)
         return count, free_head, rec_size
 
     def _write_header(self, f, count: int, free_head: int, rec_size: int):
         f.seek(0)
-        f.write(struct.pack(HEADER_FMT, count, free_head, rec_size))
+        f.write(HEADER_STRUCT.pack(count, free_head, rec_size))
 
     # ======================================================
     # Insertar registro
@@ -94,12 +269,10 @@ class StorageManager:
             raise KeyError(f"La tabla '{table_name}' no existe.")
 
         info = self.tables[table_name]
-        path = info["file"]
         fmt = info["fmt"]
-        rec_size = info["rec_size"]
         columns = info["columns"]
 
-        with open(path, "r+b") as f:
+        with self._writer(table_name) as f:
             count, free_head, record_size = self._read_header(f)
 
             record_bytes = self._pack_record(columns, fmt, values)
@@ -107,22 +280,26 @@ class StorageManager:
             if free_head != -1:
                 # Reutilizar hueco libre
                 print(f"[Storage] Reutilizando hueco en offset {free_head}")
-                f.seek(free_head)
-                next_free = struct.unpack("<q", f.read(8))[0]  # siguiente libre
+                f.seek(free_head + _FLAG.size)  # next_free va después del flag
+                next_free = _FREE_PTR.unpack(f.read(8))[0]  # siguiente libre
                 f.seek(free_head)
                 f.write(record_bytes)
+                offset = free_head
 
                 # Actualizar puntero de free list en el header
-                f.seek(struct.calcsize("<i"))  # saltar count
-                f.write(struct.pack("<q", next_free))
+                f.seek(_COUNT.size)  # saltar count
+                f.write(_FREE_PTR.pack(next_free))
             else:
                 # Insertar al final del archivo
-                f.seek(0, os.SEEK_END)
+                offset = f.seek(0, os.SEEK_END)
                 f.write(record_bytes)
 
             # Actualizar contador de registros activos
             f.seek(0)
-            f.write(struct.pack("<i", count + 1))
+            f.write(_COUNT.pack(count + 1))
+
+        if self._indexes.get(table_name):
+            self._index_add(table_name, offset, self._unpack_body(columns, fmt, record_bytes[1:]))
 
         print(f"[Storage] Insertado en '{table_name}': {values}")
 
@@ -130,7 +307,7 @@ class StorageManager:
         """
         Devuelve un bloque binario: flag (0 activo) + cuerpo.
         """
-        flag = struct.pack("<B", 0)  # 0 = activo
+        flag = _FLAG.pack(0)  # 0 = activo
         body = self._pack_body(columns, fmt, values)
         return flag + body
 
@@ -146,7 +323,7 @@ class StorageManager:
             elif t.startswith("FLOAT"):
                 packed_vals.append(float(val))
             elif t.startswith("VARCHAR"):
-                size = int(re.findall(r"\[(\d+)\]", t)[0])
+                size = self._varchar_size(col)
                 s = str(val).encode("utf-8")[:size]
                 s += b"\x00" * (size - len(s))
                 packed_vals.append(s)
@@ -159,26 +336,11 @@ class StorageManager:
             else:
                 raise ValueError(f"Tipo no soportado en pack: {t}")
 
-        body = struct.pack(fmt, *packed_vals)
+        body = _compiled(fmt).pack(*packed_vals)
         return body
 
     def _unpack_body(self, columns: List[dict], fmt: str, body: bytes) -> List[Any]:
-        vals = list(struct.unpack(fmt, body[:struct.calcsize(fmt)]))
-        out = []
-        i = 0
-        for col in columns:
-            t = col["type"].upper()
-            if t.startswith("VARCHAR"):
-                s = vals[i].decode("utf-8", errors="ignore").rstrip("\x00")
-                out.append(s)
-                i += 1
-            elif t.startswith("ARRAY"):
-                out.append([vals[i], vals[i+1]])
-                i += 2
-            else:
-                out.append(vals[i])
-                i += 1
-        return out
+        return _decoder(_column_kinds(columns), 0)(_compiled(fmt).unpack_from(body))
 
     # ======================================================
     # Recorrido de registros (y utilidades)
@@ -190,33 +352,141 @@ class StorageManager:
         pos = HEADER_SIZE
         while pos + rec_size <= file_end:
             f.seek(pos)
-            flag = struct.unpack("<B", f.read(1))[0]
+            flag = _FLAG.unpack(f.read(1))[0]
             yield pos, flag
             pos += rec_size
 
+    def _fixed_dtype(self, table_name: str):
+        """
+        dtype NumPy equivalente a flag + fmt para tablas de ancho fijo numérico
+        (INT / FLOAT / ARRAY). Retorna None si hay VARCHAR o no hay NumPy.
+        """
+        if np is None:
+            return None
+        if table_name in self._dtypes:
+            return self._dtypes[table_name]
+
+        info = self.tables[table_name]
+        names, formats = ["_flag"], ["u1"]
+        dtype = None
+        for i, col in enumerate(info["columns"]):
+            t = col["type"].upper()
+            if t.startswith("INT"):
+                names.append(f"c{i}"); formats.append("<i4")
+            elif t.startswith("FLOAT"):
+                names.append(f"c{i}"); formats.append("<f4")
+            elif t.startswith("ARRAY"):
+                names += [f"c{i}_0", f"c{i}_1"]; formats += ["<f4", "<f4"]
+            else:
+                break
+        else:
+            dtype = np.dtype({"names": names, "formats": formats, "itemsize": info["rec_size"]})
+        self._dtypes[table_name] = dtype
+        return dtype
+
+    @staticmethod
+    def _rows_from_array(columns: List[dict], arr) -> List[List[Any]]:
+        """Convierte un arreglo estructurado (ver _fixed_dtype) en filas como _unpack_body."""
+        cols = []
+        for i, col in enumerate(columns):
+            if col["type"].upper().startswith("ARRAY"):
+                cols.append([list(p) for p in zip(arr[f"c{i}_0"].tolist(), arr[f"c{i}_1"].tolist())])
+            else:
+                cols.append(arr[f"c{i}"].tolist())
+        return [list(row) for row in zip(*cols)]
+
     # ======================================================
     # SELECT *
     # ======================================================
     def select_all(self, table_name: str):
         if table_name not in self.tables:
             raise KeyError(f"La tabla '{table_name}' no existe.")
+        return self._scan(table_name)[1]
 
+    def _scan(self, table_name: str, with_offsets: bool = False):
+        """Recorre los slots activos: (offsets | None, filas) en orden de archivo."""
         info = self.tables[table_name]
-        path = info["file"]
         fmt = info["fmt"]
-        rec_size = info["rec_size"]
         columns = info["columns"]
 
+        # Archivo mapeado en memoria: sin re-leerlo en cada consulta
+        mm = self._table_view(table_name)
+        if len(mm) < HEADER_SIZE:
+            raise IOError("Header corrupto o incompleto")
+        count, free_head, rec_size_hdr = HEADER_STRUCT.unpack_from(mm, 0)
+        n_slots = (len(mm) - HEADER_SIZE) // rec_size_hdr
+        if n_slots == 0:
+            return ([] if with_offsets else None), []
+
+        dtype = self._fixed_dtype(table_name)
+        if dtype is not None and dtype.itemsize == rec_size_hdr:
+            arr = np.frombuffer(mm, dtype=dtype, count=n_slots, offset=HEADER_SIZE)
+            try:
+                live = np.flatnonzero(arr["_flag"] == 0)
+                offsets = (HEADER_SIZE + live * rec_size_hdr).tolist() if with_offsets else None
+                return offsets, self._rows_from_array(columns, arr[live])
+            finally:
+                del arr  # soltar el buffer exportado del mmap
+
+        # Decodificación de todos los slots en C con iter_unpack
+        offsets = [] if with_offsets else None
         out = []
-        with open(path, "rb") as f:
-            count, free_head, rec_size_hdr = self._read_header(f)
-            for off, flag in self._iter_slots(f, rec_size_hdr):
-                if flag != 0:  # borrado
-                    continue
-                f.seek(off + 1)
-                body = f.read(rec_size_hdr - 1)
-                out.append(self._unpack_body(columns, fmt, body))
-        return out
+        decode = _decoder(_column_kinds(columns), 1)  # vals[0] es el flag
+        slots = _record_struct(fmt, rec_size_hdr).iter_unpack(mm[HEADER_SIZE:HEADER_SIZE + n_slots * rec_size_hdr])
+        for i, vals in enumerate(slots):
+            if vals[0] != 0:  # borrado
+                continue
+            if with_offsets:
+                offsets.append(HEADER_SIZE + i * rec_size_hdr)
+            out.append(decode(vals))
+        return offsets, out
+
+    def _row_at(self, table_name: str, off: int) -> List[Any]:
+        info = self.tables[table_name]
+        mm = self._table_view(table_name)
+        return self._unpack_body(info["columns"], info["fmt"], mm[off + 1:off + info["rec_size"]])
+
+    # ======================================================
+    # Índices en memoria por columna
+    # ======================================================
+    def _column_index(self, table_name: str, col_idx: int) -> dict:
+        """Índice valor → offsets de una columna; se construye con un solo recorrido."""
+        table_idx = self._indexes.setdefault(table_name, {})
+        index = table_idx.get(col_idx)
+        if index is None:
+            eq = {}
+            offsets, rows = self._scan(table_name, with_offsets=True)
+            for off, row in zip(offsets, rows):
+                eq.setdefault(str(row[col_idx]), []).append(off)
+            index = table_idx[col_idx] = {"eq": eq, "keys": None}
+        return index
+
+    def _index_add(self, table_name: str, off: int, row: List[Any]):
+        for col_idx, index in self._indexes.get(table_name, {}).items():
+            key = str(row[col_idx])
+            bucket = index["eq"].get(key)
+            if bucket is None:
+                index["eq"][key] = [off]
+                index["keys"] = None
+            else:
+                insort(bucket, off)  # un hueco reutilizado puede quedar antes
+
+    def _index_remove(self, table_name: str, off: int, row: List[Any]):
+        for col_idx, index in self._indexes.get(table_name, {}).items():
+            key = str(row[col_idx])
+            bucket = index["eq"].get(key)
+            if bucket is None:
+                continue
+            try:
+                bucket.remove(off)
+            except ValueError:
+                continue
+            if not bucket:
+                del index["eq"][key]
+                index["keys"] = None
+
+    def _rows_at(self, table_name: str, offsets: List[int]) -> List[List[Any]]:
+        return [self._row_at(table_name, off) for off in offsets]
 
     # ======================================================
     # Búsqueda exacta (key = value)
@@ -230,11 +500,8 @@ class StorageManager:
             raise ValueError(f"La columna '{key}' no existe en {table_name}.")
         idx = names.index(key)
 
-        results = []
-        for row in self.select_all(table_name):
-            if str(row[idx]) == str(value):
-                results.append(row)
-        return results
+        offsets = self._column_index(table_name, idx)["eq"].get(str(value), [])
+        return self._rows_at(table_name, offsets)
 
     # ======================================================
     # DELETE (eliminación lógica + free list)
@@ -249,44 +516,32 @@ class StorageManager:
             raise KeyError(f"La tabla '{table_name}' no existe.")
 
         info = self.tables[table_name]
-        path = info["file"]
-        fmt = info["fmt"]
-        rec_size = info["rec_size"]
-        columns = info["columns"]
-        names = [c["name"] for c in columns]
-
-        def match_row(row):
-            if isinstance(condition, ConditionNode):
-                if condition.operator != "=":
-                    return False
-                if condition.attribute not in names:
-                    return False
-                col_idx = names.index(condition.attribute)
-                return str(row[col_idx]) == str(condition.value)
-            elif isinstance(condition, BetweenConditionNode):
-                return False
-            return False
-
-        deleted = 0
-        with open(path, "r+b") as f:
+        names = [c["name"] for c in info["columns"]]
+
+        # 1) Fase de solo lectura: offsets que cumplen la condición (vía índice)
+        matched = []
+        if (isinstance(condition, ConditionNode) and condition.operator == "="
+                and condition.attribute in names):
+            col_idx = names.index(condition.attribute)
+            matched = list(self._column_index(table_name, col_idx)["eq"].get(str(condition.value), []))
+        if not matched:
+            print(f"[Storage] DELETE: 0 registro(s) marcados como borrados en '{table_name}'")
+            return 0
+        rows = self._rows_at(table_name, matched)
+
+        # 2) Una escritura por slot (flag + next_free juntos) y el header al final
+        with self._writer(table_name) as f:
             count, free_head, rec_size_hdr = self._read_header(f)
+            for off in matched:
+                f.seek(off)
+                f.write(_FREE_SLOT.pack(1, free_head))
+                free_head = off
+            deleted = len(matched)
+            count = max(0, count - deleted)
+            self._write_header(f, count, free_head, rec_size_hdr)
 
-            for off, flag in self._iter_slots(f, rec_size_hdr):
-                if flag != 0:
-                    continue
-                f.seek(off + 1)
-                body = f.read(rec_size_hdr - 1)
-                row = self._unpack_body(columns, fmt, body)
-                if match_row(row):
-                    f.seek(off)
-                    f.write(struct.pack("<B", 1))
-                    f.write(struct.pack("<q", free_head))
-                    free_head = off
-                    deleted += 1
-
-            if deleted:
-                count = max(0, count - deleted)
-                self._write_header(f, count, free_head, rec_size_hdr)
+        for off, row in zip(matched, rows):
+            self._index_remove(table_name, off, row)
 
         print(f"[Storage] DELETE: {deleted} registro(s) marcados como borrados en '{table_name}'")
         return deleted
@@ -298,15 +553,15 @@ class StorageManager:
         if key not in names:
             return []
         idx = names.index(key)
-        out = []
-        for row in self.select_all(table):
-            try:
-                val = row[idx]
-                if str(v1) <= str(val) <= str(v2):
-                    out.append(row)
-            except Exception:
-                pass
-        return out
+
+        # Mismo criterio que antes (comparación como texto) sobre las claves ordenadas
+        index = self._column_index(table, idx)
+        if index["keys"] is None:
+            index["keys"] = sorted(index["eq"])
+        keys = index["keys"]
+        lo, hi = bisect_left(keys, str(v1)), bisect_right(keys, str(v2))
+        offsets = sorted(off for k in keys[lo:hi] for off in index["eq"][k])
+        return self._rows_at(table, offsets)
 
     def search_comparison(self, table, key, op, value):
         info = self.tables[table]
@@ -314,14 +569,33 @@ class StorageManager:
         if key not in names:
             return []
         idx = names.index(key)
+        cmp = _PY_COMPARE.get(op)
+        if cmp is None:
+            return []
+
+        # Tabla de ancho fijo + columna escalar + valor numérico → máscara NumPy
+        col_type = info["columns"][idx]["type"].upper()
+        dtype = self._fixed_dtype(table)
+        if (dtype is not None and dtype.itemsize == info["rec_size"] and not col_type.startswith("ARRAY")
+                and isinstance(value, (int, float)) and not isinstance(value, bool)):
+            mm = self._table_view(table)
+            n_slots = (len(mm) - HEADER_SIZE) // info["rec_size"]
+            if n_slots == 0:
+                return []
+            arr = np.frombuffer(mm, dtype=dtype, count=n_slots, offset=HEADER_SIZE)
+            try:
+                # float64 para comparar igual que el valor Python (float32/int32 → exacto)
+                vals = arr[f"c{idx}"].astype(np.float64)
+                mask = (arr["_flag"] == 0) & _NP_COMPARE[op](vals, float(value))
+                return self._rows_from_array(info["columns"], arr[mask])
+            finally:
+                del arr  # soltar el buffer exportado del mmap
+
         out = []
         for row in self.select_all(table):
             try:
-                val = row[idx]
-                if op == ">" and val > value: out.append(row)
-                if op == "<" and val < value: out.append(row)
-                if op == ">=" and val >= value: out.append(row)
-                if op == "<=" and val <= value: out.append(row)
+                if cmp(row[idx], value):
+                    out.append(row)
             except Exception:
                 pass
         return out
@@ -355,7 +629,7 @@ class StorageManager:
                 body = f.read(rec_size_hdr - 1)
 
                 if flag == 1:
-                    next_free = struct.unpack("<q", body[:8])[0]
+                    next_free = _FREE_PTR.unpack_from(body)[0]
                     print(f"[SLOT] off={off:04d} | flag=1 (BORRADO) | next_free={next_free}")
                 else:
                     row = self._unpack_body(columns, fmt, body)
@@ -1,3 +1,5 @@
+import logging
+import sys
 from test_parser.core.parser.parser_sql import ParserSQL
 from test_parser.core.parser.sql_executor import SQLExecutor
 from test_parser.core.parser.ast_nodes import SelectNode
@@ -61,24 +63,27 @@ sm = MockStorageManager()
 sql_exec = SQLExecutor(sm)
 parser = ParserSQL()
 
+log = logging.getLogger("sql_test")
+
 # ==========================================================
 # Prueba del Parser + Executor
 # ==========================================================
 
 def run_test(query):
-    print(f"\n QUERY: {query}")
-    ast = parser.parse(query)
-    print(" [AST]:", ast)
+    log.info("\n QUERY: %s", query)
+    ast = parser.parse_cached(query)
+    log.info(" [AST]: %s", ast)
     if isinstance(ast, SelectNode):
-        print(" [AST.condition]:", repr(ast.condition), "type:", type(ast.condition).__name__)
+        log.info(" [AST.condition]: %r type: %s", ast.condition, type(ast.condition).__name__)
     result = sql_exec.execute(ast)
-    print(" Resultado:", result)
+    log.info(" Resultado: %s", result)
 
 # ==========================================================
 # Ejecución de consultas de prueba
 # ==========================================================
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(message)s", stream=sys.stdout)
     queries = [
         'CREATE TABLE Restaurantes (id INT KEY INDEX SEQ, nombre VARCHAR[20] INDEX BTREE, ubicacion ARRAY[FLOAT] INDEX RTREE)',
         'INSERT INTO Restaurantes VALUES (1, "Tanta", [10.5, 20.3])',
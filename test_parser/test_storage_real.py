@@ -1,4 +1,7 @@
+import logging
+import sys
 import os
+import shutil
 from test_parser.core.parser.parser_sql import ParserSQL
 from test_parser.core.parser.sql_executor import SQLExecutor
 from test_parser.core.parser.ast_nodes import SelectNode
@@ -11,35 +14,38 @@ from test_parser.storage.storage_manager import StorageManager
 # Carpeta data al mismo nivel del test
 BASE_DIR = os.path.dirname(__file__)
 DATA_DIR = os.path.join(BASE_DIR, "data")
-os.makedirs(DATA_DIR, exist_ok=True)
 
-# Limpiar la carpeta de datos para pruebas frescas
-for file in os.listdir(DATA_DIR):
-    os.remove(os.path.join(DATA_DIR, file))
+log = logging.getLogger("sql_test")
 
-sm = StorageManager(base_path=DATA_DIR + "/")
-sql_exec = SQLExecutor(sm)
-parser = ParserSQL()
 # ==========================================================
 # Función de prueba
 # ==========================================================
 
-def run_test(query):
-    print(f"\n QUERY: {query}")
-    ast = parser.parse(query)
-    print(" [AST]:", ast)
+def run_test(parser, sql_exec, query):
+    log.info("\n QUERY: %s", query)
+    ast = parser.parse_cached(query)
+    log.info(" [AST]: %s", ast)
     if isinstance(ast, SelectNode):
-        print(" [AST.condition]:", repr(ast.condition), "type:", type(ast.condition).__name__)
+        log.info(" [AST.condition]: %r type: %s", ast.condition, type(ast.condition).__name__)
 
     result = sql_exec.execute(ast)
-    print(" Resultado:", result)
+    log.info(" Resultado: %s", result)
 
 
 # ==========================================================
 # Ejecución de consultas
 # ==========================================================
 
-if __name__ == "__main__":
+def main():
+    logging.basicConfig(level=logging.INFO, format="%(message)s", stream=sys.stdout)
+    # Limpiar la carpeta de datos para pruebas frescas
+    shutil.rmtree(DATA_DIR, ignore_errors=True)
+    os.makedirs(DATA_DIR, exist_ok=True)
+
+    sm = StorageManager(base_path=DATA_DIR + "/")
+    sql_exec = SQLExecutor(sm)
+    parser = ParserSQL()
+
     queries = [
         'CREATE TABLE Restaurantes (id INT KEY INDEX SEQ, nombre VARCHAR[20] INDEX BTREE, ubicacion ARRAY[FLOAT] INDEX RTREE)',
         'INSERT INTO Restaurantes VALUES (1, "Tanta", [10.5, 20.3])',
@@ -53,5 +59,9 @@ if __name__ == "__main__":
     ]
 
     for q in queries:
-        run_test(q)
-sm.debug_dump_table("Restaurantes")
+        run_test(parser, sql_exec, q)
+    sm.debug_dump_table("Restaurantes")
+
+
+if __name__ == "__main__":
+    main()